@@ -23,9 +23,87 @@ class Settings(BaseSettings):
     # Redis (Upstash)
     redis_url: str = "redis://localhost:6379"
 
+    # LLM gateway + hedged requests
+    llm_model: str = "gemini-2.5-flash"
+    llm_fallback_model: str = "gemini-2.5-flash-lite"   # hedge target; "" = same model
+    llm_hedge_percentile: float = 0.9
+    llm_hedge_default_delay_seconds: float = 15.0       # until enough latency samples exist
+    llm_hedge_min_delay_seconds: float = 2.0
+    llm_hedge_max_per_minute: int = 30                  # global cap; 0 disables hedging
+
+    llm_call_timeout_seconds: float = 90.0
+
+    # Circuit breakers + bulkheads (both shared across processes via Redis)
+    breaker_failure_threshold: int = 5
+    breaker_window_seconds: int = 60
+    breaker_cooldown_seconds: int = 30
+    bulkhead_gemini: int = 8
+    bulkhead_tavily: int = 4
+    bulkhead_supabase: int = 8
+    bulkhead_wait_seconds: float = 10.0
+    bulkhead_lease_seconds: float = 150.0   # Above the slowest call (Tavily's own 100 s timeout)
+
+    # Prompt input budgets (estimated tokens, search snippets only)
+    researcher_snippet_token_budget: int = 900
+
+    # Clarifier fast path (lookup tables instead of an LLM call when confident)
+    clarifier_fast_path: bool = True
+    clarifier_fast_path_min_confidence: float = 0.8
+
+    # Research reuse (similarity index over past clarifier niche/region pairs)
+    research_reuse_threshold: float = 0.68   # From `python -m app.pipeline.research_index calibrate`
+    research_index_path: str = "research_index.npz"
+    research_index_dim: int = 256
+
+    # Pipeline recovery: automatic re-runs of a failed step (0 = manual resume only)
+    auto_resume_max_attempts: int = 0
+    auto_resume_backoff_seconds: int = 10
+
+    # End-to-end job deadline + degradation thresholds (seconds left)
+    job_sla_seconds: int = 120
+    deadline_skip_research_seconds: int = 60
+    deadline_fast_model_seconds: int = 35
+    deadline_min_call_seconds: float = 8.0
+    deadline_cached_research_min_similarity: float = 0.64   # `research_index calibrate` degraded threshold
+    research_search_timeout_seconds: int = 20
+
+    # Write-behind buffer for job status updates and job_steps inserts
+    writebehind_enabled: bool = True
+    writebehind_flush_interval_ms: int = 500
+    writebehind_max_batch: int = 100
+    writebehind_max_attempts: int = 20        # Failed writes of one batch before it is dead-lettered
+
+    # Hot/cold compaction (app/pipeline/compaction.py)
+    archive_after_days: int = 30
+    archive_batch_size: int = 500
+    archive_store: str = "local"             # or "package.module.ClassName"
+    archive_local_path: str = "archive"
+    archive_local_durable: bool = False      # Only if ARCHIVE_LOCAL_PATH is a persistent disk shared by all instances
+
+    # Per-page font subsetting (app/pipeline/fonts.py)
+    font_subsetting: bool = False             # Needs FONT_SOURCE_PATH and the bucket, see fonts.py
+    font_source_path: str = "fonts/Cairo-VariableFont_slnt,wght.ttf"
+    font_bucket: str = "page-fonts"           # Public Supabase Storage bucket for the subsets
+
+    # Worker pool supervisor (supervisor.py)
+    worker_pool_min: int = 1
+    worker_pool_max: int = 4
+    worker_pool_jobs_per_worker: int = 2
+    worker_pool_scale_up_age_seconds: int = 20
+    worker_pool_scale_up_cooldown: int = 15
+    worker_pool_scale_down_cooldown: int = 120
+    worker_pool_poll_seconds: int = 5
+
     # SSE stream auth secret
     stream_token_secret: str = "change-me-in-production"
 
+    # Multiplexed WebSocket (/api/jobs/ws)
+    ws_flush_interval_ms: int = 250
+    ws_max_jobs_per_connection: int = 200
+
+    # Long-poll GET /api/jobs/{job_id}/status?wait=&since= (upper bound on wait)
+    status_long_poll_max_seconds: int = 30
+
     # App
     frontend_url: str = "http://localhost:3000"
     environment: str = "development"
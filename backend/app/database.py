@@ -8,43 +8,79 @@ SQLAlchemy's startup version check causes DuplicatePreparedStatement errors.
 Solution: Remove SQLAlchemy engine entirely from startup check.
 All DB operations go through the Supabase SDK directly.
 SQLAlchemy async sessions are available for Phase 3+ ORM usage.
+
+Clients are created on first use, not at import: importing the app (API
+process, worker, supervisor, CLI tools) should not pay for building the
+Supabase client or the SQLAlchemy engine. See benchmarks/bench_import_time.py.
 """
 
+import os
 from collections.abc import AsyncGenerator
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from sqlalchemy.pool import NullPool
-from supabase import create_client, Client
+from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+    from supabase import Client
+
 
 # ── 1. Supabase SDK Client ─────────────────────────────────────────────────
 # This is our PRIMARY database interface. Used for all CRUD in Phase 2.
-supabase_client: Client = create_client(
-    supabase_url=settings.supabase_url,
-    supabase_key=settings.supabase_service_role_key,
-)
+# One client per process: an RQ work horse is forked from the worker parent,
+# and must not share the parent's pooled keep-alive sockets.
+_supabase_client: tuple[int, "Client"] | None = None
+
+
+def get_supabase_client() -> "Client":
+    global _supabase_client
+    if _supabase_client is None or _supabase_client[0] != os.getpid():
+        from supabase import create_client
+
+        _supabase_client = (os.getpid(), create_client(
+            supabase_url=settings.supabase_url,
+            supabase_key=settings.supabase_service_role_key,
+        ))
+    return _supabase_client[1]
 
 
 # ── 2. Async SQLAlchemy Engine (Phase 3+ ORM usage only) ──────────────────
 # NOT used at startup. Only used in route dependencies via get_db().
-async_engine = create_async_engine(
-    settings.database_url,
-    poolclass=NullPool,
-    execution_options={"compiled_cache": {}},
-    connect_args={
-        "statement_cache_size": 0,
-        "prepared_statement_cache_size": 0,
-    },
-)
-
-AsyncSessionLocal = sessionmaker(
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+@lru_cache(maxsize=1)
+def get_async_engine() -> "AsyncEngine":
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    return create_async_engine(
+        settings.database_url,
+        poolclass=NullPool,
+        execution_options={"compiled_cache": {}},
+        connect_args={
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+        },
+    )
+
+
+@lru_cache(maxsize=1)
+def _session_factory():
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+
+    return sessionmaker(
+        bind=get_async_engine(),
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+async def dispose_async_engine() -> None:
+    """Disposes the engine on shutdown — only if something actually created it."""
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
 
 
 # ── 3. ORM Base ────────────────────────────────────────────────────────────
@@ -53,8 +89,8 @@ class Base(DeclarativeBase):
 
 
 # ── 4. FastAPI DB session dependency ──────────────────────────────────────
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
+async def get_db() -> AsyncGenerator["AsyncSession", None]:
+    async with _session_factory()() as session:
         try:
             yield session
             await session.commit()
@@ -0,0 +1,34 @@
+"""
+app/events.py
+─────────────
+Wire format for job update events on `job:{job_id}:updates`:
+
+    b"<status>\n<orjson body>"
+
+Updates are serialized exactly once, by the publisher. The status header
+lets subscribers detect terminal states without parsing the body, and the
+body is forwarded to SSE clients byte-for-byte.
+
+Kept free of Redis/settings imports so it's cheap to import and benchmark.
+"""
+
+import orjson
+
+
+TERMINAL_STATUSES = frozenset({b"completed", b"failed", b"cancelled"})
+
+
+def encode_job_update(data: dict) -> bytes:
+    """Serializes an update once: status header + orjson body."""
+    return str(data.get("status", "")).encode("utf-8") + b"\n" + orjson.dumps(data)
+
+
+def split_job_update(message: bytes) -> tuple[bytes, bytes]:
+    """Splits a published update into (status, raw JSON body) without decoding."""
+    status, _, body = message.partition(b"\n")
+    return status, body
+
+
+def sse_frame(body: bytes) -> bytes:
+    """Wraps a raw JSON body in an SSE `data:` frame."""
+    return b"data: " + body + b"\n\n"
@@ -0,0 +1,145 @@
+"""
+app/pipeline/archive.py
+───────────────────────
+Cold tier for pipeline payloads.
+
+Artifacts older than ARCHIVE_AFTER_DAYS are moved out of Postgres by
+app/pipeline/compaction.py into compressed blobs behind an ArchiveStore.
+Blobs are keyed by the artifact ref (SHA-256 of the canonical JSON), so the
+same payload is archived once no matter how many jobs or steps point at it.
+
+Stores are pluggable via ARCHIVE_STORE:
+  - "local"                      : LocalArchiveStore under ARCHIVE_LOCAL_PATH
+  - "package.module.ClassName"   : any class with put/get/exists, built with no args
+
+Compaction deletes the hot copy, so it only runs against a `durable` store:
+one that survives restarts and that every API and worker instance reads.
+The local store is not durable (Render disks are ephemeral and per-service)
+unless ARCHIVE_LOCAL_DURABLE says ARCHIVE_LOCAL_PATH is a shared persistent
+mount. Every blob is also read back and compared before it counts as written.
+
+Reads are transparent: get_artifact() falls back to read_archived() when a
+step_artifacts row has been compacted, and rehydrate_structure() restores a
+job or variant row whose `structure` column was replaced by `structure_ref`.
+"""
+
+import importlib
+import os
+import threading
+import zlib
+from pathlib import Path
+
+import orjson
+
+from app.config import settings
+
+
+BLOB_SUFFIX = ".json.z"
+
+
+# ── Stores ─────────────────────────────────────────────────────────────────
+class ArchiveWriteError(Exception):
+    """A blob could not be written, or did not read back as the payload that was written."""
+
+
+class ArchiveStore:
+    """Interface for archive backends. Keys are artifact refs; values are compressed blobs."""
+
+    durable = True   # Survives restarts and is shared by every instance
+
+    def put(self, key: str, blob: bytes) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        """Returns the blob, or raises KeyError if it does not exist."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+
+class LocalArchiveStore(ArchiveStore):
+    """Blobs on the local filesystem, fanned out as `ab/cd/<ref>.json.z`."""
+
+    def __init__(self, root: str | None = None):
+        self.root = Path(root or settings.archive_local_path)
+        self.durable = settings.archive_local_durable
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / f"{key}{BLOB_SUFFIX}"
+
+    def put(self, key: str, blob: bytes) -> None:
+        path = self._path(key)
+        if path.exists():
+            return   # Content-addressed: an existing blob is already this payload
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(blob)
+        os.replace(tmp, path)   # Atomic, so readers never see a partial blob
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            raise KeyError(f"Archive blob {key} not found") from None
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+
+_STORES = {"local": LocalArchiveStore}
+
+_store: ArchiveStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_archive_store() -> ArchiveStore:
+    """The configured store, built once per process."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                name = settings.archive_store
+                if name in _STORES:
+                    _store = _STORES[name]()
+                else:
+                    module, _, cls = name.rpartition(".")
+                    _store = getattr(importlib.import_module(module), cls)()
+    return _store
+
+
+# ── Blobs ──────────────────────────────────────────────────────────────────
+def compress(raw: bytes) -> bytes:
+    return zlib.compress(raw, level=9)   # Cold data: written once, read rarely
+
+
+def archive_payload(ref: str, raw: bytes) -> int:
+    """
+    Writes the canonical JSON bytes of artifact `ref` and reads them back;
+    returns the blob size. Raises ArchiveWriteError unless the stored blob
+    decompresses to exactly `raw` — only then may the hot copy be dropped.
+    """
+    blob = compress(raw)
+    store = get_archive_store()
+    try:
+        store.put(ref, blob)
+        stored = zlib.decompress(store.get(ref))
+    except (KeyError, OSError, zlib.error) as e:
+        raise ArchiveWriteError(f"Archive blob {ref} did not read back: {e}") from e
+    if stored != raw:
+        raise ArchiveWriteError(f"Archive blob {ref} does not match its payload")
+    return len(blob)
+
+
+def read_archived(key: str) -> dict:
+    """Loads an archived payload. Raises KeyError if the blob is missing."""
+    return orjson.loads(zlib.decompress(get_archive_store().get(key)))
+
+
+# ── Rehydration ────────────────────────────────────────────────────────────
+def rehydrate_structure(supabase, row: dict) -> dict:
+    """Fills `structure` back in for a compacted landing_page_jobs / _variants row."""
+    if row.get("structure") is None and row.get("structure_ref"):
+        from app.pipeline.artifacts import get_artifact
+        row["structure"] = get_artifact(supabase, row["structure_ref"])
+    return row
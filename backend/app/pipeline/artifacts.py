@@ -0,0 +1,194 @@
+"""
+app/pipeline/artifacts.py
+─────────────────────────
+Content-addressed artifact store for pipeline step outputs.
+
+Every step output is written ONCE under the SHA-256 of its canonical JSON.
+Everything downstream (RQ kwargs, job_steps rows, pub/sub events) carries
+only the reference — a 64-char hex digest — and payloads are fetched lazily
+where they are actually needed.
+
+Refs are not secrets: a small payload's ref can be computed by hashing a
+guess. Clients may only read refs that one of their own job's steps used.
+Every step links its refs to the job (`job:{id}:refs`, covering rows still
+in the write-behind buffer), and `job_uses_ref` falls back to job_steps.
+
+New artifacts reach Supabase through the write-behind buffer (one bulk
+upsert per flush across all jobs, see app/pipeline/writebehind.py); Redis
+serves them until then, and terminal job writes flush them first.
+
+Storage tiers (read in this order):
+  1. In-process LRU   : avoids re-fetching within one worker process
+  2. Redis            : `artifact:{ref}` with a TTL, fast cross-process reads
+  3. Supabase         : `step_artifacts` table, the durable copy
+  4. Archive          : compressed blob once compaction has moved the payload
+                        out of Postgres (see app/pipeline/archive.py)
+
+Required table (Supabase SQL editor):
+    create table if not exists step_artifacts (
+        ref        text primary key,
+        data       jsonb not null,
+        size_bytes integer not null,
+        created_at timestamptz not null default now()
+    );
+    -- Cold tier (app/pipeline/compaction.py)
+    alter table step_artifacts alter column data drop not null;
+    alter table step_artifacts add column if not exists archive_key text;
+    alter table step_artifacts add column if not exists archived_at timestamptz;
+"""
+
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import orjson
+
+from app.config import settings
+from app.redis_client import redis_conn
+from app.pipeline.archive import read_archived
+from app.pipeline.resilience import guard
+from app.pipeline.writebehind import buffer_artifact
+
+
+ARTIFACT_TTL_SECONDS = 7 * 24 * 3600   # Redis copy; Supabase keeps the durable one
+JOB_REFS_TTL_SECONDS = 24 * 3600
+_LOCAL_CACHE_SIZE    = 256
+
+_local_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+
+# ── Helpers ────────────────────────────────────────────────────────────────
+def _canonical_bytes(data: dict) -> bytes:
+    """Stable serialization so equal payloads always hash to the same ref."""
+    return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+
+
+def _redis_key(ref: str) -> str:
+    return f"artifact:{ref}"
+
+
+def _job_refs_key(job_id: str) -> str:
+    return f"job:{job_id}:refs"
+
+
+def _remember(ref: str, data: dict) -> None:
+    _local_cache[ref] = data
+    _local_cache.move_to_end(ref)
+    while len(_local_cache) > _LOCAL_CACHE_SIZE:
+        _local_cache.popitem(last=False)
+
+
+def artifact_ref(data: dict) -> str:
+    """Returns the content hash of a payload without storing it."""
+    return hashlib.sha256(_canonical_bytes(data)).hexdigest()
+
+
+# ── Write ──────────────────────────────────────────────────────────────────
+def put_artifact(supabase, data: dict) -> str:
+    """
+    Stores a payload under its content hash and returns the reference.
+    Identical payloads are deduplicated: Redis uses SET NX and the Supabase
+    upsert ignores duplicates, so a payload is never written twice.
+    """
+    raw = _canonical_bytes(data)
+    ref = hashlib.sha256(raw).hexdigest()
+
+    if ref in _local_cache:
+        return ref
+
+    is_new = redis_conn.set(_redis_key(ref), raw, ex=ARTIFACT_TTL_SECONDS, nx=True)
+    if is_new:
+        row = {
+            "ref":        ref,
+            "data":       data,
+            "size_bytes": len(raw),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            if settings.writebehind_enabled:
+                buffer_artifact(supabase, row)
+            else:
+                with guard("supabase"):
+                    supabase.table("step_artifacts").upsert(
+                        row, on_conflict="ref", ignore_duplicates=True,
+                    ).execute()
+        except Exception:
+            # Don't leave a Redis-only copy that would expire without a durable one
+            redis_conn.delete(_redis_key(ref))
+            raise
+
+    _remember(ref, data)
+    return ref
+
+
+# ── Ownership ──────────────────────────────────────────────────────────────
+def link_job_refs(job_id: str, refs) -> None:
+    """Records that `job_id`'s steps read or wrote `refs`."""
+    refs = [r for r in refs if r]
+    if not refs:
+        return
+    pipe = redis_conn.pipeline()
+    pipe.sadd(_job_refs_key(job_id), *refs)
+    pipe.expire(_job_refs_key(job_id), JOB_REFS_TTL_SECONDS)
+    pipe.execute()
+
+
+def job_uses_ref(supabase, job_id: str, ref: str) -> bool:
+    """True if `ref` is an input or output of one of the job's steps."""
+    if redis_conn.sismember(_job_refs_key(job_id), ref):
+        return True
+    # A job has a handful of steps: read them all rather than query into input_data.refs
+    with guard("supabase"):
+        rows = (
+            supabase.table("job_steps")
+            .select("input_data, output_data")
+            .eq("job_id", job_id)
+            .execute()
+        ).data or []
+    return any(ref in _step_refs(row) for row in rows)
+
+
+def _step_refs(row: dict) -> set:
+    """Every ref a job_steps row points at (compacted legacy rows keep a bare "ref")."""
+    refs = set()
+    for column in ("input_data", "output_data"):
+        data = row.get(column) or {}
+        refs.add(data.get("ref"))
+        refs.update(v for v in (data.get("refs") or {}).values() if isinstance(v, str))
+    refs.discard(None)
+    return refs
+
+
+# ── Read ───────────────────────────────────────────────────────────────────
+def get_artifact(supabase, ref: str) -> dict:
+    """
+    Resolves a reference to its payload. Raises KeyError if the artifact
+    does not exist in any tier.
+    """
+    if ref in _local_cache:
+        _local_cache.move_to_end(ref)
+        return _local_cache[ref]
+
+    raw = redis_conn.get(_redis_key(ref))
+    if raw is not None:
+        data = orjson.loads(raw)
+        _remember(ref, data)
+        return data
+
+    with guard("supabase"):
+        result = (
+            supabase.table("step_artifacts")
+            .select("data, archive_key")
+            .eq("ref", ref)
+            .limit(1)
+            .execute()
+        )
+    if not result.data:
+        raise KeyError(f"Artifact {ref} not found")
+
+    row = result.data[0]
+    data = row["data"] if row["data"] is not None else read_archived(row["archive_key"])
+    # Re-warm Redis so the next step doesn't hit Postgres again
+    redis_conn.set(_redis_key(ref), _canonical_bytes(data), ex=ARTIFACT_TTL_SECONDS)
+    _remember(ref, data)
+    return data
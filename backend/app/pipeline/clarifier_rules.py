@@ -0,0 +1,334 @@
+"""
+app/pipeline/clarifier_rules.py
+───────────────────────────────
+Deterministic fast path for the Clarifier step.
+
+Most of ClarifierOutput follows directly from the job input: country,
+direction, dialect and locale come from the locale (ar-SA → Saudi Arabia,
+rtl, Gulf Arabic) or the city, and search_region is just city + country.
+When the city and business type are both recognized with high confidence,
+`clarify` builds the output from the lookup tables below and the Gemini
+round trip is skipped. Anything unrecognized returns None → LLM fallback.
+
+All tables are normalized once at import into flat dicts, so a lookup is a
+few dict probes. Match rates are counted in Redis hash `clarifier:fast_path`.
+
+Business types are only trusted on an exact or whole-phrase alias match: a
+single generic word inside a longer input ("clinic" in "veterinary clinic",
+"ورشة" in "ورشة خياطة") scores below the threshold and goes to the LLM.
+`python -m app.pipeline.clarifier_rules check` runs the EXAMPLES table.
+"""
+
+import re
+import unicodedata
+
+from app.config import settings
+from app.redis_client import redis_conn
+from app.schemas.clarifier import ClarifierOutput
+
+
+RULES_VERSION = "clarifier.rules@v2"
+METRICS_KEY   = "clarifier:fast_path"
+
+
+# ── Locale table: locale → (country, direction, dialect) ───────────────────
+LOCALES = {
+    "ar-SA": ("Saudi Arabia",         "rtl", "Gulf Arabic"),
+    "ar-AE": ("United Arab Emirates", "rtl", "Gulf Arabic"),
+    "ar-KW": ("Kuwait",               "rtl", "Gulf Arabic"),
+    "ar-QA": ("Qatar",                "rtl", "Gulf Arabic"),
+    "ar-BH": ("Bahrain",              "rtl", "Gulf Arabic"),
+    "ar-OM": ("Oman",                 "rtl", "Gulf Arabic"),
+    "ar-EG": ("Egypt",                "rtl", "Egyptian Arabic"),
+    "ar-JO": ("Jordan",               "rtl", "Levantine Arabic"),
+    "ar-LB": ("Lebanon",              "rtl", "Levantine Arabic"),
+    "ar-MA": ("Morocco",              "rtl", "Moroccan Arabic"),
+    "en-SA": ("Saudi Arabia",         "ltr", "English"),
+    "en-AE": ("United Arab Emirates", "ltr", "English"),
+    "en-QA": ("Qatar",                "ltr", "English"),
+    "en-KW": ("Kuwait",               "ltr", "English"),
+    "en-EG": ("Egypt",                "ltr", "English"),
+    "en-US": ("United States",        "ltr", "English"),
+    "en-GB": ("United Kingdom",       "ltr", "English"),
+}
+
+# Default locale per country — used when the input locale is bare ("ar", "en")
+_COUNTRY_LOCALE = {
+    ("ar", country): locale for locale, (country, _, _) in LOCALES.items() if locale.startswith("ar-")
+} | {
+    ("en", country): locale for locale, (country, _, _) in LOCALES.items() if locale.startswith("en-")
+}
+
+
+# ── City table: canonical English name → (country, transliterations) ──────
+CITIES = {
+    "Riyadh":      ("Saudi Arabia", ["الرياض", "رياض", "riyad", "ar riyadh", "al riyadh"]),
+    "Jeddah":      ("Saudi Arabia", ["جدة", "جده", "jiddah", "jedda", "jidda"]),
+    "Mecca":       ("Saudi Arabia", ["مكة", "مكة المكرمة", "makkah", "mekka"]),
+    "Medina":      ("Saudi Arabia", ["المدينة", "المدينة المنورة", "madinah", "al madinah"]),
+    "Dammam":      ("Saudi Arabia", ["الدمام", "دمام", "ad dammam"]),
+    "Khobar":      ("Saudi Arabia", ["الخبر", "al khobar", "alkhobar"]),
+    "Dhahran":     ("Saudi Arabia", ["الظهران", "zahran"]),
+    "Taif":        ("Saudi Arabia", ["الطائف", "at taif"]),
+    "Abha":        ("Saudi Arabia", ["أبها", "ابها"]),
+    "Tabuk":       ("Saudi Arabia", ["تبوك"]),
+    "Buraidah":    ("Saudi Arabia", ["بريدة", "buraydah"]),
+    "Hail":        ("Saudi Arabia", ["حائل", "hael"]),
+    "Dubai":       ("United Arab Emirates", ["دبي", "dubay"]),
+    "Abu Dhabi":   ("United Arab Emirates", ["أبوظبي", "ابوظبي", "أبو ظبي", "abudhabi"]),
+    "Sharjah":     ("United Arab Emirates", ["الشارقة", "sharjah city"]),
+    "Ajman":       ("United Arab Emirates", ["عجمان"]),
+    "Al Ain":      ("United Arab Emirates", ["العين", "alain"]),
+    "Kuwait City": ("Kuwait", ["الكويت", "مدينة الكويت", "kuwait"]),
+    "Doha":        ("Qatar", ["الدوحة", "الدوحه", "ad dawhah"]),
+    "Manama":      ("Bahrain", ["المنامة", "المنامه"]),
+    "Muscat":      ("Oman", ["مسقط", "masqat"]),
+    "Cairo":       ("Egypt", ["القاهرة", "القاهره", "al qahirah"]),
+    "Alexandria":  ("Egypt", ["الإسكندرية", "الاسكندرية", "alex", "iskandariyah"]),
+    "Giza":        ("Egypt", ["الجيزة", "الجيزه"]),
+    "Amman":       ("Jordan", ["عمان", "عمّان"]),
+    "Beirut":      ("Lebanon", ["بيروت", "bayrut"]),
+    "Casablanca":  ("Morocco", ["الدار البيضاء", "casa"]),
+    "Rabat":       ("Morocco", ["الرباط"]),
+}
+
+
+# ── Business taxonomy: (business_type, search_niche, tone) → synonyms ──────
+BUSINESS_TYPES = [
+    (("Dental Clinic", "dental clinic", "professional"),
+     ["dentist", "dental", "dental clinic", "dental center", "orthodontist", "teeth whitening",
+      "عيادة أسنان", "عيادة اسنان", "طبيب أسنان", "طبيب اسنان", "مركز أسنان", "تقويم أسنان", "أسنان", "اسنان"]),
+    (("Medical Clinic", "medical clinic", "professional"),
+     ["clinic", "medical clinic", "medical center", "polyclinic", "doctor",
+      "عيادة", "مستوصف", "مجمع طبي", "مركز طبي", "عيادة طبية"]),
+    (("Dermatology Clinic", "dermatology clinic", "professional"),
+     ["dermatology", "dermatologist", "skin clinic", "skin care clinic", "جلدية", "عيادة جلدية", "تجميل وجلدية"]),
+    (("Beauty Salon", "beauty salon", "friendly"),
+     ["salon", "beauty salon", "beauty center", "nail salon", "صالون", "صالون تجميل", "مشغل", "مشغل نسائي", "مركز تجميل"]),
+    (("Barbershop", "barbershop", "friendly"),
+     ["barber", "barbershop", "barber shop", "حلاق", "صالون حلاقة", "حلاقة رجالية"]),
+    (("Spa", "spa", "friendly"),
+     ["spa", "massage", "wellness center", "سبا", "مساج", "مركز مساج"]),
+    (("Gym", "gym", "urgent"),
+     ["gym", "fitness", "fitness center", "health club", "crossfit", "نادي رياضي", "نادي", "جيم", "صالة رياضية"]),
+    (("Restaurant", "restaurant", "friendly"),
+     ["restaurant", "diner", "eatery", "مطعم", "مطاعم"]),
+    (("Cafe", "cafe", "friendly"),
+     ["cafe", "café", "coffee shop", "coffee", "roastery", "مقهى", "كافيه", "كوفي", "محمصة"]),
+    (("Bakery", "bakery", "friendly"),
+     ["bakery", "patisserie", "pastry shop", "مخبز", "مخبزة", "حلويات", "معجنات"]),
+    (("Car Repair Workshop", "car repair", "professional"),
+     ["car repair", "auto repair", "garage", "mechanic", "car service", "ورشة", "ورشة سيارات", "صيانة سيارات", "ميكانيكي"]),
+    (("Car Wash", "car wash", "friendly"),
+     ["car wash", "car detailing", "مغسلة سيارات", "غسيل سيارات", "تلميع سيارات"]),
+    (("Real Estate Agency", "real estate agency", "professional"),
+     ["real estate", "realtor", "property agency", "عقار", "عقارات", "مكتب عقاري", "مكتب عقار"]),
+    (("Law Firm", "law firm", "professional"),
+     ["law firm", "lawyer", "attorney", "legal services", "محامي", "مكتب محاماة", "محاماة", "استشارات قانونية"]),
+    (("Accounting Firm", "accounting firm", "professional"),
+     ["accountant", "accounting", "bookkeeping", "audit firm", "محاسب", "مكتب محاسبة", "محاسبة"]),
+    (("Pharmacy", "pharmacy", "professional"),
+     ["pharmacy", "drugstore", "chemist", "صيدلية", "صيدليه"]),
+    (("Tutoring Center", "tutoring center", "friendly"),
+     ["tutoring", "tutor", "learning center", "training center", "معهد", "مركز تدريب", "دروس خصوصية", "مركز تعليمي"]),
+    (("Cleaning Services", "cleaning services", "professional"),
+     ["cleaning", "cleaning company", "cleaning services", "شركة تنظيف", "تنظيف", "خدمات تنظيف"]),
+    (("Photography Studio", "photography studio", "friendly"),
+     ["photographer", "photography", "photo studio", "مصور", "تصوير", "استوديو تصوير"]),
+    (("Flower Shop", "flower shop", "friendly"),
+     ["florist", "flower shop", "flowers", "محل ورد", "ورد", "زهور", "محل زهور"]),
+]
+
+
+# ── Normalization ──────────────────────────────────────────────────────────
+_NON_WORD = re.compile(r"[^\w\s]|_", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """
+    Case-folds and strips accents. For Arabic, NFKD splits hamza/madda off
+    the alef (أ إ آ → ا) and dropping combining marks removes the harakat;
+    taa marbuta, alef maqsura and tatweel are unified on top.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.replace("ة", "ه").replace("ى", "ي").replace("ـ", "")
+    text = _NON_WORD.sub(" ", text.casefold())
+    return " ".join(text.split())
+
+
+# Flattened at import: normalized alias → canonical entry
+_CITY_INDEX: dict[str, tuple[str, str]] = {}
+for _name, (_country, _aliases) in CITIES.items():
+    for _alias in [_name, *_aliases]:
+        _CITY_INDEX[normalize(_alias)] = (_name, _country)
+
+_BUSINESS_INDEX: dict[str, tuple[str, str, str]] = {}
+for _entry, _synonyms in BUSINESS_TYPES:
+    for _syn in [_entry[0], *_synonyms]:
+        _BUSINESS_INDEX.setdefault(normalize(_syn), _entry)
+# Longest synonyms first, so "dental clinic" beats "clinic" in containment matches
+_BUSINESS_KEYS_BY_LENGTH = sorted(_BUSINESS_INDEX, key=len, reverse=True)
+
+
+# ── Matching ───────────────────────────────────────────────────────────────
+# Not counted when deciding whether an alias makes up most of the input
+_FILLER_WORDS = {"a", "an", "the", "in", "at", "of", "for", "and", "my", "our", "في", "من", "و"}
+
+def _match_city(raw: str) -> tuple[tuple[str, str] | None, float]:
+    key = normalize(raw)
+    if key in _CITY_INDEX:
+        return _CITY_INDEX[key], 1.0
+    # "Riyadh, Saudi Arabia" / "حي النرجس الرياض" — first known alias among the words
+    words = key.split()
+    for n in (3, 2, 1):
+        for i in range(len(words) - n + 1):
+            candidate = " ".join(words[i:i + n])
+            if candidate in _CITY_INDEX:
+                return _CITY_INDEX[candidate], 0.9
+    return None, 0.0
+
+
+def _match_business(raw: str) -> tuple[tuple[str, str, str] | None, float]:
+    """
+    1.0 for an exact alias; 0.9 for a multi-word alias that makes up most of
+    the input ("dental clinic in riyadh"); a lone word inside a longer input
+    ("coffee machine repair") is only a hint and scores 0.5.
+    """
+    key = normalize(raw)
+    if key in _BUSINESS_INDEX:
+        return _BUSINESS_INDEX[key], 1.0
+    padded = f" {key} "
+    words = sum(1 for w in key.split() if w not in _FILLER_WORDS)
+    for synonym in _BUSINESS_KEYS_BY_LENGTH:
+        if f" {synonym} " in padded:
+            alias_words = len(synonym.split())
+            whole_phrase = alias_words > 1 and alias_words * 2 > words
+            return _BUSINESS_INDEX[synonym], 0.9 if whole_phrase else 0.5
+    return None, 0.0
+
+
+def canonical_city(raw: str) -> str | None:
+    """Canonical English city name for a known city or transliteration, else None."""
+    city, _ = _match_city(raw)
+    return city[0] if city else None
+
+
+def canonical_niche(raw: str) -> str | None:
+    """Taxonomy search_niche for an exact or whole-phrase alias, else None."""
+    business, confidence = _match_business(raw)
+    if business is None or confidence < 0.9:
+        return None
+    return business[1]
+
+
+def _record(outcome: str) -> None:
+    try:
+        redis_conn.hincrby(METRICS_KEY, outcome, 1)
+    except Exception:
+        pass   # Metrics must never break the pipeline
+
+
+def fast_path_stats() -> dict:
+    """Hit/miss counters and overall match rate."""
+    raw = {k.decode(): int(v) for k, v in redis_conn.hgetall(METRICS_KEY).items()}
+    hits = raw.get("hit", 0)
+    total = hits + sum(v for k, v in raw.items() if k.startswith("miss_"))
+    return {**raw, "match_rate": hits / total if total else 0.0}
+
+
+def clarify(job_input: dict) -> ClarifierOutput | None:
+    """
+    Builds ClarifierOutput from lookup tables, or returns None when the
+    input isn't recognized with at least settings.clarifier_fast_path_min_confidence.
+    """
+    city, city_conf = _match_city(job_input["target_city"])
+    if city is None:
+        _record("miss_city")
+        return None
+
+    business, business_conf = _match_business(job_input["business_type"])
+    if business is None:
+        _record("miss_business")
+        return None
+
+    city_name, country = city
+    locale = job_input.get("locale", "")
+    if locale in LOCALES:
+        locale_country, direction, dialect = LOCALES[locale]
+        if locale_country != country:
+            _record("miss_locale_conflict")   # e.g. ar-SA with "Dubai" — let the LLM decide
+            return None
+    else:
+        resolved = _COUNTRY_LOCALE.get((locale.split("-")[0].lower(), country))
+        if resolved is None:
+            _record("miss_locale")
+            return None
+        locale = resolved
+        _, direction, dialect = LOCALES[locale]
+
+    confidence = min(city_conf, business_conf)
+    if confidence < settings.clarifier_fast_path_min_confidence:
+        _record("miss_confidence")
+        return None
+
+    business_type, search_niche, tone = business
+    _record("hit")
+    return ClarifierOutput(
+        business_name=" ".join(job_input["business_name"].split()),
+        business_type=business_type,
+        target_city=city_name,
+        target_country=country,
+        search_niche=search_niche,
+        search_region=f"{city_name} {country}",
+        locale=locale,
+        direction=direction,
+        dialect=dialect,
+        tone=tone,
+        usp=None,
+        additional_notes=None,
+    )
+
+
+# ── Examples (python -m app.pipeline.clarifier_rules check) ────────────────
+# business_type input → expected business_type on the fast path (None = LLM)
+EXAMPLES = [
+    ("dentist",                  "Dental Clinic"),
+    ("Dental Clinic",            "Dental Clinic"),
+    ("عيادة أسنان",              "Dental Clinic"),
+    ("dental clinic in riyadh",  "Dental Clinic"),
+    ("teeth whitening center",   "Dental Clinic"),
+    ("coffee shop",              "Cafe"),
+    ("مطعم",                     "Restaurant"),
+    ("car wash",                 "Car Wash"),
+    ("veterinary clinic",        None),
+    ("coffee machine repair",    None),
+    ("fitness equipment store",  None),
+    ("pet grooming salon",       None),
+    ("ورشة خياطة",               None),
+    ("car repair tools shop",    None),
+]
+
+
+def check_examples() -> list[str]:
+    """Mismatches between EXAMPLES and what the fast path would do."""
+    failures = []
+    for raw, expected in EXAMPLES:
+        business, confidence = _match_business(raw)
+        got = business[0] if business and confidence >= settings.clarifier_fast_path_min_confidence else None
+        if got != expected:
+            failures.append(f"{raw!r}: expected {expected}, got {got} ({confidence:.2f})")
+    return failures
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["check"]:
+        failures = check_examples()
+        for failure in failures:
+            print(f"❌ {failure}")
+        print(f"{'✅' if not failures else '❌'} {len(EXAMPLES) - len(failures)}/{len(EXAMPLES)} examples")
+        sys.exit(1 if failures else 0)
+    else:
+        print("Usage: python -m app.pipeline.clarifier_rules check")
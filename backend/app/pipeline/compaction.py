@@ -0,0 +1,233 @@
+"""
+app/pipeline/compaction.py
+──────────────────────────
+Hot/cold compaction: moves old payloads out of Postgres into the archive.
+
+After ARCHIVE_AFTER_DAYS, for jobs that are no longer running:
+  1. job_steps     — legacy rows that still embed full input/output JSON are
+                     rewritten to {"ref", "summary"}; the payload becomes an
+                     archived artifact.
+  2. step_artifacts — `data` is written to a compressed blob keyed by its ref
+                     and nulled; `archive_key` points at the blob.
+  3. landing_page_variants, and landing_page_jobs that never published
+     (failed / cancelled) — `structure` is replaced by `structure_ref` plus
+     a small `structure_summary`. Completed jobs keep `structure`: the
+     frontend reads published pages straight from Supabase (p/[id] and the
+     useJobStream poll), not through rehydration.
+
+Nothing is lost from the API's point of view: get_artifact() and
+rehydrate_structure() read archived payloads back transparently, so status,
+variants and resume all keep working on compacted jobs.
+
+A hot copy is only dropped after its blob has been read back from the store
+and matched (archive.archive_payload); a row whose blob fails that check is
+left as it was and retried on the next pass. Compaction refuses to run
+against a store that is not durable (see archive.py) — on Render's local
+disk the blobs would vanish on the next deploy.
+
+Each pass handles at most ARCHIVE_BATCH_SIZE rows per table and is safe to
+re-run (blobs are content-addressed, updates are idempotent). Run it from
+cron, or enqueue "app.pipeline.compaction.compact" on the RQ queue.
+
+Required columns (Supabase SQL editor), besides those in artifacts.py:
+    alter table landing_page_jobs add column if not exists structure_ref text;
+    alter table landing_page_jobs add column if not exists structure_summary jsonb;
+    alter table landing_page_jobs add column if not exists archived_at timestamptz;
+    alter table landing_page_variants add column if not exists archived_at timestamptz;
+
+    python -m app.pipeline.compaction run
+"""
+
+from datetime import datetime, timezone, timedelta
+
+import orjson
+
+from app.config import settings
+from app.database import get_supabase_client
+from app.pipeline.archive import ArchiveWriteError, archive_payload, get_archive_store
+from app.pipeline.artifacts import artifact_ref, _canonical_bytes
+
+
+COMPACTABLE_JOB_STATUSES = ("failed", "cancelled")   # Never "completed": published pages are read in place
+
+
+# ── Summaries (what stays in Postgres) ─────────────────────────────────────
+def summarize_payload(data, raw: bytes) -> dict:
+    summary = {"size_bytes": len(raw)}
+    if isinstance(data, dict):
+        summary["keys"] = sorted(data)[:20]
+    return summary
+
+
+def summarize_structure(structure: dict, raw: bytes) -> dict:
+    return {
+        "brand_name": structure.get("brand_name"),
+        "locale":     structure.get("locale"),
+        "blocks":     [block.get("id") for block in structure.get("layout", [])],
+        "size_bytes": len(raw),
+    }
+
+
+def _archive_artifact(supabase, data, now: str) -> tuple[str, bytes]:
+    """
+    Archives a payload as an artifact without a hot copy. An existing
+    step_artifacts row for the same content is left alone — either it still
+    has `data`, or a later pass (or an earlier one) archives it.
+    """
+    raw = _canonical_bytes(data)
+    ref = artifact_ref(data)
+    archive_payload(ref, raw)
+    supabase.table("step_artifacts").upsert(
+        {
+            "ref":         ref,
+            "data":        None,
+            "archive_key": ref,
+            "size_bytes":  len(raw),
+            "archived_at": now,
+        },
+        on_conflict="ref",
+        ignore_duplicates=True,
+    ).execute()
+    return ref, raw
+
+
+# ── Passes ─────────────────────────────────────────────────────────────────
+def _compact_legacy_steps(supabase, cutoff: str, now: str, limit: int) -> tuple[int, int]:
+    """Rewrites job_steps rows that predate artifact refs and still hold full payloads."""
+    rows = (
+        supabase.table("job_steps")
+        .select("id, input_data, output_data")
+        .lt("created_at", cutoff)
+        .is_("output_data->>ref", "null")
+        .is_("output_data->summary", "null")   # Rewritten rows carry a summary
+        .limit(limit)
+        .execute()
+    ).data or []
+
+    done = failed = 0
+    for row in rows:
+        update = {}
+        try:
+            for column in ("input_data", "output_data"):
+                data = row.get(column)
+                if data is None or (isinstance(data, dict) and ("ref" in data or "refs" in data)):
+                    continue
+                ref, raw = _archive_artifact(supabase, data, now)
+                update[column] = {"ref": ref, "summary": summarize_payload(data, raw)}
+        except ArchiveWriteError as e:
+            print(f"⚠️  Compaction skipped job_steps {row['id']}: {e}")
+            failed += 1
+            continue
+        if "output_data" not in update:
+            update["output_data"] = {"ref": None, "summary": {}}   # Nothing to archive; don't select it again
+        supabase.table("job_steps").update(update).eq("id", row["id"]).execute()
+        done += 1
+    return done, failed
+
+
+def _compact_artifacts(supabase, cutoff: str, now: str, limit: int) -> tuple[int, int, int, int]:
+    rows = (
+        supabase.table("step_artifacts")
+        .select("ref, data")
+        .lt("created_at", cutoff)
+        .is_("archive_key", "null")
+        .limit(limit)
+        .execute()
+    ).data or []
+
+    done = failed = raw_bytes = blob_bytes = 0
+    for row in rows:
+        raw = _canonical_bytes(row["data"])
+        try:
+            blob_bytes += archive_payload(row["ref"], raw)
+        except ArchiveWriteError as e:
+            print(f"⚠️  Compaction kept step_artifacts {row['ref']} hot: {e}")
+            failed += 1
+            continue
+        raw_bytes += len(raw)
+        # Verified blob first, then drop the hot copy: a crash in between only leaves both
+        supabase.table("step_artifacts").update({
+            "data":        None,
+            "archive_key": row["ref"],
+            "archived_at": now,
+        }).eq("ref", row["ref"]).execute()
+        done += 1
+    return done, failed, raw_bytes, blob_bytes
+
+
+def _compact_structures(supabase, table: str, cutoff: str, now: str, limit: int) -> tuple[int, int]:
+    query = (
+        supabase.table(table)
+        .select("*")
+        .lt("created_at", cutoff)
+        .is_("archived_at", "null")
+        .not_.is_("structure", "null")
+    )
+    if table == "landing_page_jobs":
+        query = query.in_("status", list(COMPACTABLE_JOB_STATUSES))
+    rows = query.limit(limit).execute().data or []
+
+    done = failed = 0
+    for row in rows:
+        try:
+            ref, raw = _archive_artifact(supabase, row["structure"], now)
+        except ArchiveWriteError as e:
+            print(f"⚠️  Compaction kept a {table} structure hot: {e}")
+            failed += 1
+            continue
+        update = {"structure": None, "structure_ref": ref, "archived_at": now}
+        if table == "landing_page_jobs":
+            update["structure_summary"] = summarize_structure(row["structure"], raw)
+        key = ("job_id", row["job_id"]) if table == "landing_page_variants" else ("id", row["id"])
+        q = supabase.table(table).update(update).eq(*key)
+        if table == "landing_page_variants":
+            q = q.eq("variant", row["variant"])
+        q.execute()
+        done += 1
+    return done, failed
+
+
+def compact(older_than_days: int | None = None, batch_size: int | None = None) -> dict:
+    """
+    Runs one compaction pass and returns per-table counts (`archive_failures`:
+    rows left hot because their blob did not read back). Raises RuntimeError
+    if the archive store is not durable.
+    """
+    if not getattr(get_archive_store(), "durable", True):
+        raise RuntimeError(
+            f"Archive store {settings.archive_store!r} is not durable; refusing to drop hot copies "
+            "(set ARCHIVE_STORE to a shared store, or ARCHIVE_LOCAL_DURABLE for a shared persistent disk)"
+        )
+
+    supabase   = get_supabase_client()
+    days       = settings.archive_after_days if older_than_days is None else older_than_days
+    limit      = batch_size or settings.archive_batch_size
+    now_dt     = datetime.now(timezone.utc)
+    now        = now_dt.isoformat()
+    cutoff     = (now_dt - timedelta(days=days)).isoformat()
+
+    steps, steps_failed = _compact_legacy_steps(supabase, cutoff, now, limit)
+    artifacts, artifacts_failed, raw_bytes, blob_bytes = _compact_artifacts(supabase, cutoff, now, limit)
+    jobs, jobs_failed         = _compact_structures(supabase, "landing_page_jobs", cutoff, now, limit)
+    variants, variants_failed = _compact_structures(supabase, "landing_page_variants", cutoff, now, limit)
+
+    return {
+        "cutoff":              cutoff,
+        "job_steps":           steps,
+        "step_artifacts":      artifacts,
+        "jobs":                jobs,
+        "variants":            variants,
+        "archived_raw_bytes":  raw_bytes,
+        "archived_blob_bytes": blob_bytes,
+        "archive_failures":    steps_failed + artifacts_failed + jobs_failed + variants_failed,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["run"]:
+        days = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        print(f"🧊 Compaction: {orjson.dumps(compact(days)).decode()}")
+    else:
+        print("Usage: python -m app.pipeline.compaction run [older_than_days]")
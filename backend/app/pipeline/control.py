@@ -0,0 +1,159 @@
+"""
+app/pipeline/control.py
+───────────────────────
+Per-job pipeline control: every step enqueue goes through `enqueue_step`,
+running steps can be cancelled, and every job runs against a deadline.
+
+Cancellation (POST /api/jobs/{job_id}/cancel):
+  1. `job:{id}:cancelled` is set in Redis
+  2. queued/scheduled RQ jobs of the pipeline are deleted — enqueue_step
+     records every RQ job id under `job:{id}:rq_jobs` for this
+  3. running steps notice the flag between external calls (check_cancelled)
+     and in-flight LLM requests are cancelled by the gateway (llm.py);
+     enqueue_step refuses to enqueue the next step
+  4. the API publishes the terminal `cancelled` status
+
+Tasks catch JobCancelled and return quietly: no failure status, no retry.
+
+Deadlines:
+  A job gets an end-to-end deadline (epoch seconds, JOB_SLA_SECONDS from
+  creation) that every step receives as its `deadline` kwarg and passes on
+  to the next. enqueue_step caps the RQ job timeout by what is left, and the
+  LLM gateway sizes every provider call (retries and corrections included)
+  from what is left at the moment it is made. When the budget runs low,
+  steps degrade in a fixed order instead of overrunning:
+    - < DEADLINE_SKIP_RESEARCH_SECONDS : no Tavily; closest cached research,
+                                         else empty research
+    - < DEADLINE_FAST_MODEL_SECONDS    : LLM calls use LLM_FALLBACK_MODEL
+    - < LLM_CALL_TIMEOUT_SECONDS       : LLM calls get a shorter timeout; one
+                                         that fires is `call_timeout:{step}`,
+                                         not a gemini breaker failure
+  Every degradation is recorded per job (`job:{id}:degradations`), stored on
+  the completed job and counted in the `deadline:degradations` hash.
+
+Required column (Supabase SQL editor):
+    alter table landing_page_jobs add column if not exists degradations jsonb;
+"""
+
+import time
+from datetime import timedelta
+
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+
+from app.config import settings
+from app.redis_client import redis_conn, task_queue
+
+
+CONTROL_TTL_SECONDS = 24 * 3600
+DEGRADATION_METRICS_KEY = "deadline:degradations"
+RQ_TIMEOUT_GRACE_SECONDS = 60   # Safety net above the budget; degradation should finish well before
+_REMOVABLE = {JobStatus.QUEUED, JobStatus.SCHEDULED, JobStatus.DEFERRED}
+
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job has been cancelled."""
+
+
+def _cancel_key(job_id: str) -> str:
+    return f"job:{job_id}:cancelled"
+
+
+def _rq_jobs_key(job_id: str) -> str:
+    return f"job:{job_id}:rq_jobs"
+
+
+def _degradations_key(job_id: str) -> str:
+    return f"job:{job_id}:degradations"
+
+
+# ── Cancellation ───────────────────────────────────────────────────────────
+def is_cancelled(job_id: str) -> bool:
+    return bool(redis_conn.exists(_cancel_key(job_id)))
+
+
+def check_cancelled(job_id: str) -> None:
+    if is_cancelled(job_id):
+        raise JobCancelled(job_id)
+
+
+def request_cancel(job_id: str) -> int:
+    """Flags the job and deletes its not-yet-running RQ jobs. Returns how many were removed."""
+    redis_conn.set(_cancel_key(job_id), 1, ex=CONTROL_TTL_SECONDS)
+
+    removed = 0
+    for rq_id in redis_conn.smembers(_rq_jobs_key(job_id)):
+        try:
+            job = Job.fetch(rq_id.decode(), connection=redis_conn)
+        except NoSuchJobError:
+            continue
+        if job.get_status() in _REMOVABLE:
+            job.delete()   # Drops it from the queue and the scheduled/deferred registries
+            removed += 1
+    redis_conn.delete(_rq_jobs_key(job_id))
+    return removed
+
+
+# ── Deadlines ──────────────────────────────────────────────────────────────
+def new_deadline() -> float:
+    return time.time() + settings.job_sla_seconds
+
+
+def remaining(deadline: float | None) -> float:
+    """Seconds left before the job's deadline (infinite without one)."""
+    return float("inf") if deadline is None else deadline - time.time()
+
+
+def call_timeout(deadline: float | None, cap: float) -> float:
+    """Timeout for one provider call: what is left of the budget, within [floor, cap]."""
+    return max(settings.deadline_min_call_seconds, min(cap, remaining(deadline)))
+
+
+def record_degradation(job_id: str, degradation: str) -> None:
+    pipe = redis_conn.pipeline()
+    pipe.sadd(_degradations_key(job_id), degradation)
+    pipe.expire(_degradations_key(job_id), CONTROL_TTL_SECONDS)
+    pipe.hincrby(DEGRADATION_METRICS_KEY, degradation.split(":")[0], 1)
+    pipe.execute()
+
+
+def degradations(job_id: str) -> list[str]:
+    return sorted(d.decode() for d in redis_conn.smembers(_degradations_key(job_id)))
+
+
+def degradation_stats() -> dict:
+    return {k.decode(): int(v) for k, v in redis_conn.hgetall(DEGRADATION_METRICS_KEY).items()}
+
+
+def llm_budget(job_id: str, deadline: float | None, step: str) -> dict:
+    """generate_json kwargs (model, deadline) for the time left on this job."""
+    options = {"deadline": deadline}
+    if remaining(deadline) < settings.deadline_fast_model_seconds and settings.llm_fallback_model:
+        options["model"] = settings.llm_fallback_model
+        record_degradation(job_id, f"fast_model:{step}")
+    return options
+
+
+# ── Enqueue ────────────────────────────────────────────────────────────────
+def enqueue_step(job_id: str, task, kwargs: dict, *, job_timeout: int = 300,
+                 delay: float | None = None) -> Job | None:
+    """
+    Enqueues one pipeline step (function or dotted path) for `job_id`, or
+    nothing if the job was cancelled. `delay` schedules it (auto-resume backoff).
+    With a `deadline` in kwargs, the RQ timeout shrinks with the budget.
+    """
+    if is_cancelled(job_id):
+        return None
+    if kwargs.get("deadline") is not None:
+        left = remaining(kwargs["deadline"]) - (delay or 0)
+        job_timeout = int(min(job_timeout, max(RQ_TIMEOUT_GRACE_SECONDS, left + RQ_TIMEOUT_GRACE_SECONDS)))
+    if delay:
+        job = task_queue.enqueue_in(timedelta(seconds=delay), task, kwargs=kwargs, job_timeout=job_timeout)
+    else:
+        job = task_queue.enqueue(task, kwargs=kwargs, job_timeout=job_timeout)
+
+    pipe = redis_conn.pipeline()
+    pipe.sadd(_rq_jobs_key(job_id), job.id)
+    pipe.expire(_rq_jobs_key(job_id), CONTROL_TTL_SECONDS)
+    pipe.execute()
+    return job
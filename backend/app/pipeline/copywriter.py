@@ -0,0 +1,105 @@
+"""
+app/pipeline/copywriter.py
+──────────────────────────
+Section-level copy generation for the copywriter step.
+
+The page copy is split into independent sections (hero, features, benefits,
+cta). Each section is its own small LLM call that shares the same
+clarifier/researcher context, is validated against its own sub-model of
+LandingPageContent, and is retried on its own. Sections run concurrently,
+so the slowest section — not the sum — sets the step's wall time.
+
+Prompts come from the registry in app/pipeline/prompts.py.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import BaseModel, ValidationError
+
+from app.pipeline.llm import generate_json
+from app.pipeline.prompts import COPYWRITER_SECTION, COPY_SHAPES
+from app.schemas.copywriter import (
+    LandingPageContent,
+    HeroCopy,
+    FeaturesCopy,
+    BenefitsCopy,
+    CTACopy,
+)
+
+
+MAX_SECTION_ATTEMPTS = 2
+
+
+# ── Section output models ──────────────────────────────────────────────────
+SECTION_MODELS: dict[str, type[BaseModel]] = {
+    "hero":     HeroCopy,
+    "features": FeaturesCopy,
+    "benefits": BenefitsCopy,
+    "cta":      CTACopy,
+}
+
+
+COPY_SECTIONS = ("hero", "features", "benefits", "cta")
+
+
+def build_copy_context(clarifier_output: dict, researcher_output: dict, angle: str | None = None) -> dict:
+    """Shared inputs for every section prompt. `angle` seeds an A/B variant."""
+    return {
+        "angle":       angle,
+        "lang":        "Arabic" if clarifier_output["direction"] == "rtl" else "English",
+        "dialect":     clarifier_output.get("dialect", "Modern Standard Arabic"),
+        "tone":        clarifier_output.get("tone", "professional"),
+        "biz_name":    clarifier_output["business_name"],
+        "biz_type":    clarifier_output["business_type"],
+        "city":        clarifier_output["target_city"],
+        "usp":         clarifier_output.get("usp") or "quality and trust",
+        "pain_points": "\n".join(f"- {p}" for p in researcher_output.get("local_pain_points", [])),
+        "hooks":       "\n".join(f"- {h}" for h in researcher_output.get("cultural_hooks", [])),
+    }
+
+
+def build_section_prompt(section: str, ctx: dict) -> str:
+    shape = COPY_SHAPES[section].render(lang=ctx["lang"])
+    angle_block = f"\nCREATIVE ANGLE: {ctx['angle']}\n" if ctx["angle"] else ""
+    return COPYWRITER_SECTION.render(
+        section=section, shape=shape, angle_block=angle_block,
+        **{k: v for k, v in ctx.items() if k != "angle"},
+    )
+
+
+# ── Generation ─────────────────────────────────────────────────────────────
+def generate_section(section: str, ctx: dict, job_id: str | None = None,
+                     llm_options: dict | None = None) -> BaseModel:
+    """
+    Generates and validates one section, retrying it alone on malformed
+    output. Raises the last error once MAX_SECTION_ATTEMPTS is exhausted.
+    `job_id` lets a cancellation abort the in-flight call; `llm_options`
+    (model, deadline) come from the job's deadline budget.
+    """
+    model_cls = SECTION_MODELS[section]
+    prompt = build_section_prompt(section, ctx)
+
+    last_error = None
+    for _ in range(MAX_SECTION_ATTEMPTS):
+        try:
+            return generate_json(prompt, model_cls, step=f"copywriter.{section}", job_id=job_id,
+                                 **(llm_options or {}))
+        except ValidationError as e:
+            last_error = e
+    raise ValueError(f"{section} section failed validation: {last_error}")
+
+
+def generate_landing_copy(clarifier_output: dict, researcher_output: dict,
+                          angle: str | None = None, job_id: str | None = None,
+                          llm_options: dict | None = None) -> LandingPageContent:
+    """Runs all section generators concurrently and merges the results."""
+    ctx = build_copy_context(clarifier_output, researcher_output, angle)
+
+    with ThreadPoolExecutor(max_workers=len(COPY_SECTIONS)) as pool:
+        futures = {s: pool.submit(generate_section, s, ctx, job_id, llm_options) for s in COPY_SECTIONS}
+        sections = {s: f.result() for s, f in futures.items()}
+
+    merged = {}
+    for section in COPY_SECTIONS:
+        merged.update(sections[section].model_dump())
+    return LandingPageContent.model_validate(merged)
@@ -0,0 +1,188 @@
+"""
+app/pipeline/fonts.py
+─────────────────────
+Per-page font subsetting for published landing pages.
+
+Every page is set in Cairo (ThemeConfig.font_family), but a page only uses a
+few hundred of its glyphs. `build_page_assets` collects the page's exact text
+from every ComponentBlock.data, subsets the Cairo source font to those
+characters (Arabic shaping features kept) and returns the page's assets:
+
+  - font_ref     : SHA-256 of the WOFF2 subset
+  - font_url     : absolute public URL of the subset in Supabase Storage
+                   (bucket FONT_BUCKET, served with a one-year Cache-Control)
+  - critical_css : a few hundred bytes of @font-face + base rules that the
+                   page inlines in <head>
+
+The subset is uploaded as raw bytes under its content hash, so pages with the
+same character set share one font. Subsetting is skipped entirely on a
+repeat character set: `fontsubset:{sha256}` maps it to the existing ref.
+
+Subsetting never runs on the job's critical path: page_assets_task
+(app/pipeline/tasks.py) adds the assets to a page after it has completed.
+
+The published page (frontend/src/app/p/[id]/page.tsx) inlines `critical_css`,
+preloads `font_url` and drops the full Cairo font for pages that have assets;
+pages without them render as before. FONT_SUBSETTING is off by default because
+it needs deployment setup: the worker refuses to start without fonttools +
+brotli (WOFF2) and the Cairo variable TTF at FONT_SOURCE_PATH — see
+check_font_setup().
+
+Required bucket (Supabase dashboard → Storage):
+    public bucket named FONT_BUCKET (default "page-fonts")
+"""
+
+import hashlib
+import io
+import os
+import string
+
+from app.config import settings
+from app.redis_client import redis_conn
+from app.pipeline.resilience import guard
+
+
+FONT_FAMILY = "Cairo"
+FONT_CACHE_SECONDS = 365 * 24 * 3600   # Content-addressed: a URL never changes content
+SUBSET_KEY_TTL_SECONDS = 7 * 24 * 3600
+
+# Always kept: the frontend renders some chrome (numbers, punctuation) itself
+BASE_CHARACTERS = string.printable.strip() + " ،؛؟٪٠١٢٣٤٥٦٧٨٩ـ"
+
+_source_font: bytes | None = None
+
+
+def _subset_key(characters: str) -> str:
+    digest = hashlib.sha256(f"{settings.font_source_path}\n{characters}".encode("utf-8")).hexdigest()
+    return f"fontsubset:{digest}"
+
+
+# ── Startup check ──────────────────────────────────────────────────────────
+def check_font_setup() -> None:
+    """Raises RuntimeError if subsetting is enabled but cannot run."""
+    if not settings.font_subsetting:
+        return
+    if not os.path.isfile(settings.font_source_path):
+        raise RuntimeError(
+            f"FONT_SUBSETTING is on but the source font {settings.font_source_path!r} is missing"
+        )
+    try:
+        import brotli  # noqa: F401
+        from fontTools import subset  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(f"FONT_SUBSETTING is on but {e.name} is not installed") from e
+
+
+# ── Page text ──────────────────────────────────────────────────────────────
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _strings(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _strings(v)
+
+
+def page_characters(structure: dict) -> str:
+    """Every character the page can render, sorted (the subset's cache key)."""
+    chars = set(BASE_CHARACTERS)
+    chars.update(structure.get("brand_name", ""))
+    for block in structure.get("layout", []):
+        for text in _strings(block.get("data", {})):
+            chars.update(text)
+    return "".join(sorted(c for c in chars if not c.isspace() or c == " "))
+
+
+# ── Subsetting ─────────────────────────────────────────────────────────────
+def _load_source_font() -> bytes:
+    global _source_font
+    if _source_font is None:
+        with open(settings.font_source_path, "rb") as f:
+            _source_font = f.read()
+    return _source_font
+
+
+def subset_font(characters: str) -> bytes:
+    """WOFF2 of the source font restricted to `characters`."""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]   # Arabic joining forms and ligatures come from GSUB
+    options.name_IDs = []
+    options.notdef_outline = True
+    options.drop_tables += ["DSIG"]
+
+    font = TTFont(io.BytesIO(_load_source_font()))
+    subsetter = subset.Subsetter(options=options)
+    subsetter.populate(text=characters)
+    subsetter.subset(font)
+
+    out = io.BytesIO()
+    font.flavor = "woff2"
+    font.save(out)
+    return out.getvalue()
+
+
+# ── Storage ────────────────────────────────────────────────────────────────
+def _font_path(font_ref: str) -> str:
+    return f"{font_ref}.woff2"
+
+
+def font_url(font_ref: str) -> str:
+    """Absolute public URL of a stored subset (any origin can load it)."""
+    return f"{settings.supabase_url.rstrip('/')}/storage/v1/object/public/{settings.font_bucket}/{_font_path(font_ref)}"
+
+
+def store_font(supabase, woff2: bytes) -> str:
+    """Uploads a subset under its content hash and returns the ref."""
+    font_ref = hashlib.sha256(woff2).hexdigest()
+    with guard("supabase"):
+        supabase.storage.from_(settings.font_bucket).upload(_font_path(font_ref), woff2, {
+            "content-type":  "font/woff2",
+            "cache-control": str(FONT_CACHE_SECONDS),
+            "upsert":        "true",   # Same ref, same bytes
+        })
+    return font_ref
+
+
+# ── Assets ─────────────────────────────────────────────────────────────────
+def critical_css(structure: dict, font_ref: str) -> str:
+    theme = structure.get("theme", {})
+    direction = "rtl" if structure.get("rtl") else "ltr"
+    return (
+        f'@font-face{{font-family:"{FONT_FAMILY}";font-style:normal;font-weight:200 1000;'
+        f'font-display:swap;src:url("{font_url(font_ref)}") format("woff2")}}'
+        f':root{{--etm-primary:{theme.get("primary_color", "#C8A96E")};'
+        f'--etm-radius:{theme.get("border_radius", "12px")}}}'
+        f'body{{margin:0;font-family:"{FONT_FAMILY}",system-ui,sans-serif;direction:{direction}}}'
+    )
+
+
+def build_page_assets(supabase, structure: dict) -> dict | None:
+    """
+    Subsetted font + critical CSS for a page structure, or None when the page
+    is not set in Cairo or subsetting is disabled.
+    """
+    theme = structure.get("theme", {})
+    if not settings.font_subsetting or theme.get("font_family", FONT_FAMILY) != FONT_FAMILY:
+        return None
+
+    characters = page_characters(structure)
+    key = _subset_key(characters)
+    cached = redis_conn.get(key)
+    if cached:
+        font_ref = cached.decode()
+    else:
+        font_ref = store_font(supabase, subset_font(characters))
+        redis_conn.set(key, font_ref, ex=SUBSET_KEY_TTL_SECONDS)
+
+    return {
+        "font_family":  FONT_FAMILY,
+        "font_ref":     font_ref,
+        "font_url":     font_url(font_ref),
+        "critical_css": critical_css(structure, font_ref),
+    }
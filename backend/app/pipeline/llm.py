@@ -0,0 +1,328 @@
+"""
+app/pipeline/llm.py
+───────────────────
+LLM gateway. Every pipeline LLM call goes through `generate_json`.
+
+Hedged requests (tail-latency control):
+  If the primary call hasn't returned after the configured percentile of
+  recent latency for that step, a duplicate is fired — to the fallback
+  model when one is configured. The first VALID response wins and the other
+  request is cancelled. Hedges are capped globally per minute (shared via
+  Redis across all worker processes) so a provider slowdown can't double
+  our traffic.
+
+Calls are wrapped in the gemini circuit breaker + bulkhead (resilience.py)
+and bounded by LLM_CALL_TIMEOUT_SECONDS, or by what is left of the job's
+deadline — recomputed before every provider call, so hedges and correction
+calls never run past it. A call cut short by the deadline raises
+CallBudgetExceeded, which does not count against the gemini breaker (a
+backed-up queue is not a Gemini outage) and is recorded as the job's
+`call_timeout:{step}` degradation.
+
+Schema-constrained output:
+  The target pydantic model is passed to Gemini as `response_schema`, so the
+  provider decodes against it (field names, types, list lengths). Responses
+  that still fail validation go through local repair (repair.py); only if
+  required fields are missing after that is a correction call made, asking
+  for just those fields — never a rerun of the whole step.
+
+Metrics (Redis hash `llm:metrics:{step}`):
+  calls, hedges, hedge_wins, hedges_capped,
+  validation_failures, repaired, corrections, correction_failures
+"""
+
+import asyncio
+import concurrent.futures
+import re
+import threading
+import time
+
+import orjson
+from pydantic import BaseModel, ValidationError
+
+from app.config import settings
+from app.redis_client import redis_conn
+from app.pipeline.control import JobCancelled, call_timeout, is_cancelled, record_degradation
+from app.pipeline.prompts import LLM_CORRECTION
+from app.pipeline.repair import correction_model, repair
+from app.pipeline.resilience import CallBudgetExceeded, async_guard
+
+
+LATENCY_WINDOW       = 200   # samples kept per step
+MIN_LATENCY_SAMPLES  = 20    # below this, use the configured default delay
+_DELAY_CACHE_SECONDS = 30
+MAX_CORRECTION_CONTEXT_CHARS = 4000
+CANCEL_POLL_SECONDS  = 0.5
+
+_client = None
+_loop    = None
+_client_lock = threading.Lock()
+_delay_cache: dict[str, tuple[float, float]] = {}   # step → (computed_at, delay)
+
+
+# ── Shared Utility ─────────────────────────────────────────────────────────
+def clean_llm_json(raw: str) -> str:
+    """Strip markdown code fences and leading/trailing whitespace."""
+    raw = raw.strip()
+    raw = re.sub(r"^```(?:json)?\s*", "", raw)
+    raw = re.sub(r"\s*```$", "", raw)
+    return raw.strip()
+
+
+def _parse_json(raw: str):
+    """Lenient parse for repair: falls back to the outermost {...} span, else None."""
+    raw = clean_llm_json(raw or "")
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        start, end = raw.find("{"), raw.rfind("}")
+        if start == -1 or end <= start:
+            return None
+        try:
+            return orjson.loads(raw[start:end + 1])
+        except orjson.JSONDecodeError:
+            return None
+
+
+def _get_client():
+    """One Gemini client per process, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                _client = genai.Client(api_key=settings.gemini_api_key)
+    return _client
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """
+    One long-lived event loop per process, on a daemon thread. Sync callers
+    (RQ tasks, copywriter section threads) submit coroutines to it, so the
+    async client and its connections are reused instead of rebuilt per call.
+    """
+    global _loop
+    if _loop is None:
+        with _client_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+# ── Latency tracking ───────────────────────────────────────────────────────
+def _latency_key(step: str) -> str:
+    return f"llm:latency:{step}"
+
+
+def _metrics_key(step: str) -> str:
+    return f"llm:metrics:{step}"
+
+
+def _record_latency(step: str, seconds: float) -> None:
+    pipe = redis_conn.pipeline()
+    pipe.lpush(_latency_key(step), f"{seconds:.3f}")
+    pipe.ltrim(_latency_key(step), 0, LATENCY_WINDOW - 1)
+    pipe.execute()
+
+
+def _incr_metric(step: str, name: str) -> None:
+    redis_conn.hincrby(_metrics_key(step), name, 1)
+
+
+def _hedge_delay(step: str) -> float:
+    """Configured percentile of recent latency for this step, cached briefly."""
+    cached = _delay_cache.get(step)
+    now = time.monotonic()
+    if cached and now - cached[0] < _DELAY_CACHE_SECONDS:
+        return cached[1]
+
+    samples = sorted(float(x) for x in redis_conn.lrange(_latency_key(step), 0, -1))
+    if len(samples) < MIN_LATENCY_SAMPLES:
+        delay = settings.llm_hedge_default_delay_seconds
+    else:
+        idx = min(len(samples) - 1, int(len(samples) * settings.llm_hedge_percentile))
+        delay = samples[idx]
+    delay = max(delay, settings.llm_hedge_min_delay_seconds)
+
+    _delay_cache[step] = (now, delay)
+    return delay
+
+
+def _acquire_hedge_slot() -> bool:
+    """Global per-minute hedge cap shared by every worker process."""
+    cap = settings.llm_hedge_max_per_minute
+    if cap <= 0:
+        return False
+    key = f"llm:hedges:{int(time.time() // 60)}"
+    pipe = redis_conn.pipeline()
+    pipe.incr(key)
+    pipe.expire(key, 120)
+    count = pipe.execute()[0]
+    return count <= cap
+
+
+def hedge_stats(step: str) -> dict:
+    """Hedge rate and win rate for a step, from the shared Redis counters."""
+    raw = {k.decode(): int(v) for k, v in redis_conn.hgetall(_metrics_key(step)).items()}
+    calls, hedges, wins = raw.get("calls", 0), raw.get("hedges", 0), raw.get("hedge_wins", 0)
+    return {
+        **raw,
+        "hedge_rate": hedges / calls if calls else 0.0,
+        "win_rate":   wins / hedges if hedges else 0.0,
+    }
+
+
+def validation_stats(step: str) -> dict:
+    """How often responses failed validation, and how they were recovered."""
+    raw = {k.decode(): int(v) for k, v in redis_conn.hgetall(_metrics_key(step)).items()}
+    calls    = raw.get("calls", 0)
+    failures = raw.get("validation_failures", 0)
+    return {
+        "calls":                   calls,
+        "validation_failures":     failures,
+        "repaired":                raw.get("repaired", 0),
+        "corrections":             raw.get("corrections", 0),
+        "correction_failures":     raw.get("correction_failures", 0),
+        "validation_failure_rate": failures / calls if calls else 0.0,
+    }
+
+
+# ── Calls ──────────────────────────────────────────────────────────────────
+async def _generate(model: str, prompt: str, schema_cls: type[BaseModel],
+                    deadline: float | None) -> str:
+    from google.genai import types
+
+    timeout = call_timeout(deadline, settings.llm_call_timeout_seconds)
+    # Only provider errors/timeouts trip the breaker — validation happens outside
+    async with async_guard("gemini"):
+        try:
+            response = await asyncio.wait_for(
+                _get_client().aio.models.generate_content(
+                    model=model,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        response_mime_type="application/json",
+                        response_schema=schema_cls,
+                    ),
+                ),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            if timeout < settings.llm_call_timeout_seconds:
+                raise CallBudgetExceeded(f"LLM call cut off by the job deadline after {timeout:.1f}s") from None
+            raise
+    return response.text
+
+
+async def _correct(model: str, model_cls: type[BaseModel], step: str, raw: str, repaired,
+                   deadline: float | None) -> BaseModel:
+    """One extra call that asks only for the fields repair could not recover."""
+    _incr_metric(step, "corrections")
+    fields = repaired.missing_fields
+    prompt = LLM_CORRECTION.render(
+        problems="\n".join(f"- {m}" for m in repaired.missing),
+        previous=(raw or "")[:MAX_CORRECTION_CONTEXT_CHARS],
+        fields=", ".join(fields),
+    )
+    fix_cls = correction_model(model_cls, fields)
+    fixed = repair(_parse_json(await _generate(model, prompt, fix_cls, deadline)), fix_cls)
+    merged = repair({**repaired.data, **fixed.data}, model_cls)
+    try:
+        return model_cls.model_validate(merged.data)
+    except ValidationError:
+        _incr_metric(step, "correction_failures")
+        raise
+
+
+async def _call(model: str, prompt: str, model_cls: type[BaseModel], step: str,
+                deadline: float | None) -> BaseModel:
+    raw = await _generate(model, prompt, model_cls, deadline)
+    try:
+        return model_cls.model_validate_json(clean_llm_json(raw))
+    except ValidationError:
+        _incr_metric(step, "validation_failures")
+
+    repaired = repair(_parse_json(raw), model_cls)
+    if repaired.missing:
+        return await _correct(model, model_cls, step, raw, repaired, deadline)
+    result = model_cls.model_validate(repaired.data)
+    _incr_metric(step, "repaired")
+    return result
+
+
+async def _hedged_call(prompt: str, model_cls: type[BaseModel], step: str, model: str,
+                       deadline: float | None) -> BaseModel:
+    start = time.monotonic()
+    primary = asyncio.create_task(_call(model, prompt, model_cls, step, deadline))
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=_hedge_delay(step))
+    except asyncio.CancelledError:
+        primary.cancel()   # asyncio.wait does not cancel the tasks it waits on
+        raise
+    if done or not _acquire_hedge_slot():
+        if not done:
+            _incr_metric(step, "hedges_capped")
+        result = await primary
+        _record_latency(step, time.monotonic() - start)
+        return result
+
+    _incr_metric(step, "hedges")
+    hedge_model = settings.llm_fallback_model or model
+    hedge = asyncio.create_task(_call(hedge_model, prompt, model_cls, step, deadline))
+    pending = {primary, hedge}
+    last_error = None
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    last_error = task.exception()   # Invalid or failed — wait for the other
+                    continue
+                if task is hedge:
+                    _incr_metric(step, "hedge_wins")
+                _record_latency(step, time.monotonic() - start)
+                return task.result()
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def generate_json(prompt: str, model_cls: type[BaseModel], *, step: str,
+                  model: str | None = None, job_id: str | None = None,
+                  deadline: float | None = None) -> BaseModel:
+    """
+    Calls the LLM and returns the response validated against `model_cls`,
+    which is also sent to the provider as the response schema.
+    Blocking — safe to call from RQ tasks and from worker threads.
+    Raises ValidationError if no valid response was produced, even after
+    local repair and a correction call.
+
+    With `job_id`, the job's cancellation flag is polled while waiting; a
+    cancelled job's in-flight request(s) are cancelled and JobCancelled raised.
+    Each provider call is bounded by LLM_CALL_TIMEOUT_SECONDS, or by what is
+    left before `deadline` (the job's epoch deadline) when that is shorter.
+    """
+    _incr_metric(step, "calls")
+    future = asyncio.run_coroutine_threadsafe(
+        _hedged_call(prompt, model_cls, step, model or settings.llm_model, deadline),
+        _get_loop(),
+    )
+    try:
+        if job_id is None:
+            return future.result()
+        while True:
+            try:
+                return future.result(timeout=CANCEL_POLL_SECONDS)
+            except concurrent.futures.TimeoutError:
+                if is_cancelled(job_id):
+                    future.cancel()   # Cancels the hedged task and both provider calls on the loop
+                    raise JobCancelled(job_id)
+    except CallBudgetExceeded:
+        if job_id is not None:
+            record_degradation(job_id, f"call_timeout:{step}")
+        raise
@@ -0,0 +1,281 @@
+"""
+app/pipeline/prompts.py
+───────────────────────
+Versioned prompt template registry + token budgeting for LLM inputs.
+
+  - Templates are registered once at import and parsed into literal/field
+    segments, so rendering is a single join — no f-string rebuilds per call.
+  - Every template has a name and version ("researcher@v2"); the version is
+    recorded in job_steps so outputs can be traced back to the exact prompt.
+  - `estimate_tokens` is a local, dependency-free estimator (no API call).
+  - `pack_snippets` ranks, deduplicates and packs research snippets into a
+    per-step input token budget instead of cutting every result to 200 chars.
+
+Placeholders use `$name` so JSON braces in templates need no escaping.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+
+_FIELD_RE = re.compile(r"\$([a-z_][a-z0-9_]*)")
+
+
+# ── Templates ──────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class PromptTemplate:
+    name:     str
+    version:  str
+    text:     str
+    segments: tuple = field(init=False, repr=False)
+    fields:   frozenset = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Precompile: even indexes are literals, odd indexes are field names
+        parts = _FIELD_RE.split(self.text)
+        object.__setattr__(self, "segments", tuple(parts))
+        object.__setattr__(self, "fields", frozenset(parts[1::2]))
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def render(self, **values) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.id} missing values: {sorted(missing)}")
+        segs = self.segments
+        out = [segs[0]]
+        for i in range(1, len(segs), 2):
+            out.append(str(values[segs[i]]))
+            out.append(segs[i + 1])
+        return "".join(out)
+
+
+_REGISTRY: dict[str, PromptTemplate] = {}
+
+
+def register(name: str, version: str, text: str) -> PromptTemplate:
+    template = PromptTemplate(name=name, version=version, text=text)
+    _REGISTRY[name] = template
+    return template
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    """Returns the current version of a registered prompt."""
+    return _REGISTRY[name]
+
+
+# ── Token estimation ───────────────────────────────────────────────────────
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate. Latin text averages ~4 chars/token; Arabic
+    and other non-ASCII scripts tokenize much denser (~2 chars/token).
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = len(text) - non_ascii
+    return int(ascii_chars / 4 + non_ascii / 2) + 1
+
+
+# ── Snippet packing ────────────────────────────────────────────────────────
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?؟])\s+")
+
+NEAR_DUPLICATE_JACCARD = 0.6
+MIN_SNIPPET_TOKENS = 25
+
+
+def _words(text: str) -> list[str]:
+    return [w.lower() for w in _WORD_RE.findall(text)]
+
+
+def _shingles(words: list[str], n: int = 3) -> set:
+    if len(words) < n:
+        return {tuple(words)}
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Keeps whole sentences while they fit; hard-cuts only the first one."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for sentence in _SENTENCE_RE.split(text):
+        cost = estimate_tokens(sentence)
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    if kept:
+        return " ".join(kept)
+    # First sentence alone is too long — cut on a word boundary
+    approx_chars = max_tokens * 3
+    return text[:approx_chars].rsplit(" ", 1)[0] + "…"
+
+
+def pack_snippets(results: list[dict], query: str, budget_tokens: int,
+                  max_share: float = 0.4) -> list[str]:
+    """
+    Turns raw search results into "- title: content" lines that fit a token
+    budget.
+
+      1. Rank by the search engine's score plus query-term overlap.
+      2. Drop near-duplicates (word 3-shingle Jaccard ≥ NEAR_DUPLICATE_JACCARD).
+      3. Greedily pack, trimming each snippet to whole sentences and capping
+         any single snippet at `max_share` of the budget.
+    """
+    query_terms = set(_words(query))
+
+    def score(r: dict) -> float:
+        words = _words(r.get("content", ""))
+        overlap = len(query_terms & set(words)) / (len(query_terms) or 1)
+        return float(r.get("score") or 0.0) + overlap
+
+    ranked = sorted((r for r in results if r.get("content")), key=score, reverse=True)
+
+    kept_shingles: list[set] = []
+    lines: list[str] = []
+    remaining = budget_tokens
+    per_snippet_cap = max(MIN_SNIPPET_TOKENS, int(budget_tokens * max_share))
+
+    for r in ranked:
+        content = " ".join(r["content"].split())
+        sh = _shingles(_words(content))
+        if any(len(sh & k) / (len(sh | k) or 1) >= NEAR_DUPLICATE_JACCARD for k in kept_shingles):
+            continue
+
+        title = r.get("title", "").strip()
+        overhead = estimate_tokens(f"- {title}: ")
+        allowance = min(per_snippet_cap, remaining) - overhead
+        if allowance < MIN_SNIPPET_TOKENS:
+            break
+
+        body = _trim_to_tokens(content, allowance)
+        line = f"- {title}: {body}"
+        lines.append(line)
+        kept_shingles.append(sh)
+        remaining -= estimate_tokens(line)
+
+    return lines
+
+
+# ── Registered prompts ─────────────────────────────────────────────────────
+CLARIFIER = register("clarifier", "v2", """You are a business analyst specializing in local markets.
+
+Analyze this business and return a JSON object that strictly matches this schema:
+- business_name: string (cleaned)
+- business_type: string (normalized category)
+- target_city: string
+- target_country: string (inferred from locale: $locale)
+- search_niche: string (concise English search term, e.g. "dental clinic")
+- search_region: string (city + country in English, e.g. "Dammam Saudi Arabia")
+- locale: string (BCP-47 tag)
+- direction: "rtl" or "ltr"
+- dialect: string (e.g. "Gulf Arabic", "Modern Standard Arabic")
+- tone: string (e.g. "professional", "friendly", "urgent")
+- usp: string or null
+- additional_notes: string or null
+
+Business Input:
+- Name: $business_name
+- Type: $business_type
+- City: $target_city
+- Locale: $locale
+- Direction: $direction
+
+Return ONLY valid JSON. No markdown, no explanation.""")
+
+
+RESEARCHER = register("researcher", "v2", """You are a market research analyst for local businesses in $region.
+
+Based on the following search results, extract structured competitive intelligence.
+
+COMPETITOR SEARCH RESULTS:
+$competitor_texts
+
+CUSTOMER PAIN POINTS SEARCH RESULTS:
+$pain_point_texts
+
+Return ONLY a valid JSON object matching this exact schema:
+{
+  "competitors": [
+    {"name": "string", "url": "string or null", "summary": "string"}
+  ],
+  "local_pain_points": ["string", "string", ...],
+  "cultural_hooks": ["string", "string", ...]
+}
+
+- competitors: up to 5 real local businesses found in results
+- local_pain_points: 3-5 specific things customers complain about or want in this region
+- cultural_hooks: 3-5 culturally relevant values or motivators
+
+Return ONLY valid JSON. No markdown, no explanation.""")
+
+
+COPYWRITER_SECTION = register("copywriter.section", "v2", """You are an expert landing page copywriter specializing in $lang marketing copy for the MENA region.
+
+Business: $biz_name
+Type: $biz_type
+City: $city
+Tone: $tone
+Dialect: $dialect
+USP: $usp
+
+LOCAL PAIN POINTS:
+$pain_points
+
+CULTURAL HOOKS:
+$hooks
+$angle_block
+Write ONLY the $section section of the landing page.
+Return ONLY a valid JSON object:
+$shape
+
+- All text in $lang ($dialect)
+- Return ONLY valid JSON. No markdown, no explanation.""")
+
+
+COPY_SHAPES = {
+    "hero": register("copywriter.shape.hero", "v1", """{
+  "hero": {
+    "headline": "string (max 10 words, powerful, in $lang)",
+    "subheadline": "string (max 20 words, clarifies the value, in $lang)",
+    "cta_text": "string (max 5 words, action verb, in $lang)"
+  },
+  "social_proof": "string or null"
+}"""),
+    "features": register("copywriter.shape.features", "v1", """{
+  "features": [
+    {"title": "string", "description": "string"}
+  ]
+}
+
+- features: exactly 3 items"""),
+    "benefits": register("copywriter.shape.benefits", "v1", """{
+  "benefits": [
+    {"title": "string", "description": "string"}
+  ]
+}
+
+- benefits: exactly 3 items"""),
+    "cta": register("copywriter.shape.cta", "v1", """{
+  "cta_headline": "string (urgency-driven, in $lang)",
+  "cta_subtext": "string (reassurance, in $lang)",
+  "cta_button_text": "string (max 4 words, in $lang)"
+}"""),
+}
+
+
+LLM_CORRECTION = register("llm.correction", "v1", """Your previous JSON response was incomplete or invalid.
+
+PROBLEMS:
+$problems
+
+YOUR PREVIOUS RESPONSE:
+$previous
+
+Return ONLY a JSON object with these fields, complete and valid: $fields
+Keep the same language, tone and content style. Do not repeat other fields.
+Return ONLY valid JSON. No markdown, no explanation.""")
@@ -0,0 +1,15 @@
+"""
+app/pipeline/registry.py
+────────────────────────
+Dotted paths of the pipeline tasks.
+
+RQ accepts a "module.function" string in place of a function object, so the
+API process can enqueue work without importing app.pipeline.tasks (and with
+it the LLM SDK, NumPy and the research index). Only workers import the tasks.
+"""
+
+CLARIFIER_TASK         = "app.pipeline.tasks.clarifier_task"
+RESEARCHER_TASK        = "app.pipeline.tasks.researcher_task"
+COPYWRITER_TASK        = "app.pipeline.tasks.copywriter_task"
+STRUCTURE_BUILDER_TASK = "app.pipeline.tasks.structure_builder_task"
+REGENERATE_BLOCK_TASK  = "app.pipeline.tasks.regenerate_block_task"
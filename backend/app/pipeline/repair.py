@@ -0,0 +1,170 @@
+"""
+app/pipeline/repair.py
+──────────────────────
+Local repair of near-miss LLM JSON before it is rejected.
+
+Structured output (response_schema) keeps most responses on-schema, but a
+model can still return 4 features instead of 3, "CTA text" instead of
+`cta_text`, a number where a string belongs or an empty required field.
+`repair` walks the target pydantic model and fixes what can be fixed
+without another LLM call:
+
+  - keys      : near-miss names are renamed ("CTA text" → cta_text),
+                unknown keys are dropped
+  - scalars   : numbers/bools coerced to strings and back, strings stripped
+  - lists     : a lone item is wrapped, over-long lists trimmed to max_length
+  - defaults  : absent optional fields take their default
+
+What cannot be fixed locally — a missing required field, an empty string, a
+list shorter than min_length — is returned in `missing`, so the gateway can
+ask the model for exactly those fields (see llm.py) instead of rerunning.
+"""
+
+import re
+import types
+from dataclasses import dataclass, field
+from typing import Any, Union, get_args, get_origin
+
+from annotated_types import MaxLen, MinLen
+from pydantic import BaseModel, create_model
+from pydantic.fields import FieldInfo
+
+
+_KEY_RE = re.compile(r"[^a-z0-9]+")
+
+
+@dataclass
+class RepairResult:
+    data:    dict
+    repairs: list[str] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+
+    @property
+    def missing_fields(self) -> list[str]:
+        """Top-level field names that need a correction call."""
+        return list(dict.fromkeys(path.split(".")[0].split("[")[0] for path in self.missing))
+
+
+class _Missing:
+    pass
+
+
+MISSING = _Missing()
+
+
+def _norm_key(key: str) -> str:
+    return _KEY_RE.sub("_", str(key).lower()).strip("_")
+
+
+def _list_bounds(info: FieldInfo) -> tuple[int | None, int | None]:
+    lo = hi = None
+    for meta in info.metadata:
+        if isinstance(meta, MinLen):
+            lo = meta.min_length
+        elif isinstance(meta, MaxLen):
+            hi = meta.max_length
+    return lo, hi
+
+
+def _unwrap_optional(annotation) -> tuple[Any, bool]:
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1 and len(args) < len(get_args(annotation)):
+            return args[0], True
+    return annotation, False
+
+
+# ── Walk ───────────────────────────────────────────────────────────────────
+def _coerce(value, annotation, info: FieldInfo | None, path: str, result: RepairResult):
+    annotation, optional = _unwrap_optional(annotation)
+    if value is None:
+        return None if optional else MISSING
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        if not isinstance(value, dict):
+            return MISSING
+        return _repair_model(value, annotation, path, result)
+
+    if get_origin(annotation) in (list, tuple) or annotation is list:
+        item_type = (get_args(annotation) or (Any,))[0]
+        if not isinstance(value, list):
+            value = [value]
+            result.repairs.append(f"{path}: wrapped in list")
+        items = []
+        for i, item in enumerate(value):
+            fixed = _coerce(item, item_type, None, f"{path}[{i}]", result)
+            if fixed is MISSING:
+                result.repairs.append(f"{path}[{i}]: dropped unusable item")
+            else:
+                items.append(fixed)
+        lo, hi = _list_bounds(info) if info else (None, None)
+        if hi is not None and len(items) > hi:
+            result.repairs.append(f"{path}: trimmed {len(items)} → {hi}")
+            items = items[:hi]
+        if lo is not None and len(items) < lo:
+            result.missing.append(f"{path}: needs {lo} items, got {len(items)}")
+        return items
+
+    if annotation is str:
+        if isinstance(value, (int, float, bool)):
+            result.repairs.append(f"{path}: coerced to string")
+            return str(value)
+        if isinstance(value, list) and all(isinstance(v, str) for v in value):
+            result.repairs.append(f"{path}: joined list into string")
+            value = " ".join(value)
+        if not isinstance(value, str):
+            return MISSING
+        value = value.strip()
+        return value if value or optional else MISSING
+
+    if annotation in (int, float) and isinstance(value, str):
+        try:
+            coerced = annotation(value.strip())
+        except ValueError:
+            return MISSING
+        result.repairs.append(f"{path}: coerced to {annotation.__name__}")
+        return coerced
+
+    return value
+
+
+def _repair_model(data: dict, model_cls: type[BaseModel], prefix: str, result: RepairResult) -> dict:
+    by_norm = {_norm_key(k): k for k in data}
+    out = {}
+    for name, info in model_cls.model_fields.items():
+        path = f"{prefix}.{name}" if prefix else name
+        if name in data:
+            value = data[name]
+        elif _norm_key(name) in by_norm:
+            value = data[by_norm[_norm_key(name)]]
+            result.repairs.append(f"{path}: renamed from {by_norm[_norm_key(name)]!r}")
+        else:
+            value = MISSING
+
+        if value is not MISSING:
+            value = _coerce(value, info.annotation, info, path, result)
+        if value is MISSING:
+            if info.is_required():
+                result.missing.append(path)
+                continue
+            value = info.get_default(call_default_factory=True)
+            result.repairs.append(f"{path}: defaulted")
+        out[name] = value
+    return out
+
+
+def repair(data: Any, model_cls: type[BaseModel]) -> RepairResult:
+    """Best-effort local fix-up of `data` towards `model_cls` (never raises)."""
+    if not isinstance(data, dict):
+        return RepairResult(data={}, missing=list(model_cls.model_fields))
+    result = RepairResult(data={})
+    result.data = _repair_model(data, model_cls, "", result)
+    return result
+
+
+def correction_model(model_cls: type[BaseModel], fields: list[str]) -> type[BaseModel]:
+    """A sub-model with only `fields`, used as the schema of a correction call."""
+    return create_model(
+        f"{model_cls.__name__}Correction",
+        **{name: (model_cls.model_fields[name].annotation, model_cls.model_fields[name]) for name in fields},
+    )
@@ -0,0 +1,399 @@
+"""
+app/pipeline/research_index.py
+──────────────────────────────
+Similarity index for reusing research across near-duplicate niches/regions.
+
+"dentist" / "dental clinic" in "Riyadh" vs "Riyadh Saudi Arabia" should not
+each pay for two Tavily searches and a researcher LLM call. Every finished
+research pass is indexed by its ClarifierOutput (search_niche, search_region,
+target_country) → ResearcherOutput artifact ref.
+
+Embeddings:
+  Character 3/4-gram TF-IDF, feature-hashed into a fixed number of
+  dimensions and L2-normalized (pure NumPy, no model or API call). Niche and
+  region are embedded separately; the country name is stripped from the
+  region so "Jeddah Saudi Arabia" doesn't look like "Riyadh Saudi Arabia".
+  N-grams can't see that "dentist" and "teeth whitening center" are the same
+  niche, or that "Riyad" is Riyadh, so both are first canonicalized through
+  the clarifier taxonomy (app/pipeline/clarifier_rules.py) when it knows them.
+  Lookup scores the distinct regions of the same country first (regions below
+  REGION_MIN_SIMILARITY are never candidates), then the niches of entries in
+  the closest regions, with vectorized mat-vec products:
+      score = NICHE_WEIGHT · cos(niche) + (1 − NICHE_WEIGHT) · cos(region)
+
+Storage:
+  - Redis list `research_index:entries` is the append-only source of truth.
+  - `build` (offline) recomputes IDF weights and all embeddings and writes a
+    .npz snapshot. Each worker's parent process loads it once and tails the
+    Redis list before every fork (`warm_index`, see worker.py), so a work
+    horse inherits an up-to-date index instead of replaying the list itself.
+
+Threshold:
+  RESEARCH_REUSE_THRESHOLD is calibrated on CALIBRATION_PAIRS (labelled
+  same/different research needs) — re-run after changing the embedding:
+
+    python -m app.pipeline.research_index build
+    python -m app.pipeline.research_index calibrate
+
+  The same run gives DEADLINE_CACHED_RESEARCH_MIN_SIMILARITY, the looser
+  floor used when a job is out of budget (tasks._degraded_research).
+"""
+
+import math
+import re
+import threading
+import zlib
+
+import numpy as np
+import orjson
+
+from app.config import settings
+from app.redis_client import redis_conn
+from app.pipeline.clarifier_rules import canonical_city, canonical_niche
+
+
+ENTRIES_KEY  = "research_index:entries"
+EMBED_VERSION = 2   # Bump when embedding inputs change; older snapshots are rebuilt
+NICHE_WEIGHT = 0.6
+REGION_MIN_SIMILARITY = 0.7   # Research is local: another city's competitors are never reused
+NGRAM_SIZES  = (3, 4)
+
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+# ── Embedding ──────────────────────────────────────────────────────────────
+def _normalize(text: str) -> str:
+    return " ".join(_NON_WORD_RE.sub(" ", text.lower()).split())
+
+
+def region_core(search_region: str, target_country: str) -> str:
+    """Region text with the country words removed ("Riyadh Saudi Arabia" → "riyadh", "Riyad" → "riyadh")."""
+    country_words = set(_normalize(target_country).split())
+    words = [w for w in _normalize(search_region).split() if w not in country_words]
+    core = " ".join(words) or _normalize(search_region)
+    city = canonical_city(core)
+    return _normalize(city) if city else core
+
+
+def niche_key(search_niche: str) -> str:
+    """Taxonomy niche when the clarifier knows it ("dentist" → "dental clinic"), else the raw niche."""
+    return canonical_niche(search_niche) or search_niche
+
+
+def _hashed_ngrams(text: str, dim: int) -> tuple[np.ndarray, np.ndarray]:
+    """Bucket indexes and ±1 signs for every char n-gram of `text`."""
+    padded = f" {_normalize(text)} "
+    grams = [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+    if not grams:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    buckets = (hashes % dim).astype(np.int64)
+    signs = np.where((hashes >> 31) & 1, -1.0, 1.0).astype(np.float32)
+    return buckets, signs
+
+
+def _term_frequencies(text: str, dim: int) -> np.ndarray:
+    buckets, signs = _hashed_ngrams(text, dim)
+    tf = np.zeros(dim, dtype=np.float32)
+    np.add.at(tf, buckets, signs)
+    # Sublinear TF, keeping the hash sign
+    return np.sign(tf) * np.log1p(np.abs(tf))
+
+
+def embed(text: str, idf: np.ndarray) -> np.ndarray:
+    vec = _term_frequencies(text, idf.shape[0]) * idf
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def _compute_idf(texts: list[str], dim: int) -> np.ndarray:
+    df = np.zeros(dim, dtype=np.float64)
+    for text in texts:
+        buckets, _ = _hashed_ngrams(text, dim)
+        df[np.unique(buckets)] += 1
+    return (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+
+
+# ── Index ──────────────────────────────────────────────────────────────────
+class ResearchIndex:
+    """
+    Two-level index. Distinct regions (per country) are few, so they are
+    scored first; niche similarity is then computed only over the entries of
+    the best-matching regions. Lookups touch a few thousand rows, not all of
+    them, which keeps them in the millisecond range at hundreds of thousands
+    of entries.
+    """
+
+    def __init__(self, dim: int, niche_idf: np.ndarray | None = None,
+                 region_idf: np.ndarray | None = None):
+        self.dim        = dim
+        self.niche_idf  = niche_idf if niche_idf is not None else np.ones(dim, dtype=np.float32)
+        self.region_idf = region_idf if region_idf is not None else np.ones(dim, dtype=np.float32)
+        self.size       = 0
+        self.refs: list[str] = []
+        self._niche     = np.zeros((1024, dim), dtype=np.float32)
+        # Region level: one row per distinct (country, region core)
+        self._region_ids: dict[tuple[str, str], int] = {}
+        self._region_vecs    = np.zeros((64, dim), dtype=np.float32)
+        self._region_country: list[str] = []
+        self._region_rows: list[list[int]] = []
+        self.lock = threading.Lock()
+
+    def _region_id(self, region: str, country: str) -> int:
+        key = (_normalize(country), region_core(region, country))
+        rid = self._region_ids.get(key)
+        if rid is None:
+            rid = len(self._region_ids)
+            if rid == self._region_vecs.shape[0]:
+                self._region_vecs = np.vstack([self._region_vecs, np.zeros_like(self._region_vecs)])
+            self._region_vecs[rid] = embed(key[1], self.region_idf)
+            self._region_ids[key] = rid
+            self._region_country.append(key[0])
+            self._region_rows.append([])
+        return rid
+
+    def add(self, entry: dict) -> None:
+        if self.size == self._niche.shape[0]:
+            self._niche = np.vstack([self._niche, np.zeros_like(self._niche)])
+        i = self.size
+        self._niche[i] = embed(niche_key(entry["niche"]), self.niche_idf)
+        self._region_rows[self._region_id(entry["region"], entry["country"])].append(i)
+        self.refs.append(entry["ref"])
+        self.size += 1
+
+    def nearest(self, niche: str, region: str, country: str,
+                max_regions: int = 8) -> tuple[str | None, float]:
+        """Best (ref, score) within the same country, or (None, 0.0)."""
+        country_norm = _normalize(country)
+        region_mask = np.fromiter(
+            (c == country_norm for c in self._region_country), dtype=bool, count=len(self._region_country),
+        )
+        if not region_mask.any():
+            return None, 0.0
+
+        qr = embed(region_core(region, country), self.region_idf)
+        region_scores = self._region_vecs[: len(self._region_country)] @ qr
+        region_scores[~region_mask] = -1.0
+        top = np.argsort(region_scores)[::-1][:max_regions]
+        top = top[region_scores[top] >= REGION_MIN_SIMILARITY]
+        if top.size == 0:
+            return None, 0.0
+
+        rows = np.concatenate([np.asarray(self._region_rows[r], dtype=np.int64) for r in top])
+        row_region_score = np.concatenate([np.full(len(self._region_rows[r]), region_scores[r]) for r in top])
+
+        qn = embed(niche_key(niche), self.niche_idf)
+        scores = NICHE_WEIGHT * (self._niche[rows] @ qn) + (1 - NICHE_WEIGHT) * row_region_score
+        best = int(np.argmax(scores))
+        return self.refs[rows[best]], float(scores[best])
+
+    def save(self, path: str) -> None:
+        regions = sorted(self._region_ids, key=self._region_ids.get)
+        row_region = np.zeros(self.size, dtype=np.int64)
+        for rid, rows in enumerate(self._region_rows):
+            row_region[rows] = rid
+        np.savez(
+            path,
+            niche=self._niche[: self.size], row_region=row_region,
+            region_vecs=self._region_vecs[: len(regions)],
+            region_keys=np.array(regions, dtype=object),
+            niche_idf=self.niche_idf, region_idf=self.region_idf,
+            refs=np.array(self.refs, dtype=object),
+            version=np.array(EMBED_VERSION),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ResearchIndex":
+        data = np.load(path, allow_pickle=True)
+        if "version" not in data or int(data["version"]) != EMBED_VERSION:
+            raise ValueError(f"{path} was built with an older embedding; run `build` again")
+        index = cls(data["niche_idf"].shape[0], data["niche_idf"], data["region_idf"])
+        index._niche = np.array(data["niche"], dtype=np.float32)
+        if index._niche.shape[0] == 0:
+            index._niche = np.zeros((1024, index.dim), dtype=np.float32)
+        index.size = data["niche"].shape[0]
+        index.refs = list(data["refs"])
+        if len(data["region_keys"]):
+            index._region_vecs = np.array(data["region_vecs"], dtype=np.float32)
+        for rid, (country, core) in enumerate(data["region_keys"]):
+            index._region_ids[(country, core)] = rid
+            index._region_country.append(country)
+            index._region_rows.append([])
+        for row, rid in enumerate(data["row_region"]):
+            index._region_rows[rid].append(row)
+        return index
+
+
+# ── Process-wide index ─────────────────────────────────────────────────────
+_index: ResearchIndex | None = None
+_index_lock = threading.Lock()
+
+
+def _get_index() -> ResearchIndex:
+    """Loads the snapshot once per process (empty index if none exists yet)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = ResearchIndex.load(settings.research_index_path)
+                except FileNotFoundError:
+                    _index = ResearchIndex(settings.research_index_dim)
+                except ValueError as e:
+                    print(f"⚠️  {e}")
+                    _index = ResearchIndex(settings.research_index_dim)
+    return _index
+
+
+def _sync(index: ResearchIndex) -> None:
+    """Appends entries other processes added since this index was built."""
+    new = redis_conn.lrange(ENTRIES_KEY, index.size, -1)
+    for raw in new:
+        index.add(orjson.loads(raw))
+
+
+def warm_index() -> int:
+    """
+    Loads the index and catches up with the Redis list. Called in the worker
+    parent before each fork, so work horses start with nothing to replay.
+    """
+    index = _get_index()
+    with index.lock:
+        _sync(index)
+    return index.size
+
+
+def find_similar_research(clarifier_output: dict,
+                          threshold: float | None = None) -> tuple[str | None, float]:
+    """
+    Returns (researcher artifact ref, score) for the most similar past
+    research if it clears `threshold` (default settings.research_reuse_threshold),
+    else (None, score).
+    """
+    index = _get_index()
+    with index.lock:
+        _sync(index)
+        ref, score = index.nearest(
+            clarifier_output["search_niche"],
+            clarifier_output["search_region"],
+            clarifier_output["target_country"],
+        )
+    if threshold is None:
+        threshold = settings.research_reuse_threshold
+    if ref is not None and score >= threshold:
+        return ref, score
+    return None, score
+
+
+def add_research(clarifier_output: dict, researcher_ref: str) -> None:
+    """Records a fresh research pass so future similar jobs can reuse it."""
+    redis_conn.rpush(ENTRIES_KEY, orjson.dumps({
+        "niche":   clarifier_output["search_niche"],
+        "region":  clarifier_output["search_region"],
+        "country": clarifier_output["target_country"],
+        "ref":     researcher_ref,
+    }))
+
+
+# ── Offline build ──────────────────────────────────────────────────────────
+def build_snapshot(path: str | None = None, dim: int | None = None) -> int:
+    """Recomputes IDF + embeddings for every entry and writes the snapshot."""
+    dim = dim or settings.research_index_dim
+    entries = [orjson.loads(raw) for raw in redis_conn.lrange(ENTRIES_KEY, 0, -1)]
+
+    index = ResearchIndex(
+        dim,
+        niche_idf=_compute_idf([niche_key(e["niche"]) for e in entries], dim),
+        region_idf=_compute_idf([region_core(e["region"], e["country"]) for e in entries], dim),
+    )
+    for entry in entries:
+        index.add(entry)
+    index.save(path or settings.research_index_path)
+    return index.size
+
+
+# ── Calibration ────────────────────────────────────────────────────────────
+# (niche, region) of a stored entry and of a new job in the same country,
+# labelled True when the stored research answers the new job's needs.
+CALIBRATION_PAIRS = [
+    # Same niche, different wording / spelling of the region
+    (("dentist", "Riyadh Saudi Arabia"),          ("dental clinic", "Riyadh"),                 "Saudi Arabia", True),
+    (("dental clinic", "Riyadh"),                 ("teeth whitening center", "Riyadh"),        "Saudi Arabia", True),
+    (("dental clinic", "Riyadh"),                 ("dental clinic", "Riyad"),                  "Saudi Arabia", True),
+    (("dental clinic", "Riyadh"),                 ("dentist", "Ar Riyadh Saudi Arabia"),       "Saudi Arabia", True),
+    (("coffee shop", "Jeddah"),                   ("cafe", "Jeddah Saudi Arabia"),             "Saudi Arabia", True),
+    (("cafe", "Jeddah"),                          ("specialty cafe", "Jeddah"),                "Saudi Arabia", True),
+    (("gym", "Dubai"),                            ("fitness center", "Dubai UAE"),             "United Arab Emirates", True),
+    (("women's gym", "Dubai"),                    ("womens gym", "Dubai"),                     "United Arab Emirates", True),
+    (("bakery", "Cairo"),                         ("bakeries", "Cairo Egypt"),                 "Egypt", True),
+    (("car wash", "Doha"),                        ("car detailing", "Doha"),                   "Qatar", True),
+    (("real estate agency", "Dammam"),            ("real estate", "Ad Dammam"),                "Saudi Arabia", True),
+    (("law firm", "Kuwait City"),                 ("lawyer", "Kuwait City"),                   "Kuwait", True),
+    (("pet grooming", "Riyadh"),                  ("pet grooming salon", "Riyadh"),            "Saudi Arabia", True),
+    (("veterinary clinic", "Jeddah"),             ("veterinary clinics", "Jeddah"),            "Saudi Arabia", True),
+    # Different niche or different city
+    (("dental clinic", "Riyadh"),                 ("restaurant", "Riyadh"),                    "Saudi Arabia", False),
+    (("gym", "Riyadh"),                           ("pastry shop", "Riyadh"),                   "Saudi Arabia", False),
+    (("dental clinic", "Riyadh"),                 ("dental clinic", "Jeddah"),                 "Saudi Arabia", False),
+    (("medical clinic", "Riyadh"),                ("veterinary clinic", "Riyadh"),             "Saudi Arabia", False),
+    (("cafe", "Jeddah"),                          ("coffee machine repair", "Jeddah"),         "Saudi Arabia", False),
+    (("gym", "Dubai"),                            ("fitness equipment store", "Dubai"),        "United Arab Emirates", False),
+    (("beauty salon", "Riyadh"),                  ("pet grooming salon", "Riyadh"),            "Saudi Arabia", False),
+    (("car repair", "Dammam"),                    ("car wash", "Dammam"),                      "Saudi Arabia", False),
+    (("car repair", "Khobar"),                    ("tailoring workshop", "Khobar"),            "Saudi Arabia", False),
+    (("bakery", "Cairo"),                         ("bakery", "Alexandria"),                    "Egypt", False),
+    (("real estate agency", "Dubai"),             ("law firm", "Dubai"),                       "United Arab Emirates", False),
+    (("pharmacy", "Doha"),                        ("photography studio", "Doha"),              "Qatar", False),
+    (("flower shop", "Riyadh"),                   ("coffee shop", "Riyadh"),                   "Saudi Arabia", False),
+    (("medina hotel", "Medina"),                  ("mecca hotel", "Mecca"),                    "Saudi Arabia", False),
+]
+
+
+CALIBRATION_MARGIN = 0.05   # Headroom above the worst false match; unseen niches vary more
+
+
+def calibrate(dim: int | None = None) -> dict:
+    """
+    Scores every CALIBRATION_PAIRS pair as the index would (IDF built from
+    the pairs) and returns the highest false-reuse score plus
+    CALIBRATION_MARGIN as the threshold, with the share of true pairs it
+    still reuses.
+    """
+    dim = dim or settings.research_index_dim
+    stored = [a for a, _, _, _ in CALIBRATION_PAIRS]
+    index_idf = (
+        _compute_idf([niche_key(n) for n, _ in stored], dim),
+        _compute_idf([region_core(r, c) for (_, r), _, c, _ in CALIBRATION_PAIRS], dim),
+    )
+    scored = []
+    for (niche, region), (q_niche, q_region), country, same in CALIBRATION_PAIRS:
+        index = ResearchIndex(dim, *index_idf)
+        index.add({"niche": niche, "region": region, "country": country, "ref": "stored"})
+        _, score = index.nearest(q_niche, q_region, country)
+        scored.append((score, same, f"{niche}/{region} ~ {q_niche}/{q_region}"))
+
+    worst_false = max((s for s, same, _ in scored if not same), default=0.0)
+    threshold = round(worst_false + CALIBRATION_MARGIN, 2)
+    positives = [s for s, same, _ in scored if same]
+    return {
+        "threshold": threshold,
+        "degraded_threshold": math.ceil(worst_false * 100 + 1e-9) / 100,   # No margin, still no false reuse
+        "worst_false": worst_false,
+        "recall":    sum(s >= threshold for s in positives) / len(positives),
+        "pairs":     sorted(scored, reverse=True),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["build"]:
+        print(f"✅ Indexed {build_snapshot()} research entries → {settings.research_index_path}")
+    elif sys.argv[1:] == ["calibrate"]:
+        result = calibrate()
+        for score, same, label in result["pairs"]:
+            print(f"{score:6.3f}  {'same' if same else 'diff'}  {label}")
+        print(f"✅ threshold {result['threshold']} (worst false reuse {result['worst_false']:.3f}), recall {result['recall']:.0%}")
+        print(f"   degraded threshold {result['degraded_threshold']}")
+    else:
+        print("Usage: python -m app.pipeline.research_index build | calibrate")
@@ -0,0 +1,229 @@
+"""
+app/pipeline/resilience.py
+──────────────────────────
+Circuit breakers and bulkheads around external providers
+(gemini, tavily, supabase).
+
+Circuit breaker — state lives in Redis so every worker process (and the API)
+sees the same view of a provider:
+  closed     : calls flow; failures are counted in a sliding window
+  open       : `breaker:{p}:open` exists → calls fail fast with CircuitOpenError
+  half_open  : cooldown elapsed but failures not yet cleared → one probe call
+               at a time is let through; success closes, failure re-opens
+
+Bulkhead — a concurrency cap per provider shared by every process on the
+same Redis, so a hung Tavily can't occupy every work horse that Supabase
+writes also need. RQ forks one work horse per job, so a per-process cap
+would never limit anything across jobs. Slots are leases in a sorted set
+`bulkhead:{p}` (member = holder token, score = lease expiry): a horse killed
+mid-call (job timeout, OOM) frees its slot when the lease runs out.
+
+Only provider failures count against a breaker. A request the provider
+rejected because of its content (`is_request_error`: a PostgREST 4xx,
+constraint violation or bad value) says nothing about the provider's health.
+"""
+
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+
+from app.config import settings
+from app.redis_client import redis_conn
+
+
+PROVIDERS = ("gemini", "tavily", "supabase")
+# SQLSTATE classes of data errors: 22 bad value, 23 constraint violation, 42 bad query
+REQUEST_ERROR_SQLSTATES = ("22", "23", "42")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"{provider} is temporarily unavailable (circuit open)")
+        self.provider = provider
+
+
+class CallBudgetExceeded(Exception):
+    """
+    A call cut short by the caller's own time budget (a job deadline), not by
+    the provider. Neither a failure nor a success for the breaker. Not a
+    TimeoutError, so future.result(timeout=...) polling can tell them apart.
+    """
+
+
+class BulkheadFullError(Exception):
+    """Raised when a provider's concurrency slots stay busy past the wait limit."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Too many concurrent {provider} calls")
+        self.provider = provider
+
+
+# ── Circuit breaker (Redis-shared) ─────────────────────────────────────────
+def _failures_key(provider: str) -> str:
+    return f"breaker:{provider}:failures"
+
+
+def _open_key(provider: str) -> str:
+    return f"breaker:{provider}:open"
+
+
+def _probe_key(provider: str) -> str:
+    return f"breaker:{provider}:probe"
+
+
+def breaker_state(provider: str) -> str:
+    pipe = redis_conn.pipeline()
+    pipe.exists(_open_key(provider))
+    pipe.get(_failures_key(provider))
+    is_open, failures = pipe.execute()
+    if is_open:
+        return "open"
+    if failures is not None and int(failures) >= settings.breaker_failure_threshold:
+        return "half_open"
+    return "closed"
+
+
+def provider_health() -> dict[str, str]:
+    """Breaker state of every provider — used by the API for early rejection."""
+    return {p: breaker_state(p) for p in PROVIDERS}
+
+
+def _before_call(provider: str) -> None:
+    state = breaker_state(provider)
+    if state == "open":
+        raise CircuitOpenError(provider)
+    if state == "half_open":
+        # Only one probe in flight across all processes
+        if not redis_conn.set(_probe_key(provider), 1, nx=True, ex=settings.breaker_cooldown_seconds):
+            raise CircuitOpenError(provider)
+
+
+def record_success(provider: str) -> None:
+    redis_conn.delete(_failures_key(provider), _probe_key(provider))
+
+
+def record_failure(provider: str) -> None:
+    pipe = redis_conn.pipeline()
+    pipe.incr(_failures_key(provider))
+    pipe.expire(_failures_key(provider), settings.breaker_window_seconds + settings.breaker_cooldown_seconds)
+    pipe.delete(_probe_key(provider))
+    failures = pipe.execute()[0]
+    if failures >= settings.breaker_failure_threshold:
+        redis_conn.set(_open_key(provider), 1, ex=settings.breaker_cooldown_seconds)
+
+
+# ── Bulkheads (Redis-shared leases) ────────────────────────────────────────
+SLOT_POLL_SECONDS = 0.05
+
+# Drops expired leases, then takes a slot if one is free. Atomic across processes.
+_ACQUIRE_SLOT = redis_conn.register_script("""
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+""")
+
+
+def _slots_key(provider: str) -> str:
+    return f"bulkhead:{provider}"
+
+
+def _bulkhead_size(provider: str) -> int:
+    return getattr(settings, f"bulkhead_{provider}")
+
+
+def _try_acquire(provider: str, token: str) -> bool:
+    now = time.time()
+    lease = settings.bulkhead_lease_seconds
+    return bool(_ACQUIRE_SLOT(
+        keys=[_slots_key(provider)],
+        args=[now, _bulkhead_size(provider), now + lease, token, int(lease) + 1],
+    ))
+
+
+def _release(provider: str, token: str) -> None:
+    redis_conn.zrem(_slots_key(provider), token)
+
+
+def acquire_slot(provider: str) -> str:
+    """Blocks up to BULKHEAD_WAIT_SECONDS for a slot; returns the holder token."""
+    token = uuid.uuid4().hex
+    give_up = time.monotonic() + settings.bulkhead_wait_seconds
+    while not _try_acquire(provider, token):
+        if time.monotonic() >= give_up:
+            raise BulkheadFullError(provider)
+        time.sleep(SLOT_POLL_SECONDS)
+    return token
+
+
+async def async_acquire_slot(provider: str) -> str:
+    token = uuid.uuid4().hex
+    give_up = time.monotonic() + settings.bulkhead_wait_seconds
+    while not _try_acquire(provider, token):
+        if time.monotonic() >= give_up:
+            raise BulkheadFullError(provider)
+        await asyncio.sleep(SLOT_POLL_SECONDS)
+    return token
+
+
+def bulkhead_usage() -> dict[str, int]:
+    """Live slots held per provider, across all processes."""
+    now = time.time()
+    return {p: redis_conn.zcount(_slots_key(p), now, "+inf") for p in PROVIDERS}
+
+
+# ── Guards ─────────────────────────────────────────────────────────────────
+def is_request_error(exc: BaseException) -> bool:
+    """True if the provider rejected this request's content, not because it is unhealthy."""
+    code = getattr(exc, "code", None)   # postgrest.APIError: SQLSTATE or PGRSTnnn
+    if not isinstance(code, str):
+        return False
+    # PGRST1xx: bad request, PGRST2xx: unknown table/column/function
+    return code[:2] in REQUEST_ERROR_SQLSTATES or code.startswith(("PGRST1", "PGRST2"))
+
+
+@contextmanager
+def guard(provider: str):
+    """
+    Wraps one blocking provider call:
+        with guard("tavily"):
+            tavily.search(...)
+    """
+    _before_call(provider)
+    token = acquire_slot(provider)
+    try:
+        yield
+    except Exception as e:
+        if is_request_error(e):
+            record_success(provider)   # It answered: the provider is up, the request was bad
+        else:
+            record_failure(provider)
+        raise
+    else:
+        record_success(provider)
+    finally:
+        _release(provider, token)
+
+
+@asynccontextmanager
+async def async_guard(provider: str):
+    """Async twin of `guard` for calls made on the LLM gateway loop."""
+    _before_call(provider)
+    token = await async_acquire_slot(provider)
+    try:
+        yield
+    except (asyncio.CancelledError, CallBudgetExceeded):
+        raise   # Losing a hedge race or running out of job budget is not a provider failure
+    except Exception:
+        record_failure(provider)
+        raise
+    else:
+        record_success(provider)
+    finally:
+        _release(provider, token)
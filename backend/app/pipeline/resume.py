@@ -0,0 +1,110 @@
+"""
+app/pipeline/resume.py
+──────────────────────
+Resuming failed jobs from their first unfinished step.
+
+Lives outside app/pipeline/tasks.py so the API can plan and enqueue a resume
+without importing the task module; steps are enqueued by dotted path
+(see app/pipeline/registry.py).
+"""
+
+from datetime import datetime, timezone
+
+from app.redis_client import redis_conn
+from app.pipeline.control import enqueue_step, new_deadline
+from app.pipeline.resilience import guard
+from app.pipeline.registry import (
+    CLARIFIER_TASK,
+    RESEARCHER_TASK,
+    COPYWRITER_TASK,
+    STRUCTURE_BUILDER_TASK,
+)
+
+
+def resume_attempts_key(job_id: str) -> str:
+    return f"job:{job_id}:resume_attempts"
+
+
+def latest_step_outputs(supabase, job_id: str) -> dict:
+    """Maps (step_name, variant) → output artifact ref for every step that succeeded."""
+    with guard("supabase"):
+        result = (
+            supabase.table("job_steps")
+            .select("step_name, input_data, output_data, created_at")
+            .eq("job_id", job_id)
+            .order("created_at")
+            .execute()
+        )
+    outputs = {}
+    for row in result.data or []:
+        ref = (row.get("output_data") or {}).get("ref")
+        if ref:
+            variant = (row.get("input_data") or {}).get("variant", 0)
+            outputs[(row["step_name"], variant)] = ref   # Later runs of a step win
+    return outputs
+
+
+def plan_resume(supabase, job_id: str, job_input: dict) -> list[tuple]:
+    """
+    Works out where a failed job should pick up again.
+
+    Returns (step_name, task_path, kwargs) tuples to enqueue: the first step
+    without a saved output, once per unfinished A/B variant after research.
+    If every step has an output, the final job update is what failed, so the
+    structure builders (no external calls) run again.
+    """
+    outputs  = latest_step_outputs(supabase, job_id)
+    variants = job_input.get("variants", 1)
+
+    clarifier_ref  = outputs.get(("clarifier", 0))
+    researcher_ref = outputs.get(("researcher", 0))
+    if not clarifier_ref:
+        return [("clarifier", CLARIFIER_TASK, {"job_id": job_id, "job_input": job_input})]
+    if not researcher_ref:
+        return [("researcher", RESEARCHER_TASK,
+                 {"job_id": job_id, "clarifier_ref": clarifier_ref, "variants": variants})]
+
+    plan = []
+    for variant in range(variants):
+        copy_ref = outputs.get(("copywriter", variant))
+        if not copy_ref:
+            plan.append(("copywriter", COPYWRITER_TASK, {
+                "job_id": job_id, "clarifier_ref": clarifier_ref, "researcher_ref": researcher_ref,
+                "variant": variant, "variants": variants,
+            }))
+        elif ("structure_builder", variant) not in outputs:
+            plan.append(("structure_builder", STRUCTURE_BUILDER_TASK, {
+                "job_id": job_id, "clarifier_ref": clarifier_ref, "copy_ref": copy_ref,
+                "variant": variant, "variants": variants,
+            }))
+
+    if not plan:
+        plan = [
+            ("structure_builder", STRUCTURE_BUILDER_TASK, {
+                "job_id": job_id, "clarifier_ref": clarifier_ref,
+                "copy_ref": outputs[("copywriter", variant)], "variant": variant, "variants": variants,
+            })
+            for variant in range(variants)
+        ]
+    return plan
+
+
+def resume_job(supabase, job_id: str, job_input: dict) -> str:
+    """
+    Re-enqueues a failed job from its first unfinished step. Completed steps
+    are not re-run; their outputs are reused from the artifact store.
+    Returns the step the job resumed from.
+    """
+    plan = plan_resume(supabase, job_id, job_input)
+
+    redis_conn.delete(resume_attempts_key(job_id))
+    supabase.table("landing_page_jobs").update({
+        "status":        "pending",
+        "error_message": None,
+        "updated_at":    datetime.now(timezone.utc).isoformat(),
+    }).eq("id", job_id).execute()
+
+    deadline = new_deadline()   # A resumed job gets a fresh end-to-end budget
+    for _, task_path, kwargs in plan:
+        enqueue_step(job_id, task_path, {**kwargs, "deadline": deadline})
+    return plan[0][0]
@@ -3,27 +3,35 @@ app/pipeline/tasks.py
 ─────────────────────
 RQ background tasks. Each function is one step in the pipeline:
   clarifier_task → researcher_task → copywriter_task → structure_builder_task
+
+Steps hand each other artifact references (see app/pipeline/artifacts.py),
+never full payloads — each output is stored once and fetched where needed.
 """
 
-import json
-import re
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timezone
 
 from supabase import create_client
 
 from app.config import settings
 from app.schemas.clarifier import ClarifierOutput
-from app.redis_client import publish_job_update, task_queue
-
-
-# ── Shared Utility ─────────────────────────────────────────────────────────
-def clean_llm_json(raw: str) -> str:
-    """Strip markdown code fences and leading/trailing whitespace."""
-    raw = raw.strip()
-    raw = re.sub(r"^```(?:json)?\s*", "", raw)
-    raw = re.sub(r"\s*```$", "", raw)
-    return raw.strip()
+from app.redis_client import publish_job_update, redis_conn
+from app.pipeline.artifacts import put_artifact, get_artifact, link_job_refs
+from app.pipeline.prompts import CLARIFIER, RESEARCHER, COPYWRITER_SECTION, pack_snippets
+from app.pipeline.llm import generate_json
+from app.pipeline.resilience import guard
+from app.pipeline.research_index import find_similar_research, add_research
+from app.pipeline.clarifier_rules import RULES_VERSION, clarify as clarify_from_rules
+from app.pipeline.fonts import build_page_assets
+from app.pipeline.resume import latest_step_outputs, resume_attempts_key
+from app.pipeline.writebehind import (
+    LOCK_TIMEOUT_SECONDS, TERMINAL_STATUSES, buffer_status, buffer_step, flush, flush_terminal,
+)
+from app.pipeline.control import (
+    JobCancelled, call_timeout, check_cancelled, degradations, enqueue_step,
+    llm_budget, record_degradation, remaining,
+)
 
 
 # ── Supabase & Helpers ─────────────────────────────────────────────────────
@@ -31,35 +39,129 @@ def _get_supabase():
     return create_client(settings.supabase_url, settings.supabase_service_role_key)
 
 
-def _update_job_status(supabase, job_id: str, status: str, error: str = None):
+def _update_job_status(supabase, job_id: str, status: str, error: str = None) -> bool:
+    """
+    Buffered (write-behind) for in-progress states; terminal states are written
+    at once. Never replaces a terminal status: returns False if the job had one
+    (e.g. the user cancelled it), so the caller skips its own event.
+    """
     update_data = {
         "status": status,
         "updated_at": datetime.now(timezone.utc).isoformat(),
     }
     if error:
         update_data["error_message"] = error
-    supabase.table("landing_page_jobs").update(update_data).eq("id", job_id).execute()
+    if status in TERMINAL_STATUSES:
+        return flush_terminal(supabase, job_id, update_data)
+    if settings.writebehind_enabled:
+        buffer_status(job_id, update_data)
+        return True
+    with guard("supabase"):
+        result = (
+            supabase.table("landing_page_jobs")
+            .update(update_data)
+            .eq("id", job_id)
+            .not_.in_("status", list(TERMINAL_STATUSES))
+            .execute()
+        )
+    return bool(result.data)
 
 
 def _save_step(supabase, job_id: str, step_name: str, step_order: int,
-               input_data: dict, output_data: dict, duration_ms: int):
-    supabase.table("job_steps").insert({
+               input_refs: dict, output_ref: str, duration_ms: int, variant: int = 0,
+               prompt_version: str = None):
+    """
+    Records a step run. Payloads live in the artifact store — the row only
+    keeps references, so upstream outputs are never stored a second time.
+    `prompt_version` is the registry id (e.g. "researcher@v2") of the prompt used.
+    The row is buffered and bulk-inserted (see app/pipeline/writebehind.py).
+    """
+    row = {
         "job_id":      job_id,
         "step_name":   step_name,
         "step_order":  step_order,
-        "input_data":  input_data,
-        "output_data": output_data,
+        "input_data":  {"refs": input_refs, "variant": variant, "prompt_version": prompt_version},
+        "output_data": {"ref": output_ref},
         "duration_ms": duration_ms,
         "created_at":  datetime.now(timezone.utc).isoformat(),
-    }).execute()
+    }
+    link_job_refs(job_id, [output_ref, *(v for v in input_refs.values() if isinstance(v, str) and len(v) == 64)])
+    if settings.writebehind_enabled:
+        buffer_step(supabase, row)
+    else:
+        with guard("supabase"):
+            supabase.table("job_steps").insert(row).execute()
+
+
+def _schedule_auto_resume(job_id: str, status: str, step: str, task_fn, kwargs: dict, error: str) -> bool:
+    """
+    Re-enqueues only the failed step (same artifact refs, so upstream work is
+    reused) with exponential backoff. Attempts are counted per job in Redis and
+    bounded by settings.auto_resume_max_attempts. Returns False when the job
+    should be marked failed instead.
+    """
+    max_attempts = settings.auto_resume_max_attempts
+    if max_attempts <= 0:
+        return False
+
+    key = resume_attempts_key(job_id)
+    attempt = redis_conn.incr(key)
+    redis_conn.expire(key, 24 * 3600)
+    if attempt > max_attempts:
+        return False
+
+    delay = settings.auto_resume_backoff_seconds * 2 ** (attempt - 1)
+    if enqueue_step(job_id, task_fn, kwargs, delay=delay) is None:
+        return False   # Cancelled: nothing will retry, so don't announce one
+    publish_job_update(job_id, {
+        "status":  status,
+        "step":    step,
+        "message": f"⚠️ {error} — retrying in {delay}s ({attempt}/{max_attempts})...",
+        "payload": None,
+    })
+    return True
+
+
+# ── A/B Variants ───────────────────────────────────────────────────────────
+# Variant 0 is the default page; the others get a different creative angle
+# so the copywriter produces meaningfully different hooks for A/B tests.
+#
+# Required schema (Supabase SQL editor):
+#     alter table landing_page_jobs add column if not exists variants integer not null default 1;
+#     create table if not exists landing_page_variants (
+#         job_id        uuid not null references landing_page_jobs(id) on delete cascade,
+#         variant       integer not null,
+#         angle         text,
+#         structure     jsonb,
+#         structure_ref text,
+#         created_at    timestamptz not null default now(),
+#         unique (job_id, variant)   -- upsert target (on_conflict="job_id,variant")
+#     );
+VARIANT_ANGLES = [
+    None,
+    "Lead with urgency and a limited-time reason to act now.",
+    "Lead with trust: reputation, experience and social proof.",
+    "Lead with family and community values relevant to the region.",
+    "Lead with value for money and clear, concrete outcomes.",
+]
+MAX_VARIANTS = len(VARIANT_ANGLES)
+
+
+def _variants_done_key(job_id: str) -> str:
+    return f"job:{job_id}:variants_done"
+
+
+def _variant_refs_key(job_id: str) -> str:
+    return f"job:{job_id}:variant_refs"
 
 
 # ── STEP 1: Clarifier ──────────────────────────────────────────────────────
-def clarifier_task(job_id: str, job_input: dict) -> None:
+def clarifier_task(job_id: str, job_input: dict, deadline: float | None = None) -> None:
     supabase = _get_supabase()
     start_time = time.time()
 
     try:
+        check_cancelled(job_id)
         _update_job_status(supabase, job_id, "researching")
         publish_job_update(job_id, {
             "status":  "researching",
@@ -68,69 +170,157 @@ def clarifier_task(job_id: str, job_input: dict) -> None:
             "payload": None,
         })
 
-        prompt = f"""You are a business analyst specializing in local markets.
-
-Analyze this business and return a JSON object that strictly matches this schema:
-- business_name: string (cleaned)
-- business_type: string (normalized category)
-- target_city: string
-- target_country: string (inferred from locale: {job_input['locale']})
-- search_niche: string (concise English search term, e.g. "dental clinic")
-- search_region: string (city + country in English, e.g. "Dammam Saudi Arabia")
-- locale: string (BCP-47 tag)
-- direction: "rtl" or "ltr"
-- dialect: string (e.g. "Gulf Arabic", "Modern Standard Arabic")
-- tone: string (e.g. "professional", "friendly", "urgent")
-- usp: string or null
-- additional_notes: string or null
-
-Business Input:
-- Name: {job_input['business_name']}
-- Type: {job_input['business_type']}
-- City: {job_input['target_city']}
-- Locale: {job_input['locale']}
-- Direction: {job_input['direction']}
-
-Return ONLY valid JSON. No markdown, no explanation."""
-
-        from google import genai
-        client = genai.Client(api_key=settings.gemini_api_key)
-        response = client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-
-        clarifier_output = ClarifierOutput.model_validate_json(clean_llm_json(response.text))
+        # Deterministic fast path for well-known cities/business types
+        clarifier_output = clarify_from_rules(job_input) if settings.clarifier_fast_path else None
+        prompt_version   = RULES_VERSION
+
+        if clarifier_output is None:
+            prompt = CLARIFIER.render(
+                locale=job_input["locale"],
+                business_name=job_input["business_name"],
+                business_type=job_input["business_type"],
+                target_city=job_input["target_city"],
+                direction=job_input["direction"],
+            )
+            clarifier_output = generate_json(prompt, ClarifierOutput, step="clarifier", job_id=job_id,
+                                             **llm_budget(job_id, deadline, "clarifier"))
+            prompt_version   = CLARIFIER.id
+
         duration_ms = int((time.time() - start_time) * 1000)
 
-        _save_step(supabase, job_id, "clarifier", 1, job_input, clarifier_output.model_dump(), duration_ms)
+        input_ref     = put_artifact(supabase, job_input)
+        clarifier_ref = put_artifact(supabase, clarifier_output.model_dump())
+        _save_step(supabase, job_id, "clarifier", 1, {"job_input": input_ref}, clarifier_ref, duration_ms,
+                   prompt_version=prompt_version)
 
         publish_job_update(job_id, {
-            "status":  "researching",
-            "step":    "clarifier",
-            "message": f"✅ Profile clarified. Searching for competitors in {clarifier_output.search_region}...",
-            "payload": clarifier_output.model_dump(),
+            "status":      "researching",
+            "step":        "clarifier",
+            "message":     f"✅ Profile clarified. Searching for competitors in {clarifier_output.search_region}...",
+            "payload":     None,
+            "payload_ref": clarifier_ref,
         })
 
-        task_queue.enqueue(
-            researcher_task,
-            kwargs={"job_id": job_id, "clarifier_output": clarifier_output.model_dump()},
-            job_timeout=300,
-        )
+        enqueue_step(job_id, researcher_task, {
+            "job_id":        job_id,
+            "clarifier_ref": clarifier_ref,
+            "variants":      job_input.get("variants", 1),
+            "deadline":      deadline,
+        })
 
+    except JobCancelled:
+        return   # Cancelled from the API, which already published the terminal status
     except Exception as e:
         error_msg = f"Clarifier failed: {str(e)}"
-        _update_job_status(supabase, job_id, "failed", error=error_msg)
-        publish_job_update(job_id, {"status": "failed", "step": "clarifier", "message": error_msg, "payload": None})
+        if _schedule_auto_resume(job_id, "researching", "clarifier", clarifier_task,
+                                 {"job_id": job_id, "job_input": job_input, "deadline": deadline},
+                                 error_msg):
+            raise
+        if _update_job_status(supabase, job_id, "failed", error=error_msg):
+            publish_job_update(job_id, {"status": "failed", "step": "clarifier", "message": error_msg, "payload": None})
         raise
 
 
 # ── STEP 2: Researcher ─────────────────────────────────────────────────────
-def researcher_task(job_id: str, clarifier_output: dict) -> None:
+EMPTY_RESEARCH = {"competitors": [], "local_pain_points": [], "cultural_hooks": []}
+
+
+def _tavily_search(query: str) -> dict:
     from tavily import TavilyClient
+
+    with guard("tavily"):
+        return TavilyClient(api_key=settings.tavily_api_key).search(
+            query=query, max_results=5, search_depth="basic",
+        )
+
+
+def _run_searches(job_id: str, deadline: float | None, queries: list[str]) -> list[dict]:
+    """
+    Runs the Tavily searches concurrently. tavily-python takes no timeout, so
+    the wait is bounded instead: a search still running when the budget is
+    spent is abandoned (empty results) and recorded as a degradation.
+    """
+    pool = ThreadPoolExecutor(max_workers=len(queries))
+    futures = [pool.submit(_tavily_search, q) for q in queries]
+    pool.shutdown(wait=False)
+
+    stop_at = time.monotonic() + call_timeout(deadline, settings.research_search_timeout_seconds)
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result(timeout=max(0.0, stop_at - time.monotonic())))
+        except FutureTimeout:
+            record_degradation(job_id, "tavily_timeout")
+            results.append({"results": []})
+    check_cancelled(job_id)
+    return results
+
+
+def _run_research(job_id: str, clarifier_output: dict, deadline: float | None = None) -> dict:
+    """Two Tavily searches + one LLM extraction. Returns the ResearcherOutput dict."""
     from app.schemas.researcher import ResearcherOutput
 
+    niche  = clarifier_output["search_niche"]
+    region = clarifier_output["search_region"]
+
+    competitors_raw, pain_points_raw = _run_searches(job_id, deadline, [
+        f"Top competitors for {niche} in {region}",
+        f"What do customers in {region} care about most when choosing {niche}",
+    ])
+
+    publish_job_update(job_id, {
+        "status":  "researching",
+        "step":    "researcher",
+        "message": "🧠 Extracting insights from search results...",
+        "payload": None,
+    })
+
+    # Rank, dedupe and pack snippets into the input budget (half per search)
+    half_budget = settings.researcher_snippet_token_budget // 2
+    competitor_texts = "\n".join(pack_snippets(
+        competitors_raw.get("results", []), f"{niche} {region}", half_budget,
+    ))
+    pain_point_texts = "\n".join(pack_snippets(
+        pain_points_raw.get("results", []), f"{niche} customers care about", half_budget,
+    ))
+
+    prompt = RESEARCHER.render(
+        region=region,
+        competitor_texts=competitor_texts,
+        pain_point_texts=pain_point_texts,
+    )
+
+    return generate_json(prompt, ResearcherOutput, step="researcher", job_id=job_id,
+                         **llm_budget(job_id, deadline, "researcher")).model_dump()
+
+
+def _degraded_research(supabase, job_id: str, clarifier_output: dict) -> str:
+    """
+    Research for a job out of budget: the closest cached research if it clears
+    DEADLINE_CACHED_RESEARCH_MIN_SIMILARITY (looser than normal reuse, never
+    an unrelated niche), else empty research.
+    """
+    try:
+        cached_ref, _ = find_similar_research(
+            clarifier_output, threshold=settings.deadline_cached_research_min_similarity,
+        )
+    except Exception as e:
+        print(f"⚠️  Research index lookup failed: {e}")
+        cached_ref = None
+    if cached_ref:
+        record_degradation(job_id, "research_cached")
+        return cached_ref
+    record_degradation(job_id, "research_empty")
+    return put_artifact(supabase, EMPTY_RESEARCH)
+
+
+def researcher_task(job_id: str, clarifier_ref: str, variants: int = 1,
+                    deadline: float | None = None) -> None:
     supabase = _get_supabase()
     start_time = time.time()
 
     try:
+        check_cancelled(job_id)
         _update_job_status(supabase, job_id, "researching")
         publish_job_update(job_id, {
             "status":  "researching",
@@ -139,101 +329,87 @@ def researcher_task(job_id: str, clarifier_output: dict) -> None:
             "payload": None,
         })
 
-        tavily = TavilyClient(api_key=settings.tavily_api_key)
-        niche  = clarifier_output["search_niche"]
-        region = clarifier_output["search_region"]
-
-        competitors_raw = tavily.search(
-            query=f"Top competitors for {niche} in {region}",
-            max_results=5, search_depth="basic",
-        )
-        pain_points_raw = tavily.search(
-            query=f"What do customers in {region} care about most when choosing {niche}",
-            max_results=5, search_depth="basic",
-        )
-
-        publish_job_update(job_id, {
-            "status":  "researching",
-            "step":    "researcher",
-            "message": "🧠 Extracting insights from search results...",
-            "payload": None,
-        })
-
-        from google import genai as google_genai
-        llm = google_genai.Client(api_key=settings.gemini_api_key)
-
-        competitor_texts = "\n".join(
-            f"- {r['title']}: {r['content'][:200]}"
-            for r in competitors_raw.get("results", [])
-        )
-        pain_point_texts = "\n".join(
-            f"- {r['title']}: {r['content'][:200]}"
-            for r in pain_points_raw.get("results", [])
-        )
-
-        prompt = f"""You are a market research analyst for local businesses in {region}.
+        clarifier_output = get_artifact(supabase, clarifier_ref)
+
+        # Reuse research from a near-identical niche/region when one exists
+        try:
+            similar_ref, similarity = find_similar_research(clarifier_output)
+        except Exception as e:
+            print(f"⚠️  Research index lookup failed: {e}")
+            similar_ref, similarity = None, 0.0
+
+        if similar_ref:
+            researcher_ref = similar_ref
+            input_refs     = {"clarifier_output": clarifier_ref, "similar_research": similar_ref}
+            prompt_version = None
+            publish_job_update(job_id, {
+                "status":  "researching",
+                "step":    "researcher",
+                "message": f"♻️ Reusing research from a similar business (similarity {similarity:.2f})...",
+                "payload": None,
+            })
+        elif remaining(deadline) < settings.deadline_skip_research_seconds:
+            researcher_ref = _degraded_research(supabase, job_id, clarifier_output)
+            input_refs     = {"clarifier_output": clarifier_ref, "degraded_research": researcher_ref}
+            prompt_version = None
+            publish_job_update(job_id, {
+                "status":  "researching",
+                "step":    "researcher",
+                "message": "⏱️ Skipping live research to stay on time...",
+                "payload": None,
+            })
+        else:
+            researcher_ref = put_artifact(supabase, _run_research(job_id, clarifier_output, deadline))
+            input_refs     = {"clarifier_output": clarifier_ref}
+            prompt_version = RESEARCHER.id
+            add_research(clarifier_output, researcher_ref)
 
-Based on the following search results, extract structured competitive intelligence.
-
-COMPETITOR SEARCH RESULTS:
-{competitor_texts}
-
-CUSTOMER PAIN POINTS SEARCH RESULTS:
-{pain_point_texts}
-
-Return ONLY a valid JSON object matching this exact schema:
-{{
-  "competitors": [
-    {{"name": "string", "url": "string or null", "summary": "string"}}
-  ],
-  "local_pain_points": ["string", "string", ...],
-  "cultural_hooks": ["string", "string", ...]
-}}
-
-- competitors: up to 5 real local businesses found in results
-- local_pain_points: 3-5 specific things customers complain about or want in this region
-- cultural_hooks: 3-5 culturally relevant values or motivators
-
-Return ONLY valid JSON. No markdown, no explanation."""
-
-        response = llm.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-
-        researcher_output = ResearcherOutput.model_validate_json(clean_llm_json(response.text))
         duration_ms = int((time.time() - start_time) * 1000)
 
-        _save_step(supabase, job_id, "researcher", 2, clarifier_output, researcher_output.model_dump(), duration_ms)
+        _save_step(supabase, job_id, "researcher", 2, input_refs, researcher_ref, duration_ms,
+                   prompt_version=prompt_version)
 
         publish_job_update(job_id, {
-            "status":  "researching",
-            "step":    "researcher",
-            "message": "✅ Research complete. Starting copywriting...",
-            "payload": researcher_output.model_dump(),
+            "status":      "researching",
+            "step":        "researcher",
+            "message":     "✅ Research complete. Starting copywriting...",
+            "payload":     None,
+            "payload_ref": researcher_ref,
         })
 
-        task_queue.enqueue(
-            copywriter_task,
-            kwargs={
-                "job_id":            job_id,
-                "clarifier_output":  clarifier_output,
-                "researcher_output": researcher_output.model_dump(),
-            },
-            job_timeout=300,
-        )
-
+        # Research runs once; every A/B variant fans out from here
+        for variant in range(variants):
+            enqueue_step(job_id, copywriter_task, {
+                "job_id":         job_id,
+                "clarifier_ref":  clarifier_ref,
+                "researcher_ref": researcher_ref,
+                "variant":        variant,
+                "variants":       variants,
+                "deadline":       deadline,
+            })
+
+    except JobCancelled:
+        return   # Cancelled from the API, which already published the terminal status
     except Exception as e:
-        _update_job_status(supabase, job_id, "failed", error=str(e))
-        publish_job_update(job_id, {"status": "failed", "step": "researcher", "message": f"❌ Research failed: {str(e)}", "payload": None})
+        if _schedule_auto_resume(job_id, "researching", "researcher", researcher_task,
+                                 {"job_id": job_id, "clarifier_ref": clarifier_ref,
+                                  "variants": variants, "deadline": deadline}, str(e)):
+            raise
+        if _update_job_status(supabase, job_id, "failed", error=str(e)):
+            publish_job_update(job_id, {"status": "failed", "step": "researcher", "message": f"❌ Research failed: {str(e)}", "payload": None})
         raise
 
 
 # ── STEP 3: Copywriter ─────────────────────────────────────────────────────
-def copywriter_task(job_id: str, clarifier_output: dict, researcher_output: dict) -> None:
-    from app.schemas.copywriter import LandingPageContent
+def copywriter_task(job_id: str, clarifier_ref: str, researcher_ref: str,
+                    variant: int = 0, variants: int = 1, deadline: float | None = None) -> None:
+    from app.pipeline.copywriter import generate_landing_copy
 
     supabase = _get_supabase()
     start_time = time.time()
 
     try:
+        check_cancelled(job_id)
         _update_job_status(supabase, job_id, "copywriting")
         publish_job_update(job_id, {
             "status":  "copywriting",
@@ -242,100 +418,111 @@ def copywriter_task(job_id: str, clarifier_output: dict, researcher_output: dict
             "payload": None,
         })
 
-        from google import genai as google_genai
-        llm = google_genai.Client(api_key=settings.gemini_api_key)
-
-        lang        = "Arabic" if clarifier_output["direction"] == "rtl" else "English"
-        dialect     = clarifier_output.get("dialect", "Modern Standard Arabic")
-        tone        = clarifier_output.get("tone", "professional")
-        biz_name    = clarifier_output["business_name"]
-        biz_type    = clarifier_output["business_type"]
-        city        = clarifier_output["target_city"]
-        usp         = clarifier_output.get("usp") or "quality and trust"
-        pain_points = "\n".join(f"- {p}" for p in researcher_output.get("local_pain_points", []))
-        hooks       = "\n".join(f"- {h}" for h in researcher_output.get("cultural_hooks", []))
-
-        prompt = f"""You are an expert landing page copywriter specializing in {lang} marketing copy for the MENA region.
-
-Business: {biz_name}
-Type: {biz_type}
-City: {city}
-Tone: {tone}
-Dialect: {dialect}
-USP: {usp}
-
-LOCAL PAIN POINTS:
-{pain_points}
-
-CULTURAL HOOKS:
-{hooks}
-
-Return ONLY a valid JSON object:
-{{
-  "hero": {{
-    "headline": "string (max 10 words, powerful, in {lang})",
-    "subheadline": "string (max 20 words, clarifies the value, in {lang})",
-    "cta_text": "string (max 5 words, action verb, in {lang})"
-  }},
-  "features": [
-    {{"title": "string", "description": "string"}}
-  ],
-  "benefits": [
-    {{"title": "string", "description": "string"}}
-  ],
-  "cta_headline": "string (urgency-driven, in {lang})",
-  "cta_subtext": "string (reassurance, in {lang})",
-  "cta_button_text": "string (max 4 words, in {lang})",
-  "social_proof": "string or null"
-}}
-
-- features: exactly 3 items
-- benefits: exactly 3 items
-- All text in {lang} ({dialect})
-- Return ONLY valid JSON. No markdown, no explanation."""
-
-        response = llm.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-
-        copy_output = LandingPageContent.model_validate_json(clean_llm_json(response.text))
+        clarifier_output  = get_artifact(supabase, clarifier_ref)
+        researcher_output = get_artifact(supabase, researcher_ref)
+
+        # Hero, features, benefits and CTA are generated concurrently
+        copy_output = generate_landing_copy(
+            clarifier_output, researcher_output,
+            angle=VARIANT_ANGLES[variant % MAX_VARIANTS],
+            job_id=job_id,
+            llm_options=llm_budget(job_id, deadline, "copywriter"),
+        )
         duration_ms = int((time.time() - start_time) * 1000)
 
+        copy_ref = put_artifact(supabase, copy_output.model_dump())
         _save_step(
             supabase, job_id, "copywriter", 3,
-            {"clarifier_output": clarifier_output, "researcher_output": researcher_output},
-            copy_output.model_dump(), duration_ms,
+            {"clarifier_output": clarifier_ref, "researcher_output": researcher_ref},
+            copy_ref, duration_ms, variant=variant, prompt_version=COPYWRITER_SECTION.id,
         )
 
         publish_job_update(job_id, {
-            "status":  "completed",
-            "step":    "copywriter",
-            "message": "✅ Copy ready. Building page structure...",
-            "payload": copy_output.model_dump(),
+            "status":      "copywriting",   # Not terminal: the structure builder still has to run
+            "step":        "copywriter",
+            "message":     "✅ Copy ready. Building page structure...",
+            "payload":     None,
+            "payload_ref": copy_ref,
+            "variant":     variant,
         })
 
-        task_queue.enqueue(
-            structure_builder_task,
-            kwargs={
-                "job_id":           job_id,
-                "clarifier_output": clarifier_output,
-                "copy_output":      copy_output.model_dump(),
-            },
-            job_timeout=300,
-        )
+        enqueue_step(job_id, structure_builder_task, {
+            "job_id":        job_id,
+            "clarifier_ref": clarifier_ref,
+            "copy_ref":      copy_ref,
+            "variant":       variant,
+            "variants":      variants,
+            "deadline":      deadline,
+        })
 
+    except JobCancelled:
+        return   # Cancelled from the API, which already published the terminal status
     except Exception as e:
-        _update_job_status(supabase, job_id, "failed", error=str(e))
-        publish_job_update(job_id, {"status": "failed", "step": "copywriter", "message": f"❌ Copywriting failed: {str(e)}", "payload": None})
+        if _schedule_auto_resume(job_id, "copywriting", "copywriter", copywriter_task,
+                                 {"job_id": job_id, "clarifier_ref": clarifier_ref,
+                                  "researcher_ref": researcher_ref,
+                                  "variant": variant, "variants": variants,
+                                  "deadline": deadline}, str(e)):
+            raise
+        if _update_job_status(supabase, job_id, "failed", error=str(e)):
+            publish_job_update(job_id, {"status": "failed", "step": "copywriter", "message": f"❌ Copywriting failed: {str(e)}", "payload": None})
         raise
 
 
 # ── STEP 4: Structure Builder ──────────────────────────────────────────────
-def structure_builder_task(job_id: str, clarifier_output: dict, copy_output: dict) -> None:
-    from app.schemas.structure import LandingPageStructure, ComponentBlock, ThemeConfig
+def _build_layout(clarifier_output: dict, copy_output: dict) -> list:
+    """Maps clarifier + copy outputs onto the page's ComponentBlocks (no external calls)."""
+    from app.schemas.structure import ComponentBlock
+
+    is_rtl   = clarifier_output.get("direction") == "rtl"
+    locale   = clarifier_output.get("locale", "ar-SA")
+    is_gcc   = any(code in locale for code in ["ar-SA", "ar-AE", "ar-KW", "ar-QA", "ar-BH", "ar-OM"])
+    biz_name = clarifier_output.get("business_name", "")
+    hero     = copy_output["hero"]
+    features = copy_output["features"]
+    benefits = copy_output["benefits"]
+
+    layout = [
+        ComponentBlock(id="hero-1", type="hero", data={
+            "headline":    hero["headline"],
+            "subheadline": hero["subheadline"],
+            "cta_text":    hero["cta_text"],
+            "social_proof": copy_output.get("social_proof"),
+        }),
+        ComponentBlock(id="features-1", type="features", data={
+            "title": "مميزاتنا" if is_rtl else "Our Features",
+            "items": features,
+        }),
+        ComponentBlock(id="benefits-1", type="benefits", data={
+            "title": "لماذا نحن؟" if is_rtl else "Why Us?",
+            "items": benefits,
+        }),
+    ]
+
+    if is_gcc:
+        layout.append(ComponentBlock(id="whatsapp-cta-1", type="whatsapp_cta", data={
+            "headline":    copy_output.get("cta_headline"),
+            "subtext":     copy_output.get("cta_subtext"),
+            "button_text": copy_output.get("cta_button_text"),
+            "wa_message":  f"مرحباً، جئت من صفحة إتمام وأود الاستفسار عن خدمات {biz_name}",
+        }))
+
+    layout.append(ComponentBlock(id="footer-1", type="footer", data={
+        "text": "Built with ❤️ by Etm",
+        "brand_url": "https://etm.sa",
+    }))
+    return layout
+
+
+def structure_builder_task(job_id: str, clarifier_ref: str, copy_ref: str,
+                           variant: int = 0, variants: int = 1, deadline: float | None = None) -> None:
+    from app.schemas.structure import LandingPageStructure, ThemeConfig
 
     supabase = _get_supabase()
     start_time = time.time()
 
     try:
+        check_cancelled(job_id)
         _update_job_status(supabase, job_id, "building")
         publish_job_update(job_id, {
             "status":  "building",
@@ -344,43 +531,12 @@ def structure_builder_task(job_id: str, clarifier_output: dict, copy_output: dic
             "payload": None,
         })
 
-        is_rtl   = clarifier_output.get("direction") == "rtl"
-        locale   = clarifier_output.get("locale", "ar-SA")
-        is_gcc   = any(code in locale for code in ["ar-SA", "ar-AE", "ar-KW", "ar-QA", "ar-BH", "ar-OM"])
-        biz_name = clarifier_output.get("business_name", "")
-        hero     = copy_output["hero"]
-        features = copy_output["features"]
-        benefits = copy_output["benefits"]
-
-        layout = [
-            ComponentBlock(id="hero-1", type="hero", data={
-                "headline":    hero["headline"],
-                "subheadline": hero["subheadline"],
-                "cta_text":    hero["cta_text"],
-                "social_proof": copy_output.get("social_proof"),
-            }),
-            ComponentBlock(id="features-1", type="features", data={
-                "title": "مميزاتنا" if is_rtl else "Our Features",
-                "items": features,
-            }),
-            ComponentBlock(id="benefits-1", type="benefits", data={
-                "title": "لماذا نحن؟" if is_rtl else "Why Us?",
-                "items": benefits,
-            }),
-        ]
-
-        if is_gcc:
-            layout.append(ComponentBlock(id="whatsapp-cta-1", type="whatsapp_cta", data={
-                "headline":    copy_output.get("cta_headline"),
-                "subtext":     copy_output.get("cta_subtext"),
-                "button_text": copy_output.get("cta_button_text"),
-                "wa_message":  f"مرحباً، جئت من صفحة إتمام وأود الاستفسار عن خدمات {biz_name}",
-            }))
-
-        layout.append(ComponentBlock(id="footer-1", type="footer", data={
-            "text": "Built with ❤️ by Etm",
-            "brand_url": "https://etm.sa",
-        }))
+        clarifier_output = get_artifact(supabase, clarifier_ref)
+        copy_output      = get_artifact(supabase, copy_ref)
+
+        is_rtl = clarifier_output.get("direction") == "rtl"
+        locale = clarifier_output.get("locale", "ar-SA")
+        layout = _build_layout(clarifier_output, copy_output)
 
         structure = LandingPageStructure(
             brand_name="Etm",
@@ -393,25 +549,279 @@ def structure_builder_task(job_id: str, clarifier_output: dict, copy_output: dic
             locale=locale,
             layout=layout,
         )
-
         duration_ms = int((time.time() - start_time) * 1000)
 
-        _save_step(supabase, job_id, "structure_builder", 4, copy_output, structure.model_dump(), duration_ms)
+        structure_ref = put_artifact(supabase, structure.model_dump())
+        _save_step(
+            supabase, job_id, "structure_builder", 4,
+            {"clarifier_output": clarifier_ref, "copy_output": copy_ref},
+            structure_ref, duration_ms, variant=variant,
+        )
+
+        check_cancelled(job_id)
+        if variants > 1:
+            _finish_variant(supabase, job_id, variant, variants, structure_ref)
+            return
 
-        supabase.table("landing_page_jobs").update({
-            "status":     "completed",
-            "structure":  structure.model_dump(),
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", job_id).execute()
+        degraded = degradations(job_id)
+        if not flush_terminal(supabase, job_id, {
+            "status":       "completed",
+            "structure":    structure.model_dump(),
+            "degradations": degraded,
+            "updated_at":   datetime.now(timezone.utc).isoformat(),
+        }):
+            return   # Cancelled (or already finished) while this step ran
 
         publish_job_update(job_id, {
-            "status":  "completed",
-            "step":    "structure_builder",
-            "message": "🎉 Your landing page is ready!",
-            "payload": structure.model_dump(),
+            "status":       "completed",
+            "step":         "structure_builder",
+            "message":      "🎉 Your landing page is ready!",
+            "payload":      structure.model_dump(),   # Final page is the one payload clients always need
+            "payload_ref":  structure_ref,
+            "degradations": degraded,
+        })
+        _enqueue_page_assets(job_id, variant, structure_ref)
+
+    except JobCancelled:
+        return   # Cancelled from the API, which already published the terminal status
+    except Exception as e:
+        if _schedule_auto_resume(job_id, "building", "structure_builder", structure_builder_task,
+                                 {"job_id": job_id, "clarifier_ref": clarifier_ref,
+                                  "copy_ref": copy_ref,
+                                  "variant": variant, "variants": variants,
+                                  "deadline": deadline}, str(e)):
+            raise
+        if _update_job_status(supabase, job_id, "failed", error=str(e)):
+            publish_job_update(job_id, {"status": "failed", "step": "structure_builder", "message": f"❌ Structure build failed: {str(e)}", "payload": None})
+        raise
+
+
+def _finish_variant(supabase, job_id: str, variant: int, variants: int, structure_ref: str) -> None:
+    """
+    Stores one A/B variant under its parent job. The last variant to finish
+    marks the job completed; variant 0 stays the job's primary structure.
+    Completion is tracked as a Redis set so re-runs are idempotent.
+    """
+    structure = get_artifact(supabase, structure_ref)
+    with guard("supabase"):
+        supabase.table("landing_page_variants").upsert({
+            "job_id":        job_id,
+            "variant":       variant,
+            "angle":         VARIANT_ANGLES[variant % MAX_VARIANTS],
+            "structure":     structure,
+            "structure_ref": structure_ref,
+            "created_at":    datetime.now(timezone.utc).isoformat(),
+        }, on_conflict="job_id,variant").execute()
+
+    pipe = redis_conn.pipeline()
+    pipe.hset(_variant_refs_key(job_id), str(variant), structure_ref)
+    pipe.sadd(_variants_done_key(job_id), variant)
+    pipe.scard(_variants_done_key(job_id))
+    pipe.expire(_variant_refs_key(job_id), 24 * 3600)
+    pipe.expire(_variants_done_key(job_id), 24 * 3600)
+    done = pipe.execute()[2]
+
+    if done < variants:
+        publish_job_update(job_id, {
+            "status":      "building",
+            "step":        "structure_builder",
+            "message":     f"✅ Variant {variant + 1} ready ({done}/{variants})...",
+            "payload":     None,
+            "payload_ref": structure_ref,
+            "variant":     variant,
         })
+        return
+
+    variant_refs = {
+        int(k): v.decode() for k, v in redis_conn.hgetall(_variant_refs_key(job_id)).items()
+    }
+    primary = get_artifact(supabase, variant_refs[0])
+    degraded = degradations(job_id)
+
+    if not flush_terminal(supabase, job_id, {
+        "status":       "completed",
+        "structure":    primary,
+        "degradations": degraded,
+        "updated_at":   datetime.now(timezone.utc).isoformat(),
+    }):
+        return   # Cancelled (or already finished) while the variants ran
+
+    publish_job_update(job_id, {
+        "status":       "completed",
+        "step":         "structure_builder",
+        "message":      f"🎉 Your {variants} landing page variants are ready!",
+        "payload":      primary,
+        "payload_ref":  variant_refs[0],
+        "variant_refs": {str(k): v for k, v in sorted(variant_refs.items())},
+        "degradations": degraded,
+    })
+    for v, ref in sorted(variant_refs.items()):
+        _enqueue_page_assets(job_id, v, ref)
+
+
+# ── Block regeneration ─────────────────────────────────────────────────────
+# Copy section behind each regenerable block type (footer has no generated copy)
+BLOCK_SECTIONS = {
+    "hero":         "hero",
+    "features":     "features",
+    "benefits":     "benefits",
+    "whatsapp_cta": "cta",
+}
+
+
+def _structure_lock_key(job_id: str, variant: int) -> str:
+    return f"job:{job_id}:structure_lock:{variant}"
+
+
+def _store_page_structure(supabase, job_id: str, variant: int, structure: dict, structure_ref: str) -> None:
+    """Publishes an edited page variant. Call under the variant's structure lock, after _save_step."""
+    # The next edit reads the step rows back under the same lock; wait out a busy flusher
+    flush(supabase, blocking_timeout=LOCK_TIMEOUT_SECONDS)
+
+    now = datetime.now(timezone.utc).isoformat()
+    with guard("supabase"):
+        if variant == 0:
+            supabase.table("landing_page_jobs").update({
+                "structure":     structure,
+                "structure_ref": structure_ref,
+                "archived_at":   None,
+                "updated_at":    now,
+            }).eq("id", job_id).execute()
+        supabase.table("landing_page_variants").update({
+            "structure":     structure,
+            "structure_ref": structure_ref,
+            "archived_at":   None,
+        }).eq("job_id", job_id).eq("variant", variant).execute()
+
+
+def regenerate_block_task(job_id: str, block_id: str, variant: int = 0,
+                          instructions: str | None = None) -> None:
+    """
+    Rewrites the copy of one ComponentBlock of a completed page with a single
+    section-sized LLM call, reusing the stored clarifier/researcher/copy
+    outputs. The copy and structure are patched (new artifacts + job_steps
+    rows, so a later resume or regeneration builds on the edit) and one
+    block-level event is published. The job itself stays "completed".
+    """
+    from app.pipeline.copywriter import build_copy_context, generate_section
+
+    supabase = _get_supabase()
+    start_time = time.time()
+
+    try:
+        outputs = latest_step_outputs(supabase, job_id)
+        clarifier_ref  = outputs[("clarifier", 0)]
+        researcher_ref = outputs[("researcher", 0)]
+        clarifier_output = get_artifact(supabase, clarifier_ref)
+        structure = get_artifact(supabase, outputs[("structure_builder", variant)])
+
+        block = next((b for b in structure["layout"] if b["id"] == block_id), None)
+        if block is None or block["type"] not in BLOCK_SECTIONS:
+            raise ValueError(f"Block {block_id} has no regenerable copy")
+        section = BLOCK_SECTIONS[block["type"]]
+
+        ctx = build_copy_context(
+            clarifier_output, get_artifact(supabase, researcher_ref),
+            angle=instructions or VARIANT_ANGLES[variant % MAX_VARIANTS],
+        )
+        section_copy = generate_section(section, ctx).model_dump()
+
+        # Read-modify-write of the stored copy/structure: one writer per page variant
+        with redis_conn.lock(_structure_lock_key(job_id, variant), timeout=60, blocking_timeout=30):
+            outputs = latest_step_outputs(supabase, job_id)
+            old_copy_ref = outputs[("copywriter", variant)]
+            copy_output = {**get_artifact(supabase, old_copy_ref), **section_copy}
+            copy_ref = put_artifact(supabase, copy_output)
+
+            structure = get_artifact(supabase, outputs[("structure_builder", variant)])
+            new_block = next(b for b in _build_layout(clarifier_output, copy_output) if b.id == block_id)
+            structure["layout"] = [
+                new_block.model_dump() if b["id"] == block_id else b for b in structure["layout"]
+            ]
+            structure_ref = put_artifact(supabase, structure)   # Keeps the old assets until page_assets_task
+
+            duration_ms = int((time.time() - start_time) * 1000)
+            _save_step(
+                supabase, job_id, "copywriter", 3,
+                {"clarifier_output": clarifier_ref, "researcher_output": researcher_ref,
+                 "copy_output": old_copy_ref, "block_id": block_id},
+                copy_ref, duration_ms, variant=variant, prompt_version=COPYWRITER_SECTION.id,
+            )
+            _save_step(
+                supabase, job_id, "structure_builder", 4,
+                {"clarifier_output": clarifier_ref, "copy_output": copy_ref},
+                structure_ref, 0, variant=variant,
+            )
+            _store_page_structure(supabase, job_id, variant, structure, structure_ref)
+
+        publish_job_update(job_id, {
+            "status":      "completed",
+            "step":        "block",
+            "message":     "✅ Section updated",
+            "block_id":    block_id,
+            "variant":     variant,
+            "payload":     new_block.model_dump(),
+            "payload_ref": structure_ref,
+        })
+        _enqueue_page_assets(job_id, variant, structure_ref)   # New text may need new glyphs
 
     except Exception as e:
-        _update_job_status(supabase, job_id, "failed", error=str(e))
-        publish_job_update(job_id, {"status": "failed", "step": "structure_builder", "message": f"❌ Structure build failed: {str(e)}", "payload": None})
+        # The page itself is untouched, so the job stays completed
+        publish_job_update(job_id, {
+            "status":   "completed",
+            "step":     "block",
+            "message":  f"❌ Section update failed: {str(e)}",
+            "block_id": block_id,
+            "variant":  variant,
+            "payload":  None,
+        })
         raise
+
+
+# ── Page assets ────────────────────────────────────────────────────────────
+def _enqueue_page_assets(job_id: str, variant: int, structure_ref: str) -> None:
+    if settings.font_subsetting:
+        enqueue_step(job_id, page_assets_task, {
+            "job_id": job_id, "variant": variant, "structure_ref": structure_ref,
+        })
+
+
+def page_assets_task(job_id: str, variant: int, structure_ref: str) -> None:
+    """
+    Adds the subsetted font + critical CSS (app/pipeline/fonts.py) to a
+    finished page variant, after the job has completed so subsetting never
+    counts against its deadline. Skipped if the page was edited since
+    `structure_ref` (that edit enqueues its own pass); on failure the page
+    keeps its current assets, or the hosted fonts.
+    """
+    supabase = _get_supabase()
+    start_time = time.time()
+
+    try:
+        with redis_conn.lock(_structure_lock_key(job_id, variant), timeout=60, blocking_timeout=30):
+            if latest_step_outputs(supabase, job_id).get(("structure_builder", variant)) != structure_ref:
+                return
+            structure = get_artifact(supabase, structure_ref)
+            assets = build_page_assets(supabase, structure)
+            if assets is None or assets == structure.get("assets"):
+                return
+
+            structure = {**structure, "assets": assets}
+            new_ref = put_artifact(supabase, structure)
+            _save_step(
+                supabase, job_id, "structure_builder", 4, {"structure": structure_ref},
+                new_ref, int((time.time() - start_time) * 1000), variant=variant,
+            )
+            _store_page_structure(supabase, job_id, variant, structure, new_ref)
+    except Exception as e:
+        print(f"⚠️  Font subsetting failed for job {job_id}, page keeps its fonts: {e}")
+        return
+
+    publish_job_update(job_id, {
+        "status":      "completed",
+        "step":        "assets",
+        "message":     "🔤 Page fonts optimized",
+        "variant":     variant,
+        "payload":     assets,
+        "payload_ref": new_ref,
+    })
@@ -0,0 +1,329 @@
+"""
+app/pipeline/writebehind.py
+───────────────────────────
+Write-behind buffer for the pipeline's Supabase writes.
+
+Every step used to make its own HTTP round trips: a status update when it
+starts, an artifact upsert per output and a job_steps insert when it ends.
+Now tasks buffer them in Redis (sub-millisecond, same connection the
+pipeline already uses):
+
+  - status updates : hash `writebehind:job_status`, one field per job — a
+                     newer update replaces the older one (coalescing)
+  - artifacts      : list `writebehind:step_artifacts` (put_artifact rows;
+                     Redis already holds the payload for readers)
+  - job_steps rows : list `writebehind:job_steps`
+
+A Flusher thread in each worker's long-lived parent process drains all three
+every WRITEBEHIND_FLUSH_INTERVAL_MS, across every job at once: one bulk
+upsert for the artifacts, one bulk insert for the steps, and one update per
+distinct status (`.in_("id", ...)` over all jobs in it, stamped with the
+newest updated_at of the group). It drains once more on shutdown. A task
+that pushes a list past WRITEBEHIND_MAX_BATCH flushes inline.
+Buffering in Redis rather than process memory matters because RQ runs every
+job in a forked work horse that exits without running shutdown hooks.
+
+Terminal states are never buffered: flush_terminal() drops the job's pending
+status, flushes pending steps and writes the final status synchronously, so
+a finished job's rows are durable before its final event is published.
+Neither a late buffered status nor another terminal write can overwrite a
+terminal one (both updates filter on status): a step failing after the user
+cancelled leaves the job "cancelled".
+
+Flushes are serialized across workers with a Redis lock. A tick that finds
+it held skips (another worker is flushing; the next tick catches up); a
+terminal write waits up to TERMINAL_LOCK_WAIT_SECONDS, then writes the final
+status anyway and leaves its steps to the next tick. A batch is renamed to a
+`:flushing` key before writing and only deleted after the write succeeded,
+so a failed flush is retried on the next tick, not lost.
+
+A batch can never block the buffer behind it:
+  - Supabase rejects a bulk write's content (is_request_error, e.g. an FK
+    violation for a deleted job): the batch is retried row by row, and the
+    rows it still rejects go to the dead-letter list `<key>:dead` with the
+    error, for inspection.
+  - Any other error is retried on later ticks; after WRITEBEHIND_MAX_ATTEMPTS
+    failed attempts (an open breaker or full bulkhead is not an attempt) the
+    whole batch is dead-lettered.
+Each kind (artifacts, steps, statuses) is flushed even if another failed.
+
+Metrics (`writebehind:metrics`): every Supabase request made here is counted
+as a round trip and every terminal write as a finished job, so
+`round_trips_per_job` is the write cost of one job end to end.
+"""
+
+import threading
+import time
+
+import orjson
+import redis
+from redis.exceptions import LockError
+
+from app.config import settings
+from app.database import get_supabase_client
+from app.redis_client import redis_conn
+from app.pipeline.resilience import BulkheadFullError, CircuitOpenError, guard, is_request_error
+
+
+STEPS_KEY  = "writebehind:job_steps"
+STATUS_KEY = "writebehind:job_status"
+ARTIFACTS_KEY = "writebehind:step_artifacts"
+LOCK_KEY   = "writebehind:flush_lock"
+METRICS_KEY = "writebehind:metrics"
+LOCK_TIMEOUT_SECONDS = 30
+TERMINAL_LOCK_WAIT_SECONDS = 5
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+# ── Buffering (called from tasks) ──────────────────────────────────────────
+def buffer_status(job_id: str, update_data: dict) -> None:
+    redis_conn.hset(STATUS_KEY, job_id, orjson.dumps(update_data))
+
+
+def buffer_step(supabase, row: dict) -> None:
+    pending = redis_conn.rpush(STEPS_KEY, orjson.dumps(row))
+    if pending >= settings.writebehind_max_batch:
+        flush(supabase, blocking_timeout=TERMINAL_LOCK_WAIT_SECONDS)
+
+
+def buffer_artifact(supabase, row: dict) -> None:
+    pending = redis_conn.rpush(ARTIFACTS_KEY, orjson.dumps(row))
+    if pending >= settings.writebehind_max_batch:
+        flush(supabase, blocking_timeout=TERMINAL_LOCK_WAIT_SECONDS)
+
+
+# ── Flushing ───────────────────────────────────────────────────────────────
+def _claim(key: str) -> str | None:
+    """Moves the live buffer aside; a batch left by a failed flush is retried first."""
+    flushing = f"{key}:flushing"
+    if not redis_conn.exists(flushing):
+        try:
+            redis_conn.rename(key, flushing)
+        except redis.ResponseError:   # Nothing buffered
+            return None
+    return flushing
+
+
+def _dead_letter(key: str, entries: list, error: Exception) -> None:
+    """Sets rows Supabase will not take aside in `<key>:dead`, so they stop blocking the buffer."""
+    if not entries:
+        return
+    failed_at = time.time()
+    pipe = redis_conn.pipeline()
+    for entry in entries:
+        pipe.rpush(f"{key}:dead", orjson.dumps({"entry": entry, "error": str(error)[:500], "at": failed_at}))
+    pipe.hincrby(METRICS_KEY, "dead_lettered", len(entries))
+    pipe.execute()
+    print(f"⚠️  Write-behind dead-lettered {len(entries)} entries of {key}: {error}")
+
+
+def _attempt_failed(key: str, batch: str, entries: list, error: Exception) -> None:
+    """Counts a failed write of `batch`; at WRITEBEHIND_MAX_ATTEMPTS it is dead-lettered."""
+    if isinstance(error, (CircuitOpenError, BulkheadFullError)):
+        return   # Never reached Supabase
+    attempts = redis_conn.incr(f"{batch}:attempts")
+    if attempts >= settings.writebehind_max_attempts:
+        _dead_letter(key, entries, error)
+        redis_conn.delete(batch, f"{batch}:attempts")
+
+
+def _flush_rows(supabase, key: str, write) -> tuple[int, int]:
+    """
+    Drains a buffered row list with one bulk `write(rows)`, falling back to
+    one row at a time if Supabase rejects the batch's content. Returns
+    (rows written, round trips).
+    """
+    batch = _claim(key)
+    if batch is None:
+        return 0, 0
+    rows = [orjson.loads(raw) for raw in redis_conn.lrange(batch, 0, -1)]
+    if not rows:
+        redis_conn.delete(batch)
+        return 0, 0
+    try:
+        with guard("supabase"):
+            write(rows).execute()
+    except Exception as e:
+        if not is_request_error(e):
+            _attempt_failed(key, batch, rows, e)
+            raise
+        written, round_trips = _flush_row_by_row(supabase, key, batch, write)
+        return written, round_trips + 1
+    redis_conn.delete(batch, f"{batch}:attempts")
+    return len(rows), 1
+
+
+def _flush_row_by_row(supabase, key: str, batch: str, write) -> tuple[int, int]:
+    """Writes a rejected batch one row at a time; rows handled are popped, so progress survives a crash."""
+    written = round_trips = 0
+    while (raw := redis_conn.lindex(batch, 0)) is not None:
+        row = orjson.loads(raw)
+        round_trips += 1
+        try:
+            with guard("supabase"):
+                write([row]).execute()
+            written += 1
+        except Exception as e:
+            if not is_request_error(e):
+                _attempt_failed(key, batch, [orjson.loads(r) for r in redis_conn.lrange(batch, 0, -1)], e)
+                raise
+            _dead_letter(key, [row], e)
+        redis_conn.lpop(batch)
+    redis_conn.delete(batch, f"{batch}:attempts")
+    return written, round_trips
+
+
+def _flush_artifacts(supabase) -> tuple[int, int]:
+    # Refs are content hashes: duplicates within or across batches are the same payload
+    return _flush_rows(supabase, ARTIFACTS_KEY, lambda rows: supabase.table("step_artifacts").upsert(
+        list({row["ref"]: row for row in rows}.values()), on_conflict="ref", ignore_duplicates=True,
+    ))
+
+
+def _flush_steps(supabase) -> tuple[int, int]:
+    return _flush_rows(supabase, STEPS_KEY, lambda rows: supabase.table("job_steps").insert(rows))
+
+
+def _flush_statuses(supabase) -> tuple[int, int]:
+    """One update per distinct status across all jobs; updated_at is the group's newest."""
+    batch = _claim(STATUS_KEY)
+    if batch is None:
+        return 0, 0
+    groups: dict[bytes, tuple[dict, list[str]]] = {}
+    for job_id, raw in redis_conn.hgetall(batch).items():
+        update = orjson.loads(raw)
+        updated_at = update.pop("updated_at", None)
+        update_data, job_ids = groups.setdefault(orjson.dumps(update, option=orjson.OPT_SORT_KEYS), (update, []))
+        if updated_at and updated_at > update_data.get("updated_at", ""):
+            update_data["updated_at"] = updated_at   # ISO-8601 UTC strings sort chronologically
+        job_ids.append(job_id.decode())
+
+    for update_data, job_ids in groups.values():
+        entries = [{"job_id": job_id, "update": update_data} for job_id in job_ids]
+        try:
+            with guard("supabase"):
+                (
+                    supabase.table("landing_page_jobs")
+                    .update(update_data)
+                    .in_("id", job_ids)
+                    .not_.in_("status", list(TERMINAL_STATUSES))
+                    .execute()
+                )
+        except Exception as e:
+            if not is_request_error(e):
+                _attempt_failed(STATUS_KEY, batch, entries, e)
+                raise   # Groups already written are idempotent to repeat
+            _dead_letter(STATUS_KEY, entries, e)
+    redis_conn.delete(batch, f"{batch}:attempts")
+    return sum(len(job_ids) for _, job_ids in groups.values()), len(groups)
+
+
+def flush(supabase=None, blocking_timeout: float = 0) -> tuple[int, int, int]:
+    """
+    Writes every buffered artifact, step and status. Returns (artifacts,
+    steps, statuses) written — all zero if another worker held the flush
+    lock for longer than `blocking_timeout`. Every kind is attempted; the
+    first error is raised afterwards.
+    """
+    supabase = supabase or get_supabase_client()
+    lock = redis_conn.lock(LOCK_KEY, timeout=LOCK_TIMEOUT_SECONDS)
+    if not lock.acquire(blocking_timeout=blocking_timeout):
+        redis_conn.hincrby(METRICS_KEY, "lock_busy", 1)
+        return 0, 0, 0
+    written, trips, errors = [], [], []
+    try:
+        # Artifacts before the steps that reference them
+        for flush_kind in (_flush_artifacts, _flush_steps, _flush_statuses):
+            try:
+                count, round_trips = flush_kind(supabase)
+            except Exception as e:
+                errors.append(e)
+                count, round_trips = 0, 1
+            written.append(count)
+            trips.append(round_trips)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            pass   # Expired mid-flush; batches are idempotent to retry
+    artifacts, steps, statuses = written
+    round_trips = sum(trips)
+    if round_trips:
+        pipe = redis_conn.pipeline()
+        pipe.hincrby(METRICS_KEY, "flushes", 1)
+        pipe.hincrby(METRICS_KEY, "artifacts", artifacts)
+        pipe.hincrby(METRICS_KEY, "steps", steps)
+        pipe.hincrby(METRICS_KEY, "statuses", statuses)
+        pipe.hincrby(METRICS_KEY, "round_trips", round_trips)
+        pipe.execute()
+    if errors:
+        raise errors[0]
+    return artifacts, steps, statuses
+
+
+def flush_terminal(supabase, job_id: str, update_data: dict) -> bool:
+    """
+    Synchronous write of a terminal job status: its buffered status is
+    superseded, pending artifacts and steps are flushed first, then the
+    final row update. The final update is written even if the flush lock
+    stays busy; the job's steps then land with the next tick.
+    Returns False if the job already had a terminal status (left as it was),
+    in which case the caller must not publish its own.
+    """
+    redis_conn.hdel(STATUS_KEY, job_id)
+    try:
+        flush(supabase, blocking_timeout=TERMINAL_LOCK_WAIT_SECONDS)
+    except Exception as e:
+        print(f"⚠️  Write-behind flush before terminal status failed, left for the next tick: {e}")
+    with guard("supabase"):
+        result = (
+            supabase.table("landing_page_jobs")
+            .update(update_data)
+            .eq("id", job_id)
+            .not_.in_("status", list(TERMINAL_STATUSES))
+            .execute()
+        )
+    pipe = redis_conn.pipeline()
+    pipe.hincrby(METRICS_KEY, "round_trips", 1)
+    pipe.hincrby(METRICS_KEY, "jobs", 1)
+    pipe.execute()
+    return bool(result.data)
+
+
+def writebehind_stats() -> dict:
+    raw = redis_conn.hgetall(METRICS_KEY)
+    stats = {k.decode(): int(v) for k, v in raw.items()}
+    stats["pending_artifacts"] = redis_conn.llen(ARTIFACTS_KEY)
+    stats["pending_steps"]     = redis_conn.llen(STEPS_KEY)
+    stats["pending_statuses"]  = redis_conn.hlen(STATUS_KEY)
+    stats["dead_letters"] = {
+        key.split(":")[1]: redis_conn.llen(f"{key}:dead") for key in (ARTIFACTS_KEY, STEPS_KEY, STATUS_KEY)
+    }
+    jobs = stats.get("jobs", 0)
+    stats["round_trips_per_job"] = stats.get("round_trips", 0) / jobs if jobs else 0.0
+    return stats
+
+
+# ── Background flusher (worker parent process) ─────────────────────────────
+class Flusher(threading.Thread):
+    def __init__(self):
+        super().__init__(name="writebehind-flusher", daemon=True)
+        self._stopping = threading.Event()
+
+    def run(self) -> None:
+        interval = settings.writebehind_flush_interval_ms / 1000
+        while not self._stopping.wait(interval):
+            try:
+                flush()
+            except Exception as e:
+                print(f"⚠️  Write-behind flush failed, retrying next tick: {e}")
+
+    def stop(self) -> None:
+        """Stops the loop and drains whatever is still buffered."""
+        self._stopping.set()
+        self.join(timeout=5)
+        try:
+            flush(blocking_timeout=TERMINAL_LOCK_WAIT_SECONDS)
+        except Exception as e:
+            print(f"⚠️  Final write-behind flush failed (left in Redis for the next worker): {e}")
@@ -0,0 +1,105 @@
+"""
+app/pubsub.py
+─────────────
+One Redis pub/sub subscription per API process, shared by every socket.
+
+Listeners register interest in a job id; the hub subscribes to
+`job:{job_id}:updates` when the first listener arrives and unsubscribes when
+the last one leaves. A single reader task fans raw message bytes out to the
+listeners — no per-connection Redis connection, no per-listener decoding.
+
+Listeners are plain callables `(job_id, raw_message)` and must not block;
+they typically stash the bytes and wake an asyncio task.
+"""
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+
+Listener = Callable[[str, bytes], None]
+
+
+def _channel(job_id: str) -> str:
+    return f"job:{job_id}:updates"
+
+
+class JobUpdateHub:
+    def __init__(self):
+        self._listeners: dict[str, set[Listener]] = defaultdict(set)
+        self._redis = None
+        self._pubsub = None
+        self._reader: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_started(self) -> None:
+        if self._pubsub is None:
+            self._redis = aioredis.from_url(settings.redis_url, decode_responses=False)
+            self._pubsub = self._redis.pubsub()
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read_loop())
+
+    async def subscribe(self, job_id: str, listener: Listener) -> None:
+        async with self._lock:
+            await self._ensure_started()
+            first = not self._listeners[job_id]
+            self._listeners[job_id].add(listener)
+            if first:
+                await self._pubsub.subscribe(_channel(job_id))
+
+    async def unsubscribe(self, job_id: str, listener: Listener) -> None:
+        async with self._lock:
+            listeners = self._listeners.get(job_id)
+            if not listeners:
+                return
+            listeners.discard(listener)
+            if not listeners:
+                del self._listeners[job_id]
+                await self._pubsub.unsubscribe(_channel(job_id))
+
+    @property
+    def watched_jobs(self) -> int:
+        return len(self._listeners)
+
+    async def _read_loop(self) -> None:
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.1)
+                    continue
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message or message["type"] != "message":
+                    continue
+                job_id = message["channel"].decode().split(":")[1]
+                for listener in list(self._listeners.get(job_id, ())):
+                    listener(job_id, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Job update hub error, resubscribing: {e}")
+                await asyncio.sleep(1.0)
+                await self._resubscribe()
+
+    async def _resubscribe(self) -> None:
+        async with self._lock:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = self._redis.pubsub()
+            if self._listeners:
+                await self._pubsub.subscribe(*(_channel(j) for j in self._listeners))
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            await self._redis.aclose()
+
+
+hub = JobUpdateHub()
@@ -4,12 +4,15 @@ app/redis_client.py
 Provides:
   - `redis_conn`  : raw Redis connection (for SSE pub/sub + direct key reads)
   - `task_queue`  : RQ Queue for dispatching background pipeline tasks
+  - `publish_job_update` / `job_version` : job update events and the job's
+    state version (bumped on every published update, used by long-poll status)
 """
 
 import redis
 from rq import Queue
 
 from app.config import settings
+from app.events import encode_job_update
 
 
 # ── Redis Connection ───────────────────────────────────────────────────────
@@ -29,6 +32,19 @@ task_queue = Queue(
 )
 
 
+JOB_VERSION_TTL_SECONDS = 24 * 3600
+
+
+def _version_key(job_id: str) -> str:
+    return f"job:{job_id}:version"
+
+
+def job_version(job_id: str) -> int:
+    """How many updates the job has published (0 if none, or expired)."""
+    raw = redis_conn.get(_version_key(job_id))
+    return int(raw) if raw else 0
+
+
 def publish_job_update(job_id: str, data: dict) -> None:
     """
     Publishes a job status update to a Redis pub/sub channel.
@@ -38,8 +54,14 @@ def publish_job_update(job_id: str, data: dict) -> None:
     Args:
         job_id: The UUID of the landing page job.
         data:   Dict with keys: 'status', 'step', 'message', 'payload'
+
+    Every update bumps the job's state version, which is sent along as
+    `version` so clients can long-poll /status with `since=<version>`.
     """
-    import json
+    pipe = redis_conn.pipeline()
+    pipe.incr(_version_key(job_id))
+    pipe.expire(_version_key(job_id), JOB_VERSION_TTL_SECONDS)
+    version = pipe.execute()[0]
 
     channel = f"job:{job_id}:updates"
-    redis_conn.publish(channel, json.dumps(data))
+    redis_conn.publish(channel, encode_job_update({**data, "version": version}))
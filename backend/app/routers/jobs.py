@@ -3,14 +3,18 @@ app/routers/jobs.py
 ───────────────────
 Endpoints:
   POST /api/jobs/create          → Verify JWT, create job, enqueue Clarifier
-  GET  /api/jobs/{job_id}/status → Poll job status
+  GET  /api/jobs/{job_id}/status → Poll job status (long-poll with ?wait=&since=)
+  POST /api/jobs/{job_id}/resume → Re-run a failed job from its failed step
+  POST /api/jobs/{job_id}/cancel → Stop a pending/running job
+  GET  /api/jobs/{job_id}/variants → A/B variant structures of a job
+  POST /api/jobs/{job_id}/blocks/{block_id}/regenerate → Rewrite one section's copy
   GET  /api/jobs/stream/{job_id} → SSE stream (auth via ?token=)
+  GET  /api/jobs/{job_id}/artifacts/{ref} → Lazily fetch a step output by reference
 """
 
-import json
 import asyncio
 from datetime import datetime, timezone, timedelta
-from uuid import uuid4
+from uuid import UUID, uuid4
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Depends, Request, Query
@@ -18,19 +22,30 @@ from fastapi.responses import StreamingResponse
 import httpx
 from jose import jwt, JWTError, jwk
 from jose.utils import base64url_decode
-import json
+import orjson
 
 from app.config import settings
-from app.database import supabase_client
-from app.redis_client import redis_conn, task_queue, publish_job_update
+from app.database import get_supabase_client
+from app.redis_client import redis_conn, task_queue, publish_job_update, job_version
+from app.pipeline.control import enqueue_step, new_deadline, request_cancel
+from app.events import TERMINAL_STATUSES, split_job_update, sse_frame
 from app.schemas.job import (
     JobCreateRequest,
     JobCreateResponse,
     JobStatusResponse,
+    JobResumeResponse,
+    JobCancelResponse,
+    BlockRegenerateRequest,
+    BlockRegenerateResponse,
 )
-from app.pipeline.tasks import clarifier_task
+from app.pipeline.registry import CLARIFIER_TASK, REGENERATE_BLOCK_TASK
+from app.pipeline.resume import resume_job
+from app.pipeline.artifacts import get_artifact, job_uses_ref
+from app.pipeline.archive import rehydrate_structure
+from app.pipeline.resilience import provider_health
+from app.pipeline.writebehind import STATUS_KEY as PENDING_STATUS_KEY, TERMINAL_STATUSES as TERMINAL_JOB_STATUSES
+from app.pubsub import hub
 from fastapi.security import HTTPBearer
-from supabase import create_client
 
 
 
@@ -68,8 +83,11 @@ async def verify_supabase_jwt(request: Request) -> dict:
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
 
-    token = auth_header.split(" ")[1]
+    return await decode_supabase_token(auth_header.split(" ")[1])
 
+
+async def decode_supabase_token(token: str) -> dict:
+    """Validates a raw Supabase access token (shared by HTTP and WebSocket auth)."""
     try:
         # Get the key id from token header
         unverified_header = jwt.get_unverified_header(token)
@@ -141,7 +159,7 @@ async def create_job(
     user: dict = Depends(verify_supabase_jwt),
 ):
     """
-    1. Verifies Supabase JWT
+    1. Verifies Supabase JWT (and rejects with 503 if a provider breaker is open)
     2. Creates a landing_page_jobs row in Supabase
     3. Enqueues the clarifier_task in Redis via RQ
     4. Returns job_id + SSE stream URL with auth token
@@ -150,6 +168,15 @@ async def create_job(
     if not user_id:
         raise HTTPException(status_code=401, detail="Could not extract user ID from token")
 
+    # ── Reject early while a pipeline provider's breaker is open ───────────
+    unhealthy = [p for p, state in provider_health().items() if state == "open"]
+    if unhealthy:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Temporarily unavailable: {', '.join(unhealthy)} degraded. Please retry shortly.",
+            headers={"Retry-After": str(settings.breaker_cooldown_seconds)},
+        )
+
     job_id = str(uuid4())
 
     # ── Insert job into Supabase ───────────────────────────────────────────
@@ -162,20 +189,19 @@ async def create_job(
         "locale":         body.locale,
         "direction":      body.direction.value,
         "competitors_url": body.competitors_url,
+        "variants":       body.variants,   # Column DDL: "A/B Variants" in app/pipeline/tasks.py
         "status":         "pending",
         "created_at":     datetime.now(timezone.utc).isoformat(),
         "updated_at":     datetime.now(timezone.utc).isoformat(),
     }
 
-    result = supabase_client.table("landing_page_jobs").insert(job_data).execute()
+    result = get_supabase_client().table("landing_page_jobs").insert(job_data).execute()
     if not result.data:
         raise HTTPException(status_code=500, detail="Failed to create job in database")
 
     # ── Enqueue Clarifier task in RQ ───────────────────────────────────────
     print("⚡ Enqueuing job to Redis...", job_id)
-    task_queue.enqueue(
-    clarifier_task,
-    kwargs={
+    enqueue_step(job_id, CLARIFIER_TASK, {
         "job_id": job_id,
         "job_input": {
             "business_name": body.business_name,
@@ -183,10 +209,10 @@ async def create_job(
             "target_city":   body.target_city,
             "locale":        body.locale,
             "direction":     body.direction.value,
+            "variants":      body.variants,
         },
-    },
-    job_timeout=300,
-)
+        "deadline": new_deadline(),
+    })
     print("✅ Job enqueued!")
 
 
@@ -206,22 +232,297 @@ async def create_job(
 @router.get("/{job_id}/status", response_model=JobStatusResponse)
 async def get_job_status(
     job_id: str,
+    wait: int = Query(0, ge=0, description="Long-poll: seconds to wait for a change past `since`"),
+    since: Optional[int] = Query(None, ge=0, description="Last job state version the client has seen"),
     user: dict = Depends(verify_supabase_jwt),
 ):
-    """Polling endpoint. Returns current job status from Supabase."""
+    """
+    Polling endpoint. Returns current job status from Supabase.
+
+    Long-poll mode (`wait` + `since`): returns at once if the job's state
+    version has moved past `since`, otherwise waits on this process's shared
+    Redis subscription until the next update or `wait` seconds, whichever
+    comes first. Ownership is checked before waiting; the row is read again
+    only if the version moved while waiting.
+    """
+    user_id = user.get("sub")
+    version = job_version(job_id)   # Read before the row, so the row is at least this new
+    data = _read_job_status(job_id, user_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if wait and since is not None and version <= since:
+        waited = await _wait_for_update(job_id, since, min(wait, settings.status_long_poll_max_seconds))
+        if waited > version:
+            version, data = waited, _read_job_status(job_id, user_id) or data
+
+    return JobStatusResponse(**data, version=version)
+
+
+def _read_job_status(job_id: str, user_id: str) -> dict | None:
+    """The user's job row as JobStatusResponse fields, or None if it is not theirs."""
+    try:
+        UUID(job_id)
+    except ValueError:
+        return None
     result = (
-        supabase_client.table("landing_page_jobs")
+        get_supabase_client().table("landing_page_jobs")
+        .select("id, status, error_message, created_at, updated_at")
+        .eq("id", job_id)
+        .eq("user_id", user_id)  # RLS enforcement in application layer too
+        .limit(1)
+        .execute()
+    )
+    if not result.data:
+        return None
+
+    # A status still in the write-behind buffer is newer than the row, unless the row is terminal
+    row = result.data[0]
+    pending = None if row["status"] in TERMINAL_JOB_STATUSES else redis_conn.hget(PENDING_STATUS_KEY, job_id)
+    if pending:
+        row = {**row, **orjson.loads(pending)}
+    row["job_id"] = row.pop("id")
+    return row
+
+
+async def _wait_for_update(job_id: str, since: int, timeout: float) -> int:
+    """Waits (without a Redis connection of its own) until the job's version passes `since`."""
+    changed = asyncio.Event()
+
+    def on_update(_job_id: str, _raw: bytes) -> None:
+        changed.set()
+
+    await hub.subscribe(job_id, on_update)
+    try:
+        loop = asyncio.get_running_loop()
+        stop_at = loop.time() + timeout
+        # Re-check after subscribing: an update may have landed in between
+        while (version := job_version(job_id)) <= since:
+            left = stop_at - loop.time()
+            if left <= 0:
+                break
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=left)
+            except asyncio.TimeoutError:
+                break
+            changed.clear()
+        return version
+    finally:
+        await hub.unsubscribe(job_id, on_update)
+
+
+# ── POST /api/jobs/{job_id}/resume ─────────────────────────────────────────
+@router.post("/{job_id}/resume", response_model=JobResumeResponse)
+async def resume_failed_job(
+    job_id: str,
+    user: dict = Depends(verify_supabase_jwt),
+):
+    """
+    Resumes a failed job from its last successful step. Outputs already in
+    job_steps are reused, so only the failed step and those after it re-run.
+    """
+    user_id = user.get("sub")
+    result = (
+        get_supabase_client().table("landing_page_jobs")
         .select("*")
         .eq("id", job_id)
-        .eq("user_id", user.get("sub"))  # RLS enforcement in application layer too
-        .single()
+        .eq("user_id", user_id)
+        .limit(1)
         .execute()
     )
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    job = result.data[0]
+    if job["status"] != "failed":
+        raise HTTPException(status_code=409, detail=f"Only failed jobs can be resumed (status: {job['status']})")
+
+    job_input = {
+        "business_name": job["business_name"],
+        "business_type": job["business_type"],
+        "target_city":   job["target_city"],
+        "locale":        job["locale"],
+        "direction":     job["direction"],
+        "variants":      job.get("variants") or 1,
+    }
+    resumed_from = resume_job(get_supabase_client(), job_id, job_input)
+
+    stream_token = _generate_stream_token(job_id, user_id)
+    return JobResumeResponse(
+        job_id=job_id,
+        status="pending",
+        resumed_from=resumed_from,
+        stream_token=stream_token,
+        stream_url=f"/api/jobs/stream/{job_id}?token={stream_token}",
+    )
 
+
+# ── POST /api/jobs/{job_id}/cancel ─────────────────────────────────────────
+@router.post("/{job_id}/cancel", response_model=JobCancelResponse)
+async def cancel_job(
+    job_id: str,
+    user: dict = Depends(verify_supabase_jwt),
+):
+    """
+    Cancels a job that hasn't finished. Queued steps are removed, running
+    steps stop at their next check (in-flight LLM calls are aborted), and
+    no further steps are enqueued. Publishes the terminal `cancelled` status.
+    """
+    result = (
+        get_supabase_client().table("landing_page_jobs")
+        .select("id, status")
+        .eq("id", job_id)
+        .eq("user_id", user.get("sub"))
+        .limit(1)
+        .execute()
+    )
     if not result.data:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return JobStatusResponse(**result.data)
+    status = result.data[0]["status"]
+    if status in TERMINAL_JOB_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already finished (status: {status})")
+
+    removed = request_cancel(job_id)
+    redis_conn.hdel(PENDING_STATUS_KEY, job_id)   # A buffered "building" must not outlive the cancel
+    updated = (
+        get_supabase_client().table("landing_page_jobs")
+        .update({
+            "status":     "cancelled",
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+        .eq("id", job_id)
+        .not_.in_("status", list(TERMINAL_JOB_STATUSES))
+        .execute()
+    )
+    if not updated.data:
+        raise HTTPException(status_code=409, detail="Job already finished")
+    publish_job_update(job_id, {
+        "status":  "cancelled",
+        "step":    None,
+        "message": "🛑 Job cancelled",
+        "payload": None,
+    })
+
+    return JobCancelResponse(job_id=job_id, status="cancelled", removed_steps=removed)
+
+
+# ── GET /api/jobs/{job_id}/variants ────────────────────────────────────────
+@router.get("/{job_id}/variants")
+async def get_job_variants(
+    job_id: str,
+    user: dict = Depends(verify_supabase_jwt),
+):
+    """Returns every A/B variant stored under a job, ordered by variant index."""
+    owner = (
+        get_supabase_client().table("landing_page_jobs")
+        .select("id")
+        .eq("id", job_id)
+        .eq("user_id", user.get("sub"))
+        .limit(1)
+        .execute()
+    )
+    if not owner.data:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    result = (
+        get_supabase_client().table("landing_page_variants")
+        .select("variant, angle, structure, structure_ref, created_at")
+        .eq("job_id", job_id)
+        .order("variant")
+        .execute()
+    )
+    supabase = get_supabase_client()
+    return {"job_id": job_id, "variants": [rehydrate_structure(supabase, row) for row in result.data or []]}
+
+
+# ── POST /api/jobs/{job_id}/blocks/{block_id}/regenerate ──────────────────
+@router.post("/{job_id}/blocks/{block_id}/regenerate", response_model=BlockRegenerateResponse, status_code=202)
+async def regenerate_block(
+    job_id: str,
+    block_id: str,
+    body: BlockRegenerateRequest = BlockRegenerateRequest(),
+    user: dict = Depends(verify_supabase_jwt),
+):
+    """
+    Regenerates the copy of a single ComponentBlock of a completed page —
+    one section-sized LLM call instead of the whole pipeline. The patched
+    block is published as a `"step": "block"` event on the job's stream.
+    """
+    user_id = user.get("sub")
+    result = (
+        get_supabase_client().table("landing_page_jobs")
+        .select("id, status, variants, structure, structure_ref")
+        .eq("id", job_id)
+        .eq("user_id", user_id)
+        .limit(1)
+        .execute()
+    )
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    job = result.data[0]
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Only completed jobs can be edited (status: {job['status']})")
+    if body.variant >= (job.get("variants") or 1):
+        raise HTTPException(status_code=404, detail="Variant not found")
+    # Variants share block ids, so the primary structure is enough to validate against
+    layout = (rehydrate_structure(get_supabase_client(), job).get("structure") or {}).get("layout", [])
+    if not any(block["id"] == block_id for block in layout):
+        raise HTTPException(status_code=404, detail="Block not found")
+
+    task_queue.enqueue(
+        REGENERATE_BLOCK_TASK,
+        kwargs={
+            "job_id":       job_id,
+            "block_id":     block_id,
+            "variant":      body.variant,
+            "instructions": body.instructions,
+        },
+        job_timeout=120,
+    )
+
+    stream_token = _generate_stream_token(job_id, user_id)
+    return BlockRegenerateResponse(
+        job_id=job_id,
+        block_id=block_id,
+        variant=body.variant,
+        stream_token=stream_token,
+        stream_url=f"/api/jobs/stream/{job_id}?token={stream_token}",
+    )
+
+
+# ── GET /api/jobs/{job_id}/artifacts/{ref} ─────────────────────────────────
+@router.get("/{job_id}/artifacts/{ref}")
+async def get_step_artifact(
+    job_id: str,
+    ref: str,
+    user: dict = Depends(verify_supabase_jwt),
+):
+    """
+    Resolves a `payload_ref` from a stream event to the step output.
+    Refs are content hashes, so responses are immutable and cacheable.
+    Only refs used by a step of one of the caller's own jobs are served.
+    """
+    if len(ref) != 64 or any(c not in "0123456789abcdef" for c in ref):
+        raise HTTPException(status_code=400, detail="Invalid artifact reference")
+
+    supabase = get_supabase_client()
+    owned = (
+        supabase.table("landing_page_jobs")
+        .select("id")
+        .eq("id", job_id)
+        .eq("user_id", user.get("sub"))
+        .limit(1)
+        .execute()
+    ).data
+    if not owned or not job_uses_ref(supabase, job_id, ref):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    try:
+        return get_artifact(supabase, ref)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Artifact not found")
 
 
 # ── GET /api/jobs/stream/{job_id} ──────────────────────────────────────────
@@ -242,8 +543,10 @@ async def stream_job_updates(
         "status":  "researching",
         "step":    "clarifier",
         "message": "Analyzing your business...",
-        "payload": { ...step output... }
+        "payload": null,
+        "payload_ref": "<sha256>"   # fetch via /api/jobs/{job_id}/artifacts/{ref}
     }
+    Only the final structure_builder event carries its payload inline.
     """
     # Verify stream token
     token_data = _verify_stream_token(token)
@@ -262,12 +565,11 @@ async def stream_job_updates(
         channel = f"job:{job_id}:updates"
         pubsub.subscribe(channel)
 
-        terminal_states = {"completed", "failed"}
         heartbeat_interval = 15  # seconds
 
         try:
             # Send initial connection confirmation
-            yield f"data: {json.dumps({'status': 'connected', 'job_id': job_id})}\n\n"
+            yield sse_frame(orjson.dumps({"status": "connected", "job_id": job_id}))
 
             last_heartbeat = asyncio.get_event_loop().time()
 
@@ -276,17 +578,18 @@ async def stream_job_updates(
                 message = pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
 
                 if message and message["type"] == "message":
-                    data = json.loads(message["data"])
-                    yield f"data: {json.dumps(data)}\n\n"
+                    # Forward the published body verbatim — no decode/re-encode
+                    status, body = split_job_update(message["data"])
+                    yield sse_frame(body)
 
-                    # Close stream on terminal state
-                    if data.get("status") in terminal_states:
+                    # Close stream on terminal state (read from the header only)
+                    if status in TERMINAL_STATUSES:
                         break
 
                 # Heartbeat to prevent connection timeout
                 now = asyncio.get_event_loop().time()
                 if now - last_heartbeat > heartbeat_interval:
-                    yield f": heartbeat\n\n"
+                    yield b": heartbeat\n\n"
                     last_heartbeat = now
 
                 await asyncio.sleep(0.1)
@@ -312,8 +615,8 @@ async def stream_job_updates(
 async def get_public_job(job_id: str):
     """No auth required. Returns structure for a completed job."""
     result = (
-        supabase_client.table("landing_page_jobs")
-        .select("id, status, structure, created_at")
+        get_supabase_client().table("landing_page_jobs")
+        .select("id, status, structure, structure_ref, created_at")
         .eq("id", job_id)
         .eq("status", "completed")
         .single()
@@ -321,4 +624,4 @@ async def get_public_job(job_id: str):
     )
     if not result.data:
         raise HTTPException(status_code=404, detail="Job not found or not completed")
-    return result.data
+    return rehydrate_structure(get_supabase_client(), result.data)
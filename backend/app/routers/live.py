@@ -0,0 +1,175 @@
+"""
+app/routers/live.py
+───────────────────
+Endpoints:
+  WS /api/jobs/ws → Watch many jobs over one multiplexed WebSocket
+
+Protocol (JSON text frames):
+  client → {"type": "auth", "token": "<supabase access token>"}     (first frame)
+  server → {"type": "ready"}
+  client → {"type": "subscribe",   "job_ids": ["...", ...]}
+  server → {"type": "subscribed",  "jobs": {"<job_id>": "<status>", ...}}
+  client → {"type": "unsubscribe", "job_ids": ["...", ...]}
+  server → {"type": "updates", "events": {"<job_id>": <latest event>, ...}}
+  server → {"type": "error", "detail": "..."}   (bad frame; the socket stays open)
+
+Updates are coalesced per job and flushed at most once per
+WS_FLUSH_INTERVAL_MS, so a socket costs one small dict of pending bytes no
+matter how many jobs it watches. All sockets share the process-wide Redis
+subscription in app/pubsub.py; event bodies are forwarded without parsing.
+"""
+
+import asyncio
+from uuid import UUID
+
+import orjson
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+
+from app.config import settings
+from app.database import get_supabase_client
+from app.events import split_job_update
+from app.pubsub import hub
+from app.routers.jobs import decode_supabase_token
+
+
+router = APIRouter()
+
+AUTH_TIMEOUT_SECONDS = 10
+FRAME_TYPES = ("subscribe", "unsubscribe")
+
+
+class FrameError(ValueError):
+    """A client frame that can be answered with an error instead of closing the socket."""
+
+
+def _parse_frame(text: str) -> tuple[str, list[str]]:
+    """Validates a subscribe/unsubscribe frame; returns (type, canonical job ids)."""
+    try:
+        msg = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        raise FrameError("Frame is not valid JSON")
+    if not isinstance(msg, dict) or msg.get("type") not in FRAME_TYPES:
+        raise FrameError(f"Expected an object with type {' or '.join(FRAME_TYPES)}")
+    job_ids = msg.get("job_ids", [])
+    if not isinstance(job_ids, list):
+        raise FrameError("job_ids must be a list")
+    try:
+        return msg["type"], [str(UUID(str(j))) for j in job_ids]
+    except ValueError:
+        raise FrameError("job_ids must be UUIDs")
+
+
+def _updates_frame(pending: dict[str, bytes]) -> str:
+    """Splices raw event bodies into one frame without decoding them."""
+    parts = [b'{"type":"updates","events":{']
+    for i, (job_id, body) in enumerate(pending.items()):
+        if i:
+            parts.append(b",")
+        parts.append(orjson.dumps(job_id) + b":" + body)
+    parts.append(b"}}")
+    return b"".join(parts).decode("utf-8")
+
+
+class _Connection:
+    """Per-socket state: watched job ids and the latest unsent event per job."""
+
+    def __init__(self, ws: WebSocket, user_id: str):
+        self.ws = ws
+        self.user_id = user_id
+        self.watching: set[str] = set()
+        self.pending: dict[str, bytes] = {}
+        self.wake = asyncio.Event()
+
+    def on_update(self, job_id: str, message: bytes) -> None:
+        _, body = split_job_update(message)
+        self.pending[job_id] = body    # Coalesce: only the latest event per job survives
+        self.wake.set()
+
+    async def flush_loop(self) -> None:
+        interval = settings.ws_flush_interval_ms / 1000
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            if self.pending:
+                pending, self.pending = self.pending, {}
+                await self.ws.send_text(_updates_frame(pending))
+            await asyncio.sleep(interval)   # Rate limit: at most one frame per interval
+
+    async def subscribe(self, job_ids: list[str]) -> None:
+        wanted = [j for j in dict.fromkeys(job_ids) if j not in self.watching]
+        room = settings.ws_max_jobs_per_connection - len(self.watching)
+        if len(wanted) > room:
+            await self.ws.send_text(orjson.dumps({
+                "type": "error", "detail": f"At most {settings.ws_max_jobs_per_connection} jobs per connection",
+            }).decode())
+            wanted = wanted[:max(room, 0)]
+        if not wanted:
+            return
+
+        # Only the caller's own jobs can be watched
+        owned = (
+            get_supabase_client().table("landing_page_jobs")
+            .select("id, status")
+            .in_("id", wanted)
+            .eq("user_id", self.user_id)
+            .execute()
+        ).data or []
+
+        for row in owned:
+            self.watching.add(row["id"])
+            await hub.subscribe(row["id"], self.on_update)
+        await self.ws.send_text(orjson.dumps({
+            "type": "subscribed", "jobs": {row["id"]: row["status"] for row in owned},
+        }).decode())
+
+    async def unsubscribe(self, job_ids: list[str]) -> None:
+        for job_id in job_ids:
+            if job_id in self.watching:
+                self.watching.discard(job_id)
+                self.pending.pop(job_id, None)
+                await hub.unsubscribe(job_id, self.on_update)
+
+    async def close(self) -> None:
+        await self.unsubscribe(list(self.watching))
+
+
+async def _authenticate(ws: WebSocket) -> str | None:
+    try:
+        first = orjson.loads(await asyncio.wait_for(ws.receive_text(), timeout=AUTH_TIMEOUT_SECONDS))
+        if not isinstance(first, dict) or first.get("type") != "auth" or not isinstance(first.get("token"), str):
+            return None
+        user = await decode_supabase_token(first["token"])
+        return user.get("sub")
+    except (asyncio.TimeoutError, orjson.JSONDecodeError, HTTPException):
+        return None
+
+
+# ── WS /api/jobs/ws ────────────────────────────────────────────────────────
+@router.websocket("/ws")
+async def watch_jobs(ws: WebSocket):
+    await ws.accept()
+
+    user_id = await _authenticate(ws)
+    if not user_id:
+        await ws.close(code=4401, reason="Unauthorized")
+        return
+    await ws.send_text('{"type":"ready"}')
+
+    conn = _Connection(ws, user_id)
+    flusher = asyncio.create_task(conn.flush_loop())
+    try:
+        while True:
+            try:
+                frame_type, job_ids = _parse_frame(await ws.receive_text())
+            except FrameError as e:
+                await ws.send_text(orjson.dumps({"type": "error", "detail": str(e)}).decode())
+                continue
+            if frame_type == "subscribe":
+                await conn.subscribe(job_ids)
+            else:
+                await conn.unsubscribe(job_ids)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        flusher.cancel()
+        await conn.close()
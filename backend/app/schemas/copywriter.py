@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class HeroSection(BaseModel):
@@ -16,9 +16,25 @@ class BenefitItem(BaseModel):
 
 class LandingPageContent(BaseModel):
     hero: HeroSection
-    features: List[FeatureItem]
-    benefits: List[BenefitItem]
+    features: List[FeatureItem] = Field(..., min_length=3, max_length=3)
+    benefits: List[BenefitItem] = Field(..., min_length=3, max_length=3)
     cta_headline: str
     cta_subtext: str
     cta_button_text: str
     social_proof: Optional[str] = None
+
+# ── Section sub-models (one per parallel copywriter call) ──────────────────
+class HeroCopy(BaseModel):
+    hero: HeroSection
+    social_proof: Optional[str] = None
+
+class FeaturesCopy(BaseModel):
+    features: List[FeatureItem] = Field(..., min_length=3, max_length=3)
+
+class BenefitsCopy(BaseModel):
+    benefits: List[BenefitItem] = Field(..., min_length=3, max_length=3)
+
+class CTACopy(BaseModel):
+    cta_headline: str
+    cta_subtext: str
+    cta_button_text: str
@@ -14,10 +14,13 @@ from enum import Enum
 class JobStatus(str, Enum):
     PENDING      = "pending"
     RESEARCHING  = "researching"
+    COPYWRITING  = "copywriting"
+    BUILDING     = "building"
     COPYING      = "copying"
     GENERATING   = "generating"
     COMPLETED    = "completed"
     FAILED       = "failed"
+    CANCELLED    = "cancelled"
 
 
 class JobDirection(str, Enum):
@@ -33,6 +36,7 @@ class JobCreateRequest(BaseModel):
     locale:          str = Field(default="ar-SA")
     direction:       JobDirection = Field(default=JobDirection.RTL)
     competitors_url: list[str] = Field(default_factory=list, max_length=5)
+    variants:        int = Field(default=1, ge=1, le=5, description="A/B variants sharing one research pass")
 
 
 # ── Response: What we return after job is queued ──────────────────────────
@@ -43,6 +47,36 @@ class JobCreateResponse(BaseModel):
     stream_url:   str          # Ready-to-use SSE URL for the frontend
 
 
+# ── Response: What we return after a failed job is resumed ────────────────
+class JobResumeResponse(BaseModel):
+    job_id:       UUID
+    status:       JobStatus
+    resumed_from: str          # First step that will run again
+    stream_token: str
+    stream_url:   str
+
+
+# ── Response: What we return after a job is cancelled ────────────────────
+class JobCancelResponse(BaseModel):
+    job_id:        UUID
+    status:        JobStatus
+    removed_steps: int         # Queued/scheduled steps dropped before they ran
+
+
+# ── Request/Response: Regenerate one block of a completed page ────────────
+class BlockRegenerateRequest(BaseModel):
+    variant:      int = Field(default=0, ge=0, le=4)
+    instructions: Optional[str] = Field(default=None, max_length=300, description="Optional creative direction for the new copy")
+
+
+class BlockRegenerateResponse(BaseModel):
+    job_id:       UUID
+    block_id:     str
+    variant:      int
+    stream_token: str          # The block-level update arrives on this stream
+    stream_url:   str
+
+
 # ── Response: Job status polling ──────────────────────────────────────────
 class JobStatusResponse(BaseModel):
     job_id:        UUID
@@ -51,3 +85,4 @@ class JobStatusResponse(BaseModel):
     page_json:     Optional[dict] = None
     created_at:    datetime
     updated_at:    datetime
+    version:       int = 0   # Job state version; pass as `since` to long-poll
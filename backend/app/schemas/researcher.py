@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class Competitor(BaseModel):
@@ -7,6 +7,6 @@ class Competitor(BaseModel):
     summary: Optional[str] = None
 
 class ResearcherOutput(BaseModel):
-    competitors: List[Competitor]
-    local_pain_points: List[str]
-    cultural_hooks: List[str]
+    competitors: List[Competitor] = Field(..., max_length=5)
+    local_pain_points: List[str] = Field(..., min_length=3, max_length=5)
+    cultural_hooks: List[str] = Field(..., min_length=3, max_length=5)
@@ -11,9 +11,16 @@ class ComponentBlock(BaseModel):
     type: Literal["hero", "features", "benefits", "whatsapp_cta", "footer"]
     data: Dict[str, Any]
 
+class PageAssets(BaseModel):
+    font_family: str = "Cairo"
+    font_ref: str          # SHA-256 of the subsetted WOFF2
+    font_url: str          # Absolute public URL of the subset
+    critical_css: str      # Inlined in <head>: @font-face + base rules
+
 class LandingPageStructure(BaseModel):
     brand_name: str = "Etm"
     theme: ThemeConfig = Field(default_factory=ThemeConfig)
     rtl: bool = False
     locale: str = "ar-SA"
     layout: List[ComponentBlock]
+    assets: Optional[PageAssets] = None
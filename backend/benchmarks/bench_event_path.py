@@ -0,0 +1,82 @@
+"""
+benchmarks/bench_event_path.py
+──────────────────────────────
+Micro-benchmark: per-event CPU cost of the job update path at high fan-out.
+
+Compares the legacy path (json.dumps on publish, then json.loads + json.dumps
+per SSE subscriber) with the current one (orjson once on publish, raw bytes
+forwarded into every SSE frame with a header-only terminal check).
+
+Run from backend/:
+    python benchmarks/bench_event_path.py [--fanout 500] [--events 200]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.events import TERMINAL_STATUSES, encode_job_update, split_job_update, sse_frame  # noqa: E402
+
+
+def _sample_event() -> dict:
+    """A realistic mid-pipeline event (Arabic copy, nested payload)."""
+    return {
+        "status":  "copywriting",
+        "step":    "copywriter",
+        "message": "✍️ Writing your landing page copy...",
+        "payload": {
+            "hero": {"headline": "ابتسامتك تبدأ هنا", "subheadline": "رعاية أسنان متكاملة في الدمام", "cta_text": "احجز الآن"},
+            "features": [{"title": f"ميزة {i}", "description": "وصف تفصيلي للميزة " * 4} for i in range(3)],
+            "benefits": [{"title": f"فائدة {i}", "description": "وصف تفصيلي للفائدة " * 4} for i in range(3)],
+            "cta_headline": "لا تنتظر أكثر", "cta_subtext": "استشارة مجانية", "cta_button_text": "تواصل معنا",
+            "social_proof": None,
+        },
+    }
+
+
+def legacy_path(event: dict, fanout: int) -> None:
+    message = json.dumps(event)
+    for _ in range(fanout):
+        data = json.loads(message)
+        frame = f"data: {json.dumps(data)}\n\n"
+        _ = data.get("status") in {"completed", "failed"}
+        frame.encode("utf-8")
+
+
+def current_path(event: dict, fanout: int) -> None:
+    message = encode_job_update(event)
+    for _ in range(fanout):
+        status, body = split_job_update(message)
+        sse_frame(body)
+        _ = status in TERMINAL_STATUSES
+
+
+def _bench(fn, event: dict, fanout: int, events: int) -> float:
+    start = time.process_time()
+    for _ in range(events):
+        fn(event, fanout)
+    return (time.process_time() - start) / events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fanout", type=int, default=500, help="SSE subscribers per event")
+    parser.add_argument("--events", type=int, default=200, help="events to publish")
+    args = parser.parse_args()
+
+    event = _sample_event()
+    legacy  = _bench(legacy_path, event, args.fanout, args.events)
+    current = _bench(current_path, event, args.fanout, args.events)
+
+    print(f"fan-out: {args.fanout} subscribers, {args.events} events")
+    print(f"legacy  : {legacy * 1e3:8.3f} ms CPU/event  ({legacy / args.fanout * 1e6:7.2f} µs/subscriber)")
+    print(f"current : {current * 1e3:8.3f} ms CPU/event  ({current / args.fanout * 1e6:7.2f} µs/subscriber)")
+    print(f"speedup : {legacy / current:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
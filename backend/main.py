@@ -3,35 +3,72 @@ main.py
 ───────
 LandyLocal FastAPI entry point.
 
-Startup: validates all env vars, confirms DB connectivity.
+Startup: validates all env vars, then checks DB/Redis connectivity in the
+background — the process starts serving at once; /ready reports when the
+dependencies answered, /health only that the process is alive.
 CORS: locked to the Next.js frontend URL defined in .env.
 Routers: stubbed and ready to be filled in Phase 2.
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.config import settings
-from app.database import async_engine
-from app.database import async_engine, supabase_client
+from app.database import dispose_async_engine, get_supabase_client
+
+
+# ── Readiness: dependency checks run off the startup path ─────────────────
+READINESS_RETRY_SECONDS = 5
+
+_readiness = {"ready": False, "checks": {"database": "pending", "redis": "pending"}}
+
+
+def _check_dependencies() -> dict:
+    checks = {}
+    try:
+        # Use Supabase SDK for health check — avoids pgbouncer prepared statement issue
+        get_supabase_client().table("landing_page_jobs").select("id").limit(1).execute()
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+    try:
+        from app.redis_client import redis_conn
+        redis_conn.ping()
+        checks["redis"] = "ok"
+    except Exception as e:
+        checks["redis"] = f"error: {e}"
+    return checks
+
+
+async def _warm_up() -> None:
+    """Retries the dependency checks in a thread until they all pass."""
+    while True:
+        checks = await asyncio.to_thread(_check_dependencies)
+        _readiness["checks"] = checks
+        if all(v == "ok" for v in checks.values()):
+            _readiness["ready"] = True
+            print("✅ Database and Redis connections verified.")
+            return
+        print(f"⚠️  Dependency check failed: {checks} — retrying in {READINESS_RETRY_SECONDS}s")
+        await asyncio.sleep(READINESS_RETRY_SECONDS)
 
 
 # ── Lifespan: Runs on startup and shutdown ─────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 LandyLocal backend starting...")
-    try:
-        # Use Supabase SDK for health check — avoids pgbouncer prepared statement issue
-        result = supabase_client.table("landing_page_jobs").select("id").limit(1).execute()
-        print("✅ Database connection verified.")
-    except Exception as e:
-        print(f"⚠️  Database check failed: {e}")
+    warm_up = asyncio.create_task(_warm_up())
 
     yield
 
-    await async_engine.dispose()
+    warm_up.cancel()
+    from app.pubsub import hub
+    await hub.close()
+    await dispose_async_engine()
     print("🛑 Shutdown complete.")
 
 
@@ -68,7 +105,47 @@ async def health_check():
     return {"status": "ok", "service": "LandyLocal API", "version": "0.1.0"}
 
 
+@app.get("/ready", tags=["System"])
+async def readiness_check():
+    """Readiness probe: 503 until the background Supabase/Redis checks have passed."""
+    return JSONResponse(
+        status_code=200 if _readiness["ready"] else 503,
+        content={"status": "ready" if _readiness["ready"] else "starting", **_readiness},
+    )
+
+
+# ── Pipeline Metrics ───────────────────────────────────────────────────────
+@app.get("/metrics/pipeline", tags=["System"])
+async def pipeline_metrics():
+    """Shared pipeline counters from Redis: fast-path match rate, LLM hedging, breakers, worker pools, write-behind, LLM validation/repair, deadline degradations."""
+    from app.pipeline.clarifier_rules import fast_path_stats
+    from app.pipeline.control import degradation_stats
+    from app.pipeline.llm import hedge_stats, validation_stats
+    from app.pipeline.resilience import bulkhead_usage, provider_health
+    from app.pipeline.writebehind import writebehind_stats
+
+    llm_steps = ["clarifier", "researcher", "copywriter.hero", "copywriter.features",
+                 "copywriter.benefits", "copywriter.cta"]
+    from app.redis_client import redis_conn
+
+    supervisors = {
+        key.decode().split(":", 1)[1]: {k.decode(): v.decode() for k, v in redis_conn.hgetall(key).items()}
+        for key in redis_conn.scan_iter("supervisor:*")
+    }
+    return {
+        "clarifier_fast_path": fast_path_stats(),
+        "llm_hedging":         {step: hedge_stats(step) for step in llm_steps},
+        "llm_validation":      {step: validation_stats(step) for step in llm_steps},
+        "breakers":            provider_health(),
+        "bulkheads":           bulkhead_usage(),
+        "worker_pools":        supervisors,
+        "write_behind":        writebehind_stats(),
+        "deadline_degradations": degradation_stats(),
+    }
+
+
 # ── Routers (Phase 2 stubs — uncomment as you build) ──────────────────────
-from app.routers import jobs
+from app.routers import jobs, live
 #app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
-app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
\ No newline at end of file
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(live.router, prefix="/api/jobs", tags=["Jobs"])
\ No newline at end of file
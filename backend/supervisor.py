@@ -0,0 +1,179 @@
+"""
+supervisor.py
+─────────────
+Local multi-process worker supervisor with queue-driven autoscaling.
+
+Runs a pool of RQ worker processes on one host (instead of a single
+`python worker.py`) and resizes it between WORKER_POOL_MIN and
+WORKER_POOL_MAX based on the "landylocal" queue:
+
+  - depth      : queued jobs per worker above WORKER_POOL_JOBS_PER_WORKER
+  - oldest age : the head of the queue waiting longer than
+                 WORKER_POOL_SCALE_UP_AGE_SECONDS adds one more worker
+
+Scale-ups happen at once (after WORKER_POOL_SCALE_UP_COOLDOWN), scale-downs
+one worker at a time (after WORKER_POOL_SCALE_DOWN_COOLDOWN) with a warm
+shutdown, so a running job is never killed. Crashed children are restarted.
+
+Every decision is written to the Redis hash `supervisor:{hostname}` and
+shows up under /metrics/pipeline.
+
+    python supervisor.py
+"""
+
+from dotenv import load_dotenv
+load_dotenv()  # Must load before importing settings
+
+import math
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from datetime import datetime, timezone
+
+from rq.job import Job
+
+from app.config import settings
+from app.redis_client import redis_conn, task_queue
+
+
+METRICS_KEY = f"supervisor:{socket.gethostname()}"
+
+
+def _child_main(name: str) -> None:
+    # Imported in the child so it opens its own Redis connection
+    from worker import run_worker
+    run_worker(name=name)
+
+
+class Supervisor:
+    def __init__(self):
+        self.ctx = multiprocessing.get_context("spawn")
+        self.children: dict[str, multiprocessing.Process] = {}
+        self.draining: dict[str, multiprocessing.Process] = {}
+        self.seq = 0
+        self.last_scale_up = 0.0
+        self.last_scale_down = 0.0
+        self.restarts = 0
+        self.stopping = False
+
+    # ── Children ──────────────────────────────────────────────────────────
+    def _spawn(self) -> None:
+        self.seq += 1
+        name = f"{socket.gethostname()}.{os.getpid()}.{self.seq}"
+        proc = self.ctx.Process(target=_child_main, args=(name,), name=name, daemon=False)
+        proc.start()
+        self.children[name] = proc
+
+    def _retire_one(self) -> None:
+        """Warm shutdown: RQ finishes the current job on SIGTERM, then exits."""
+        name, proc = self.children.popitem()
+        os.kill(proc.pid, signal.SIGTERM)
+        self.draining[name] = proc
+
+    def _reap(self) -> int:
+        """Restarts children that died unexpectedly; forgets drained ones."""
+        for name, proc in list(self.draining.items()):
+            if not proc.is_alive():
+                proc.join()
+                del self.draining[name]
+
+        crashed = 0
+        for name, proc in list(self.children.items()):
+            if not proc.is_alive():
+                proc.join()
+                del self.children[name]
+                print(f"⚠️  Worker {name} exited with code {proc.exitcode} — restarting")
+                crashed += 1
+        for _ in range(crashed):
+            self._spawn()
+        self.restarts += crashed
+        return crashed
+
+    # ── Scaling ───────────────────────────────────────────────────────────
+    def _queue_signals(self) -> tuple[int, float]:
+        depth = task_queue.count
+        oldest_age = 0.0
+        head = task_queue.get_job_ids(0, 1)
+        if head:
+            job = Job.fetch(head[0], connection=redis_conn)
+            if job.enqueued_at:
+                enqueued = job.enqueued_at.replace(tzinfo=timezone.utc)
+                oldest_age = (datetime.now(timezone.utc) - enqueued).total_seconds()
+        return depth, oldest_age
+
+    def desired_size(self, current: int, depth: int, oldest_age: float) -> int:
+        desired = math.ceil(depth / max(1, settings.worker_pool_jobs_per_worker))
+        if oldest_age > settings.worker_pool_scale_up_age_seconds:
+            desired = max(desired, current + 1)
+        return max(settings.worker_pool_min, min(settings.worker_pool_max, desired))
+
+    def _scale(self, depth: int, oldest_age: float) -> str:
+        now = time.monotonic()
+        current = len(self.children)
+        desired = self.desired_size(current, depth, oldest_age)
+
+        if desired > current and now - self.last_scale_up >= settings.worker_pool_scale_up_cooldown:
+            for _ in range(desired - current):
+                self._spawn()
+            self.last_scale_up = now
+            return f"scale_up {current}→{desired}"
+
+        if desired < current and now - max(self.last_scale_up, self.last_scale_down) >= settings.worker_pool_scale_down_cooldown:
+            self._retire_one()
+            self.last_scale_down = now
+            return f"scale_down {current}→{current - 1}"
+
+        return "hold"
+
+    def _report(self, decision: str, depth: int, oldest_age: float, crashed: int) -> None:
+        redis_conn.hset(METRICS_KEY, mapping={
+            "workers":         len(self.children),
+            "draining":        len(self.draining),
+            "queue_depth":     depth,
+            "oldest_age_s":    round(oldest_age, 1),
+            "last_decision":   decision,
+            "restarts_total":  self.restarts,
+            "updated_at":      datetime.now(timezone.utc).isoformat(),
+        })
+        redis_conn.expire(METRICS_KEY, settings.worker_pool_poll_seconds * 12)
+        if decision != "hold":
+            redis_conn.hincrby(METRICS_KEY, decision.split()[0] + "_total", 1)
+        if decision != "hold" or crashed:
+            print(f"📈 {decision} (depth={depth}, oldest={oldest_age:.0f}s, crashed={crashed})")
+
+    # ── Main loop ─────────────────────────────────────────────────────────
+    def _stop(self, *_):
+        self.stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for _ in range(settings.worker_pool_min):
+            self._spawn()
+        print(f"🔧 Supervisor started with {len(self.children)} worker(s) "
+              f"(min={settings.worker_pool_min}, max={settings.worker_pool_max})")
+
+        while not self.stopping:
+            crashed = self._reap()
+            try:
+                depth, oldest_age = self._queue_signals()
+                decision = self._scale(depth, oldest_age)
+                self._report(decision, depth, oldest_age, crashed)
+            except Exception as e:
+                print(f"⚠️  Supervisor tick failed: {e}")
+            time.sleep(settings.worker_pool_poll_seconds)
+
+        print("🛑 Supervisor stopping — draining workers...")
+        for proc in [*self.children.values(), *self.draining.values()]:
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGTERM)
+        for proc in [*self.children.values(), *self.draining.values()]:
+            proc.join()
+        redis_conn.delete(METRICS_KEY)
+
+
+if __name__ == "__main__":
+    Supervisor().run()
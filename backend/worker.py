@@ -9,6 +9,8 @@ Run this in a SEPARATE terminal alongside uvicorn:
 
 This process continuously listens for tasks on the "landylocal"
 queue and executes them synchronously (no async — RQ is sync).
+
+To run a self-scaling pool of these on one host, use supervisor.py instead.
 """
 
 from dotenv import load_dotenv
@@ -17,12 +19,45 @@ load_dotenv()  # Must load before importing settings
 from rq import Worker
 from app.redis_client import redis_conn, task_queue
 
-if __name__ == "__main__":
-    print("🔧 LandyLocal RQ Worker starting...")
-    print(f"📡 Listening on queue: {task_queue.name}")
 
-    worker = Worker(
+class PipelineWorker(Worker):
+    def execute_job(self, job, queue):
+        # Runs in the parent right before the fork: the work horse inherits an
+        # index that is already loaded and caught up with the Redis list
+        from app.pipeline.research_index import warm_index
+        try:
+            warm_index()
+        except Exception as e:
+            print(f"⚠️  Research index warm-up failed (the job loads it itself): {e}")
+        return super().execute_job(job, queue)
+
+
+def run_worker(name: str | None = None) -> None:
+    """Runs one RQ worker until it is told to stop (SIGTERM = warm shutdown)."""
+    # Import the pipeline once in the parent: RQ forks a work horse per job,
+    # and every fork inherits the already-imported modules instead of paying
+    # for the LLM SDK / NumPy imports again. The API never imports this module.
+    import app.pipeline.tasks  # noqa: F401
+    from app.pipeline.fonts import check_font_setup
+    from app.pipeline.writebehind import Flusher
+
+    check_font_setup()   # Fail at startup, not silently per page
+
+    worker = PipelineWorker(
         queues=[task_queue],
         connection=redis_conn,
+        name=name,
     )
-    worker.work(with_scheduler=True)
+    # Drains the write-behind buffer the work horses fill; flushes once more on shutdown
+    flusher = Flusher()
+    flusher.start()
+    try:
+        worker.work(with_scheduler=True)
+    finally:
+        flusher.stop()
+
+
+if __name__ == "__main__":
+    print("🔧 LandyLocal RQ Worker starting...")
+    print(f"📡 Listening on queue: {task_queue.name}")
+    run_worker()
@@ -4,7 +4,7 @@ export const revalidate = 0;
 
 import { notFound } from "next/navigation";
 import { createSupabaseServerClient } from "@/lib/supabaseServer";
-import DynamicRenderer from "@/components/DynamicRenderer";
+import DynamicRenderer, { type PageAssets } from "@/components/DynamicRenderer";
 
 interface PageProps {
   params: { id: string };
@@ -32,9 +32,17 @@ export default async function PublicLandingPage({ params }: PageProps) {
     notFound();
   }
 
+  const assets: PageAssets | undefined = data.structure.assets;
+
   return (
     <main>
-      <DynamicRenderer structure={data.structure} />
+      {assets && (
+        <>
+          <link rel="preload" href={assets.font_url} as="font" type="font/woff2" crossOrigin="anonymous" />
+          <style dangerouslySetInnerHTML={{ __html: assets.critical_css }} />
+        </>
+      )}
+      <DynamicRenderer structure={data.structure} subsetFont={!!assets} />
     </main>
   );
 }
@@ -20,12 +20,21 @@ interface ComponentBlock {
   data: Record<string, any>;
 }
 
+// Added by the backend's page_assets step when font subsetting is on
+export interface PageAssets {
+  font_family: string;
+  font_ref: string;
+  font_url: string;      // Subset of the font with only this page's characters
+  critical_css: string;  // @font-face + base rules, inlined by the published page
+}
+
 interface LandingPageStructure {
   brand_name: string;
   theme: ThemeConfig;
   rtl: boolean;
   locale: string;
   layout: ComponentBlock[];
+  assets?: PageAssets;
 }
 
 // ── Hero ─────────────────────────────────────────────────────────────────
@@ -151,8 +160,17 @@ function FooterBlock() {
 
 // ── Main Renderer ─────────────────────────────────────────────────────────
 
-export default function DynamicRenderer({ structure }: { structure: LandingPageStructure }) {
+// `subsetFont`: the published page has inlined structure.assets; elsewhere (dashboard
+// previews, edits with new text) the full Cairo font is kept
+export default function DynamicRenderer({
+  structure,
+  subsetFont = false,
+}: {
+  structure: LandingPageStructure;
+  subsetFont?: boolean;
+}) {
   const { theme, rtl, layout } = structure;
+  const assets = subsetFont ? structure.assets : undefined;
 
   if (!theme || !layout) {
     return (
@@ -163,7 +181,11 @@ export default function DynamicRenderer({ structure }: { structure: LandingPageS
   }
 
   return (
-    <div dir={rtl ? "rtl" : "ltr"} className={cairo.className}>
+    <div
+      dir={rtl ? "rtl" : "ltr"}
+      className={assets ? undefined : cairo.className}
+      style={assets ? { fontFamily: `"${assets.font_family}", system-ui, sans-serif` } : undefined}
+    >
       {layout.map((block) => {
         switch (block.type) {
           case "hero":